@@ -0,0 +1,224 @@
+"""
+Offline end-to-end benchmark of run_agent: a scripted LLM, a local GitHub stand-in and a synthetic repo.
+
+    python benchmarks/bench_agent.py [--files 200] [--lines 200] [--sessions 3] [--iterations 2]
+                                     [--llm-latency 0] [--output PATH] [--compare BASELINE.json]
+
+Reports per-iteration and per-tool latency, subprocess counts, GitHub requests and peak memory.
+Results are written as JSON (default benchmarks/results/) so runs can be compared with --compare.
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import warnings
+import tracemalloc
+import contextlib
+from collections import Counter, defaultdict
+from statistics import mean, median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.fake_llm import ScriptedLLM, session_script
+from benchmarks.synthetic_repo import make_repo, module_path
+
+def configure(workdir: str, github_url: str) -> None:
+    """Environment for an isolated offline run; must happen before anything under src is imported."""
+    os.environ.update({
+        "GITHUB_API_URL": github_url,
+        "GITHUB_TOKEN": "offline",
+        "DRY_RUN": "0",
+        "LLM_STREAM": "0",
+        "LLM_CACHE_MODE": "off",
+        "FETCH_INTERVAL": "3600",
+    })
+    for name, sub in (("STATE_DIR", "state"), ("HTTP_CACHE_DIR", "http"), ("TREE_CACHE_DIR", "trees"),
+                      ("SEARCH_INDEX_DIR", "search"), ("RETRIEVAL_INDEX_DIR", "retrieval"),
+                      ("TEST_MAP_DIR", "testmap"), ("TEST_RESULTS_DIR", "testresults")):
+        os.environ[name] = os.path.join(workdir, "cache", sub)
+
+class Probe:
+    """Hooks into the agent to time iterations and tool calls and to count subprocesses."""
+    def __init__(self):
+        self.iterations = []
+        self.tools = defaultdict(list)
+        self.subprocesses = Counter()
+
+    def install(self, ai_agent) -> None:
+        import langchain.agents
+        probe = self
+        recorded, initialize = ai_agent._recorded, langchain.agents.initialize_agent
+
+        def timed_recorded(tool, store, step, *rest):
+            wrapped = recorded(tool, store, step, *rest)
+            func = wrapped.func
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    probe.tools[tool.name].append(time.perf_counter() - start)
+            return langchain.agents.Tool(name=wrapped.name, func=timed, description=wrapped.description)
+
+        class TimedAgent:
+            def __init__(self, agent):
+                self.agent = agent
+            def run(self, text):
+                start = time.perf_counter()
+                try:
+                    return self.agent.run(text)
+                finally:
+                    probe.iterations.append(time.perf_counter() - start)
+
+        ai_agent._recorded = timed_recorded
+        langchain.agents.initialize_agent = lambda *a, **kw: TimedAgent(initialize(*a, **kw))
+
+        popen_init = subprocess.Popen.__init__
+        def counting_init(self, args, *a, **kw):
+            argv = [args] if isinstance(args, str) else list(args)
+            probe.subprocesses[" ".join(str(x) for x in argv[:2])] += 1
+            popen_init(self, args, *a, **kw)
+        subprocess.Popen.__init__ = counting_init
+
+    def reset(self) -> None:
+        self.iterations, self.tools, self.subprocesses = [], defaultdict(list), Counter()
+
+def run_session(ai_agent, probe: Probe, github: FakeGitHub, repo: str, number: int, args) -> dict:
+    # a different tested module per session, so no session replays another's tree state from the caches
+    module = (number - 1) % max(1, min(args.test_files, args.files))
+    target, function = module_path(module, args.dirs), f"compute_{module}_0"
+    github.add_issue(number, f"{function} returns the wrong value",
+                     f"Calling {function} in {target} with a negative input gives a wrong result.",
+                     [f"Also seen from compute_{module}_1, see {target}."] * args.comments)
+    llm = ScriptedLLM(responses=session_script(target, function, args.iterations), latency=args.llm_latency)
+    subprocess.run(["git", "checkout", "-q", "main"], cwd=repo, check=True)
+    probe.reset()
+    github.requests.clear()
+    tracemalloc.reset_peak()
+    out = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out if not args.verbose else sys.stdout):
+        ai_agent.run_agent("bench", number, max_iterations=args.iterations, repo_root=repo, llm=llm)
+    total = time.perf_counter() - start
+    return {
+        "issue": number,
+        "seconds": round(total, 4),
+        "iterations": [round(t, 4) for t in probe.iterations],
+        "tools": {name: [round(t, 4) for t in times] for name, times in probe.tools.items()},
+        "subprocesses": dict(probe.subprocesses),
+        "github_requests": dict(github.requests),
+        "llm_calls": llm.calls,
+        "peak_python_mb": round(tracemalloc.get_traced_memory()[1] / 2**20, 2),
+        "pull_requests": len(github.pulls),
+    }
+
+def _pct(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def summarize(sessions: list) -> dict:
+    warm = sessions[1:] or sessions
+    iterations = [t for s in warm for t in s["iterations"]]
+    tools = defaultdict(list)
+    for s in warm:
+        for name, times in s["tools"].items():
+            tools[name].extend(times)
+    return {
+        "cold_session_seconds": sessions[0]["seconds"],
+        "warm_session_seconds": round(mean(s["seconds"] for s in warm), 4),
+        "iteration_p50": round(median(iterations), 4) if iterations else 0.0,
+        "iteration_p95": round(_pct(iterations, 0.95), 4),
+        "tool_mean_seconds": {name: round(mean(times), 4) for name, times in sorted(tools.items())},
+        "subprocesses_per_session": round(mean(sum(s["subprocesses"].values()) for s in warm), 1),
+        "github_requests_per_session": round(mean(sum(s["github_requests"].values()) for s in warm), 1),
+        "peak_python_mb": max(s["peak_python_mb"] for s in sessions),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children_max_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+def _flatten(summary: dict) -> dict:
+    flat = {}
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            flat.update({f"{key}.{k}": v for k, v in value.items()})
+        else:
+            flat[key] = value
+    return flat
+
+def compare(current: dict, baseline: dict) -> str:
+    """Side-by-side table of two summaries; positive change means the current run is higher (slower/bigger)."""
+    now, before = _flatten(current), _flatten(baseline)
+    rows = [f"{'metric':<40}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for key in sorted(set(now) | set(before)):
+        a, b = before.get(key), now.get(key)
+        change = f"{(b - a) / a * 100:+.1f}%" if isinstance(a, (int, float)) and isinstance(b, (int, float)) and a else ""
+        rows.append(f"{key:<40}{'' if a is None else a:>12}{'' if b is None else b:>12}{change:>10}")
+    return "\n".join(rows)
+
+def _revision() -> str:
+    r = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return r.stdout.strip()
+
+def main(argv=None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200, help="modules in the synthetic repo")
+    parser.add_argument("--lines", type=int, default=200, help="lines per module")
+    parser.add_argument("--dirs", type=int, default=20, help="packages the modules are spread over")
+    parser.add_argument("--test-files", type=int, default=10)
+    parser.add_argument("--comments", type=int, default=5, help="comments on each issue")
+    parser.add_argument("--sessions", type=int, default=3, help="sessions to run; the first one is reported as cold")
+    parser.add_argument("--iterations", type=int, default=2, help="agent iterations per session")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per LLM call")
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="baseline results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the agent's own output")
+    args = parser.parse_args(argv)
+    warnings.filterwarnings("ignore", category=DeprecationWarning)  # langchain's agent API notices
+
+    workdir = tempfile.mkdtemp(prefix="bench-agent-")
+    github = FakeGitHub().start()
+    cwd = os.getcwd()
+    try:
+        configure(workdir, github.url)
+        os.chdir(workdir)  # relative cache paths and anything else the agent writes stay in workdir
+        repo = make_repo(workdir, args.files, args.lines, args.dirs, args.test_files)
+        tracemalloc.start()
+        from src import ai_agent
+        probe = Probe()
+        probe.install(ai_agent)
+        sessions = [run_session(ai_agent, probe, github, repo, n, args) for n in range(1, args.sessions + 1)]
+        from src.tools.git_utils import fetch_stats
+        fetch = {k: round(v, 4) for k, v in fetch_stats().items()}
+    finally:
+        os.chdir(cwd)
+        github.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {
+        "meta": {"revision": _revision(), "python": platform.python_version(), "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                 "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "verbose")}},
+        "summary": dict(summarize(sessions), fetch=fetch),
+        "sessions": sessions,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results", f"agent-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps(results["summary"], indent=2))
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(results["summary"], json.load(f)["summary"]))
+    print(f"Results written to {output}")
+    return results
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare diff_engine.unified_diff with difflib.unified_diff on large synthetic files.
+
+    python benchmarks/bench_diff.py [--lines 20000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import difflib
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.tools import diff_engine
+
+def source_file(n: int, rng: random.Random) -> list:
+    """Python-looking lines: mostly unique statements, with the blank lines, braces and returns real code repeats."""
+    common = ["\n", "    return None\n", "        pass\n", "}\n", "    else:\n"]
+    return [rng.choice(common) if rng.random() < 0.3 else f"    value_{i} = compute({i})\n" for i in range(n)]
+
+def cases(n: int, rng: random.Random) -> dict:
+    base = source_file(n, rng)
+    one_line = list(base)
+    one_line[n // 2] = "    fixed = True\n"
+    scattered = list(base)
+    for _ in range(50):
+        scattered[rng.randrange(n)] = f"    edit_{rng.random()}\n"
+    repeated = ["\n"] * n
+    repeated_edit = list(repeated)
+    repeated_edit[n // 3:n // 3] = ["x\n"] * 10
+    # lines from a small vocabulary, each too rare for difflib's autojunk heuristic (<1% of the file)
+    vocab = [f"    call_{k}()\n" for k in range(max(1, n // 150))]
+    low_card = [rng.choice(vocab) for _ in range(n)]
+    low_card_edit = list(low_card)
+    for _ in range(20):
+        low_card_edit.insert(rng.randrange(n), "    new_call()\n")
+    return {
+        "one-line fix": (base, one_line),
+        "low-cardinality lines": (low_card, low_card_edit),
+        "50 scattered edits": (base, scattered),
+        "blank-line file": (repeated, repeated_edit),
+        "rewrite half": (base, base[:n // 2] + source_file(n // 2, rng)),
+    }
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'case':<22}{'difflib (s)':>14}{'diff_engine (s)':>18}{'speedup':>10}")
+    for name, (a, b) in cases(args.lines, random.Random(0)).items():
+        slow = best_of(lambda: "".join(difflib.unified_diff(a, b, "a/f", "b/f")), args.repeat)
+        fast = best_of(lambda: "".join(diff_engine.unified_diff(a, b, "a/f", "b/f")), args.repeat)
+        print(f"{name:<22}{slow:>14.4f}{fast:>18.4f}{slow / fast:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Local stand-in for the GitHub REST and GraphQL endpoints the agent uses, for offline benchmarks.
+Point the agent at it with GITHUB_API_URL=<FakeGitHub.url> before importing src.
+"""
+import re
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+ISSUE = re.compile(r"^/repos/([^/]+)/([^/]+)/issues/(\d+)$")
+COMMENTS = re.compile(r"^/repos/([^/]+)/([^/]+)/issues/(\d+)/comments$")
+ISSUES = re.compile(r"^/repos/([^/]+)/([^/]+)/issues$")
+PULLS = re.compile(r"^/repos/([^/]+)/([^/]+)/pulls$")
+TREE = re.compile(r"^/repos/([^/]+)/([^/]+)/git/trees/")
+NUMBER = re.compile(r"/\d+")
+
+class FakeGitHub:
+    """
+    Serves issues and comments from memory, records created pull requests, and counts requests per route.
+    Comments are paginated with Link headers like the real API (per_page, default 30).
+    """
+    def __init__(self, host: str="127.0.0.1", port: int=0):
+        self.issues = {}     # number -> issue object
+        self.comments = {}   # number -> [comment objects]
+        self.pulls = []
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+
+    def add_issue(self, number: int, title: str, body: str, comments: list=()) -> None:
+        self.issues[number] = {"number": number, "title": title, "body": body, "labels": [], "state": "open"}
+        self.comments[number] = [{"id": i, "user": {"login": "reporter"}, "body": c} for i, c in enumerate(comments, 1)]
+
+    def start(self) -> "FakeGitHub":
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _route(self, method: str, path: str, query: dict, body: dict):
+        """Returns (status, payload, extra headers)."""
+        m = ISSUE.match(path)
+        if method == "GET" and m:
+            issue = self.issues.get(int(m.group(3)))
+            return (200, issue, {}) if issue else (404, {"message": "Not Found"}, {})
+        m = COMMENTS.match(path)
+        if method == "GET" and m:
+            comments = self.comments.get(int(m.group(3)), [])
+            per_page = int(query.get("per_page", ["30"])[0])
+            page = int(query.get("page", ["1"])[0])
+            last = max(1, -(-len(comments) // per_page))
+            headers = {}
+            if page < last:
+                base = f"{self.url}{path}?per_page={per_page}"
+                headers["Link"] = f'<{base}&page={page + 1}>; rel="next", <{base}&page={last}>; rel="last"'
+            return 200, comments[(page - 1) * per_page:page * per_page], headers
+        if method == "GET" and ISSUES.match(path):
+            return 200, list(self.issues.values()), {}
+        if method == "GET" and TREE.match(path):
+            return 200, {"sha": "0" * 40, "tree": [], "truncated": False}, {}
+        m = PULLS.match(path)
+        if m and method == "GET":
+            head = query.get("head", [""])[0].split(":")[-1]
+            return 200, [p for p in self.pulls if p["head"]["ref"] == head], {}
+        if m and method == "POST":
+            with self._lock:
+                number = len(self.pulls) + 1
+                pr = {"number": number, "html_url": f"{self.url}/pull/{number}", "title": body.get("title"),
+                      "head": {"ref": body.get("head")}, "base": {"ref": body.get("base")}}
+                self.pulls.append(pr)
+            return 201, pr, {}
+        if method == "POST" and path == "/graphql":
+            return 200, {"data": {"repository": {"issue": None}}}, {}
+        return 404, {"message": "Not Found"}, {}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _serve(self, method: str):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+                status, payload, headers = fake._route(method, url.path, parse_qs(url.query), body)
+                route = NUMBER.sub("/N", url.path)
+                with fake._lock:
+                    fake.requests[f"{method} {route}"] += 1
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,42 @@
+"""Scripted stand-in for the agent's LLM: replays ReAct completions in order, with optional simulated latency."""
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.llms import LLM
+
+class ScriptedLLM(LLM):
+    responses: List[str]
+    latency: float = 0.0
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _call(self, prompt: str, stop: Optional[List[str]]=None, run_manager=None, **kwargs: Any) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        response = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
+        return response
+
+def session_script(target: str, function: str, iterations: int) -> List[str]:
+    """
+    Completions for one session of the given number of iterations: every iteration but the last explores
+    (search, tree, ranged read) and ends without finishing; the last edits, tests, commits and completes.
+    """
+    explore = [
+        f"Thought: find it\nAction: search_code\nAction Input: {function}",
+        'Thought: look around\nAction: list_repo_tree\nAction Input: {"prefix": "pkg/", "summary": true}',
+        f'Thought: read it\nAction: read_file\nAction Input: {{"path": "{target}", "start_line": 1, "end_line": 40}}',
+    ]
+    script = []
+    for _ in range(iterations - 1):
+        script += explore + ["Thought: need more context\nFinal Answer: still investigating"]
+    script += explore + [
+        'Thought: fix it\nAction: edit_file\nAction Input: {"path": "%s", "edits": [{"search": "def %s(x):", '
+        '"replace": "def %s(x):  # checked"}]}' % (target, function, function),
+        "Thought: test\nAction: run_tests\nAction Input: impacted",
+        f"Thought: publish\nAction: commit_changes\nAction Input: Fix {function}",
+        "Thought: done\nFinal Answer: TASK_COMPLETE",
+    ]
+    return script
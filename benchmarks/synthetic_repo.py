@@ -0,0 +1,51 @@
+"""Generate synthetic Python repositories of configurable size for offline agent benchmarks."""
+import os
+import subprocess
+
+def _git(*args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True)
+
+def module_path(i: int, dirs: int) -> str:
+    return f"pkg/d{i % dirs}/module_{i}.py"
+
+def _module(i: int, functions: int) -> str:
+    parts = [f'"""Synthetic module {i}."""\n']
+    for j in range(functions):
+        parts.append(f"\ndef compute_{i}_{j}(x):\n    \"\"\"Return x shifted by {j}.\"\"\"\n    return x + {j}\n")
+    return "".join(parts)
+
+def _test(i: int, functions: int) -> str:
+    lines = [f"from pkg.d{{d}}.module_{i} import *\n"]
+    for j in range(min(functions, 5)):
+        lines.append(f"\ndef test_compute_{i}_{j}():\n    assert compute_{i}_{j}(1) == {1 + j}\n")
+    return "".join(lines)
+
+def make_repo(root: str, files: int=200, lines: int=200, dirs: int=20, test_files: int=10) -> str:
+    """
+    Create <root>/origin.git and a clone <root>/work holding files modules of about lines lines each,
+    spread over dirs packages, with tests for the first test_files modules. Returns the clone's path.
+    """
+    functions = max(1, lines // 4)
+    origin, work = os.path.join(root, "origin.git"), os.path.join(root, "work")
+    _git("init", "--bare", "-b", "main", origin, cwd=root)
+    _git("clone", origin, work, cwd=root)
+    _git("config", "user.email", "bench@example.com", cwd=work)
+    _git("config", "user.name", "bench", cwd=work)
+    dirs = max(1, min(dirs, files))
+    for d in range(dirs):
+        os.makedirs(os.path.join(work, "pkg", f"d{d}"), exist_ok=True)
+        open(os.path.join(work, "pkg", f"d{d}", "__init__.py"), "w").close()
+    open(os.path.join(work, "pkg", "__init__.py"), "w").close()
+    for i in range(files):
+        with open(os.path.join(work, module_path(i, dirs)), "w") as f:
+            f.write(_module(i, functions))
+    os.makedirs(os.path.join(work, "tests"), exist_ok=True)
+    for i in range(min(test_files, files)):
+        with open(os.path.join(work, "tests", f"test_module_{i}.py"), "w") as f:
+            f.write(_test(i, functions).replace("{d}", str(i % dirs)))
+    with open(os.path.join(work, "pytest.ini"), "w") as f:
+        f.write("[pytest]\npythonpath = .\n")
+    _git("add", ".", cwd=work)
+    _git("commit", "-m", "Synthetic repository", cwd=work)
+    _git("push", "origin", "HEAD:main", cwd=work)
+    return work
@@ -1,101 +1,237 @@
 import time
 import json
-from langchain.agents import initialize_agent, Tool
-from langchain_community.llms import OpenAI, Ollama
-from src.config import LLM_PROVIDER, LLM_MODEL, DRY_RUN
-from src.github_client import get_issue_data
-from src.tools.file_tools import read_file, apply_file_patch, make_unified_diff
-from src.tools.test_tools import run_tests
-from src.state_manager import save_state, load_state
-
-def get_llm():
+import importlib
+from src.config import (
+    LLM_PROVIDER, LLM_MODEL, LLM_STREAM, LLM_CACHE_MODE, DRY_RUN, STATE_DIR, TEST_VERIFY_BEFORE_PR, TOOL_BATCH_WORKERS,
+)
+from src.llm_cache import MODES
+from src.state_manager import StateStore
+from src.prompt_builder import PromptBuilder
+from src import tracing
+
+# langchain, the LLM provider, requests and the tool modules take seconds to import, and the CLI (--help,
+# batch and server setup) needs none of them: they are imported on first use instead of with this module
+def _lazy(module: str, name: str):
+    """A function that imports module.name on its first call and forwards to it."""
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    call.__name__ = name
+    return call
+
+get_issue_data = _lazy("src.github_client", "get_issue_data")
+read_file_query = _lazy("src.tools.file_tools", "read_file_query")
+list_repo_tree = _lazy("src.tools.tree_index", "list_repo_tree")
+search_code = _lazy("src.tools.code_search", "search_code")
+rank_files = _lazy("src.tools.relevance", "rank_files")
+run_tests = _lazy("src.tools.test_tools", "run_tests")
+verify_full_suite = _lazy("src.tools.test_tools", "verify_full_suite")
+batch_query = _lazy("src.tools.tool_batch", "batch_query")
+
+INSTRUCTIONS = (
+    "You are an autonomous developer. Use provided tools to make safe, small changes. "
+    "When you want to change files, stage each file with edit_file or stage_edit and then publish them together with a single commit_changes call. "
+    "When you need several independent results (e.g. reading a few files), request them together with one batch call. "
+    "Stop when the task is complete, by returning the text 'TASK_COMPLETE' in your final response."
+)
+
+class Cancelled(BaseException):
+    """
+    Raised from a tool call once a competing speculative attempt has won, to end the agent's run.
+    A BaseException (like asyncio's CancelledError) so tool-level `except Exception` handlers don't swallow it.
+    """
+
+def get_llm(temperature=None, variant=None):
+    # only the selected provider's module is imported; variant separates cache entries of independent samplers
+    params = {} if temperature is None else {"temperature": temperature}
     if LLM_PROVIDER == "ollama":
-        return Ollama(model=LLM_MODEL)
-    else:
-        return OpenAI(model=LLM_MODEL)
-
-def run_agent(repo_name, issue_number, max_iterations=10, base_branch="main", repo_root="."):
-    # load previous state
-    state = load_state()
-    if state and state.get("issue_number") == issue_number and state.get("repo_name") == repo_name:
-        history = state.get("history", [])
-        iteration = state.get("last_iteration", 0)
+        from langchain_community.llms.ollama import Ollama
+        llm = Ollama(model=LLM_MODEL, **params)
     else:
-        history = []
-        iteration = 0
+        from langchain_community.llms.openai import OpenAI
+        llm = OpenAI(model=LLM_MODEL, **params)
+    if LLM_STREAM:
+        from src.llm_streaming import StreamingLLM
+        llm = StreamingLLM(llm=llm)
+    if LLM_CACHE_MODE == "off":
+        return llm
+    if LLM_CACHE_MODE not in MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {MODES}, got {LLM_CACHE_MODE!r}")
+    from src.cached_llm import CachedLLM
+    from src.llm_cache import LLMCache
+    return CachedLLM(llm=llm, provider=LLM_PROVIDER, store=LLMCache(), mode=LLM_CACHE_MODE, variant=variant)
 
-    issue_data = get_issue_data(repo_name, issue_number)
-    llm = get_llm()
+def run_agent(repo_name, issue_number, max_iterations=10, base_branch="main", repo_root=".", state_dir=STATE_DIR, llm=None, attempt=None):
+    # one trace per session; the metrics file is rewritten after each one so long-running servers export as they go
+    with tracing.span("session", repo=repo_name, issue=issue_number):
+        try:
+            _run_agent(repo_name, issue_number, max_iterations, base_branch, repo_root, state_dir, llm, attempt)
+        finally:
+            tracing.flush()
 
-    # define tools exposed to the LLM
+def _run_agent(repo_name, issue_number, max_iterations, base_branch, repo_root, state_dir, llm, attempt):
+    from langchain.agents import initialize_agent, Tool
+    from src.tools.changeset import Changeset
+    # load previous state for this (repo, issue); tool-call records are skipped, not materialized
+    store = StateStore(repo_name, issue_number, root=state_dir)
+    history = [{"iteration": r["iteration"], "result": r["result"]} for r in store.iter_records("iteration")]
+    last = store.last_iteration()
+    iteration = 0 if last is None else last + 1
+
+    with tracing.span("get_issue_data"):
+        issue_data = get_issue_data(repo_name, issue_number, repo_root=repo_root)
+    llm = llm or get_llm()  # long-running callers pass one warm client for every job
+    if tracing.enabled():
+        from src.traced_llm import TracedLLM
+        llm = TracedLLM(llm=llm)
+    # a speculative attempt (src.speculative) always verifies: passing the suite is how it wins the issue branch
+    verify = (lambda: verify_full_suite(repo_root)) if TEST_VERIFY_BEFORE_PR or attempt else None
+    changeset = Changeset(repo_name, issue_number, repo_root=repo_root, base_branch=base_branch, dry_run=DRY_RUN, verify=verify,
+                          claim=attempt.claim if attempt else None, release=attempt.release if attempt else None,
+                          local_branch=attempt.local_branch if attempt else None)
+    cancelled = attempt.cancelled if attempt else None
+
+    # define tools exposed to the LLM (descriptions go through the agent's prompt template: escape braces)
     tools = [
-        Tool(name="read_file", func=lambda p: read_file(p), description="Read a file from the repo by path"),
-        Tool(name="list_repo_tree", func=lambda: __list_tree(repo_root), description="List files in repo"),
-        Tool(name="run_tests", func=lambda: run_tests(), description="Run tests and return results"),
         Tool(
-            name="apply_patch",
-            func=lambda path, new_content, summary: _apply_patch_helper(path, new_content, summary, repo_name, issue_number),
-            description="Provide (path, new_content, commit_summary). Creates a branch, makes a patch, commits and opens a PR. Returns status and URLs."
+            name="read_file",
+            func=lambda query: read_file_query(query, repo_root),
+            description='Read a file from the repo by path. For part of a file use JSON '
+                        '{{"path": ..., "start_line": 1, "end_line": 80}} (or start_byte/end_byte). '
+                        'Very large files return an outline of their top-level definitions.'
         ),
         Tool(
             name="list_repo_tree",
-            func=lambda: __list_tree(repo_root),
-            description="List all tracked files in the repo, respecting .gitignore",
+            func=lambda query="": list_repo_tree(query, repo_root),
+            description='Browse tracked files. Empty input: top-level directories with file counts and sizes. '
+                        'Or JSON {{"prefix": "src/", "summary": true}} for one directory, or '
+                        '{{"prefix": ..., "pattern": "*.py", "page": 1}} for a paged file list.'
+        ),
+        Tool(
+            name="search_code",
+            func=lambda query: search_code(query, repo_root),
+            description='Search tracked files; returns matching lines with path and line number. Input: text to find '
+                        '(case-insensitive), or JSON {{"query": "def .*_handler", "regex": true, "path": "src/*", "limit": 20}}.'
+        ),
+        Tool(
+            name="run_tests",
+            func=lambda mode="": run_tests(mode or "impacted", cwd=repo_root),
+            description='Run tests and return results. Empty input or "impacted": only tests covering files changed '
+                        'since the last full run, in parallel. "full": the whole suite (also run automatically before pushing).'
+        ),
+        Tool(
+            name="stage_edit",
+            func=_json_args(changeset.stage),
+            description='Stage a file edit without publishing it. Input: JSON {{"path": ..., "new_content": ...}}. Stage every file the fix needs, then call commit_changes once.'
+        ),
+        Tool(
+            name="edit_file",
+            func=_json_args(changeset.stage_hunks),
+            description='Stage a targeted edit to an existing file without resending it. Input: JSON '
+                        '{{"path": ..., "edits": [{{"search": "exact existing text", "replace": "new text"}}]}}. '
+                        'Each search text must appear exactly once. Prefer this over stage_edit for small changes to large files.'
+        ),
+        Tool(
+            name="commit_changes",
+            func=lambda summary: changeset.commit(summary),
+            description="Publish all staged edits as one commit on the issue branch, push it, and open the issue's PR (or update it if already open). Input: the commit summary. Returns status and URLs."
+        ),
+        Tool(
+            name="apply_patch",
+            func=_json_args(lambda path, new_content, summary: _apply_patch_helper(changeset, path, new_content, summary)),
+            description='Single-file shortcut for stage_edit + commit_changes. Input: JSON {{"path": ..., "new_content": ..., "summary": ...}}. Returns status and URLs.'
         ),
     ]
+    step = {"iteration": iteration}
+    tools = [_recorded(t, store, step, cancelled) for t in tools]
+    if TOOL_BATCH_WORKERS:
+        funcs = {t.name: t.func for t in tools}
+        tools.append(Tool(
+            name="batch",
+            func=lambda query: batch_query(query, funcs),
+            description='Run several tool calls in one step. Input: JSON list '
+                        '[{{"tool": "read_file", "input": "src/a.py"}}, {{"tool": "search_code", "input": "def parse"}}]; '
+                        'JSON inputs may be given as objects. read_file, list_repo_tree, search_code and run_tests run at the same time; '
+                        'edits and commits run one at a time, in order. Returns every result, numbered.'
+        ))
 
     agent = initialize_agent(
         tools, llm, agent="zero-shot-react-description", verbose=True
     )
 
     start_time = time.time()
+    builder = PromptBuilder(issue_data, INSTRUCTIONS)
+    # lexical pre-selection of likely files, so the model doesn't spend iterations exploring
+    with tracing.span("rank_files"):
+        relevant = rank_files(issue_data, repo_root)
+    if relevant:
+        builder.add_section("relevant_files", relevant)
+    try:
+        _loop(agent, builder, history, store, step, iteration, max_iterations, start_time, cancelled)
+    finally:
+        store.close()
+
+def _loop(agent, builder, history, store, step, iteration, max_iterations, start_time, cancelled=None):
     for i in range(iteration, iteration + max_iterations):
-        # Build prompt with structured data (issue + repo tree summary)
-        prompt = {
-            "issue": {
-                "number": issue_data.get("issue", {}).get("number"),
-                "title": issue_data.get("issue", {}).get("title"),
-                "body": issue_data.get("issue", {}).get("body"),
-                "labels": [l["name"] for l in issue_data.get("issue", {}).get("labels", [])] if issue_data.get("issue") else [],
-            },
-            "comments": issue_data.get("comments", []),
-            "history": history,
-            "instructions": "You are an autonomous developer. Use provided tools to make safe, small changes. When you want to change files, call apply_patch(path, new_content, summary). Stop when the task is complete, by returning the text 'TASK_COMPLETE' in your final response."
-        }
-
-        # The agent.run expects text input: stringify JSON (structured inputs are better than one big blob)
-        prompt_text = json.dumps(prompt, indent=2)
-        result = agent.run(prompt_text)
+        step["iteration"] = i
+        # Build prompt with structured data; static sections are cached, history is compacted to budget
+        try:
+            if cancelled and cancelled():
+                raise Cancelled()
+            with tracing.span("iteration", iteration=i):
+                prompt_text = builder.build(history)
+                result = agent.run(prompt_text)
+        except Cancelled:
+            store.append({"type": "status", "iteration": i, "status": "cancelled"})
+            print("Another attempt published a fix first. Exiting loop.")
+            break
         history.append({"iteration": i, "result": result})
-        save_state(issue_number, history)
+        store.append({"type": "iteration", "iteration": i, "result": result})
 
         # quick stop if agent says task complete
         if "TASK_COMPLETE" in result:
-            save_state(issue_number, history)
+            store.append({"type": "status", "iteration": i, "status": "complete"})
             print("Agent reports task complete. Exiting loop.")
             break
 
         # safety: timeout by wall clock (example 30 minutes)
         if time.time() - start_time > 60 * 30:
             print("Timeout reached; saving state.")
-            save_state(issue_number, history)
+            store.append({"type": "status", "iteration": i, "status": "timeout"})
             break
 
-    # final save
-    save_state(issue_number, history)
-
 # small helpers
-def __list_tree(repo_root="."):
-    import subprocess
-    res = subprocess.run(["git", "ls-tree", "-r", "HEAD", "--name-only"], capture_output=True, text=True, cwd=repo_root)
-    return res.stdout.strip().splitlines()
+def _recorded(tool: "Tool", store: StateStore, step: dict, cancelled=None) -> "Tool":
+    """
+    Wrap a Tool so every call is appended to the state store as a "tool" record.
+    Once cancelled() is true, calls raise Cancelled instead, which ends the agent's run.
+    """
+    from langchain.agents import Tool
+    func = tool.func
+    def wrapper(*args, **kwargs):
+        if cancelled and cancelled():
+            raise Cancelled(f"{tool.name} not run")
+        with tracing.span(f"tool {tool.name}", iteration=step["iteration"]) as span:
+            output = func(*args, **kwargs)
+            if span.recording:
+                span.set(output_chars=len(str(output)))
+        store.append({"type": "tool", "iteration": step["iteration"], "tool": tool.name,
+                      "input": args[0] if len(args) == 1 else list(args) or kwargs, "output": output})
+        return output
+    return Tool(name=tool.name, func=wrapper, description=tool.description)
+
+def _json_args(func):
+    """Adapt a keyword-argument function to a Tool, whose single string input must be a JSON object."""
+    def wrapper(tool_input: str):
+        try:
+            return func(**json.loads(tool_input))
+        except (ValueError, TypeError) as e:
+            return f"Invalid tool input, expected a JSON object with the documented keys: {e}"
+    return wrapper
 
-def _apply_patch_helper(path: str, new_content: str, summary: str, repo_name: str, issue_number: int):
+def _apply_patch_helper(changeset: "Changeset", path: str, new_content: str, summary: str):
     """
-    Called by the agent via the Tool. We create a descriptive branch name using timestamp/issue/iteration.
+    Called by the agent via the Tool. Goes through the issue's changeset, so the commit lands on the
+    issue branch (agent/issue-<n>) together with anything already staged, and reuses the issue's PR.
     """
-    import datetime, hashlib
-    ts = datetime.datetime.utcnow().strftime("%Y%m%d%H%M%S")
-    h = hashlib.sha1((path + summary + ts).encode()).hexdigest()[:7]
-    branch_name = f"agent/issue-{issue_number}/{h}"
-    return apply_file_patch(path, new_content, repo_name, branch_name, summary, issue_number, dry_run=DRY_RUN)
+    changeset.stage(path, new_content)
+    return changeset.commit(summary)
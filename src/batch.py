@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.config import WORKTREE_ROOT, BATCH_WORKERS
+from src.ai_agent import run_agent
+from src.tools import git_utils, mirror
+
+def worktree_path(repo_name: str, issue_number: int) -> str:
+    return os.path.abspath(os.path.join(WORKTREE_ROOT, repo_name, f"issue-{issue_number}"))
+
+def _run_issue(repo_name, issue_number, repo_root, base_branch, max_iterations, keep_worktree, llm=None, base_sha=None):
+    """One issue in a fresh worktree off repo_root (None: the repo's mirror), at base_sha if given."""
+    path = worktree_path(repo_name, issue_number)
+    if os.path.exists(path):
+        git_utils.remove_worktree(path, cwd=repo_root or mirror.mirror_path(repo_name))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    repo_root = mirror.add_worktree(repo_name, path, base_branch, base_sha=base_sha, repo_root=repo_root)
+    try:
+        run_agent(repo_name, issue_number, max_iterations, base_branch=base_branch, repo_root=path, llm=llm)
+    finally:
+        if not keep_worktree:
+            git_utils.remove_worktree(path, cwd=repo_root)
+
+def run_batch(repo_name, issue_numbers, max_workers=BATCH_WORKERS, repo_root=None, base_branch="main", max_iterations=10, keep_worktrees=False) -> dict:
+    """
+    Run the agent on several issues at once.
+    Every issue gets its own git worktree off one shared repository: the clone at repo_root if given,
+    otherwise the repo's bare mirror under MIRROR_ROOT. Branches and index changes in one worker never
+    touch another, and agent state is already keyed by (repo, issue). Workers are threads: the work is
+    dominated by LLM, git and HTTP waits, and threads share the GitHub session and rate-limit scheduler.
+    Returns {issue_number: {"status": "done"} | {"status": "error", "error": str}}.
+    """
+    if repo_root is None:
+        repo_root = mirror.ensure_mirror(repo_name)
+    else:
+        git_utils.fetch(cwd=repo_root)
+    # every issue starts from the same base commit, which is then present: no worker fetches again
+    base_sha = git_utils._run(["git", "rev-parse", f"origin/{base_branch}"], cwd=repo_root).stdout.strip()
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_run_issue, repo_name, n, repo_root, base_branch, max_iterations, keep_worktrees, base_sha=base_sha): n
+            for n in issue_numbers
+        }
+        for future in as_completed(futures):
+            n = futures[future]
+            try:
+                future.result()
+                results[n] = {"status": "done"}
+            except Exception as e:
+                results[n] = {"status": "error", "error": str(e)}
+                print(f"Issue #{n} failed: {e}")
+    return results
@@ -0,0 +1,46 @@
+from typing import Any, List, Optional
+from langchain_core.language_models.llms import LLM
+from src.llm_cache import LLMCache, ReplayMissError
+
+class CachedLLM(LLM):
+    """
+    Wraps a langchain LLM with the on-disk LLMCache.
+
+    mode "readwrite" serves hits and stores misses; "record" always calls the model and stores the
+    result; "replay" only serves recorded completions and raises ReplayMissError otherwise, so a whole
+    run_agent session can be re-run deterministically without a single model call.
+    variant, if set, is part of every key, so callers sampling the same prompt independently (speculative
+    attempts at one temperature) each get their own completions instead of replaying each other's.
+    """
+    llm: Any
+    provider: str
+    store: Any
+    mode: str = "readwrite"
+    variant: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return f"cached-{self.llm._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"provider": self.provider, "mode": self.mode, **self.llm._identifying_params}
+
+    def _cache_key(self, prompt: str, stop: Optional[List[str]], kwargs: dict) -> str:
+        params = dict(self.llm._identifying_params, stop=stop, **kwargs)
+        if self.variant is not None:
+            params["variant"] = self.variant
+        model = params.get("model") or params.get("model_name") or ""
+        return LLMCache.key(self.provider, model, prompt, params)
+
+    def _call(self, prompt: str, stop: Optional[List[str]]=None, run_manager=None, **kwargs: Any) -> str:
+        key = self._cache_key(prompt, stop, kwargs)
+        if self.mode in ("readwrite", "replay"):
+            hit = self.store.get(key)
+            if hit is not None:
+                return hit
+        if self.mode == "replay":
+            raise ReplayMissError(f"No recorded completion for prompt (key {key[:12]}); re-record the session.")
+        completion = self.llm.invoke(prompt, stop=stop, **kwargs)
+        self.store.put(key, completion, {"provider": self.provider, "prompt": prompt}, evict=self.mode == "readwrite")
+        return completion
@@ -2,10 +2,103 @@ import os
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 REPO_OWNER = "davidgraymi"
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")  # point at a stand-in for offline runs
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "8"))  # max concurrent connections to the GitHub API
+
+# request scheduler: initial token bucket, re-tuned from X-RateLimit-* response headers
+GITHUB_RATE_BURST = int(os.getenv("GITHUB_RATE_BURST", "20"))
+GITHUB_RATE_PER_SEC = float(os.getenv("GITHUB_RATE_PER_SEC", "10"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+GITHUB_BACKOFF_BASE = float(os.getenv("GITHUB_BACKOFF_BASE", "1"))  # seconds
+GITHUB_BACKOFF_MAX = float(os.getenv("GITHUB_BACKOFF_MAX", "60"))  # seconds
 
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")  # "openai" or "ollama"
 LLM_MODEL = os.getenv("LLM_MODEL", "llama3:8b")
+LLM_STREAM = bool(int(os.getenv("LLM_STREAM", "1")))  # stream and stop as soon as an action / TASK_COMPLETE is seen
+
+# LLM response cache: "off", "readwrite" (serve hits, store misses), "record" or "replay" (never calls the model)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "readwrite")
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(".agent_cache", "llm"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# prompt assembly: token budget per section; older history is compacted into short summaries
+PROMPT_BUDGET_ISSUE = int(os.getenv("PROMPT_BUDGET_ISSUE", "1500"))
+PROMPT_BUDGET_COMMENTS = int(os.getenv("PROMPT_BUDGET_COMMENTS", "2000"))
+PROMPT_BUDGET_HISTORY = int(os.getenv("PROMPT_BUDGET_HISTORY", "2500"))
+PROMPT_KEEP_RECENT = int(os.getenv("PROMPT_KEEP_RECENT", "3"))  # iterations kept verbatim
+PROMPT_SUMMARY_CHARS = int(os.getenv("PROMPT_SUMMARY_CHARS", "200"))
+
+# append-only agent state, one JSONL file per (repo, issue)
+STATE_DIR = os.getenv("STATE_DIR", ".agent_state")
+STATE_FSYNC_EVERY = int(os.getenv("STATE_FSYNC_EVERY", "16"))  # records between fsyncs
+STATE_FSYNC_INTERVAL = float(os.getenv("STATE_FSYNC_INTERVAL", "5"))  # max seconds between fsyncs
+
+# on-disk cache for GitHub API reads (revalidated with ETag / Last-Modified)
+HTTP_CACHE_ENABLED = bool(int(os.getenv("HTTP_CACHE_ENABLED", "1")))
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", os.path.join(".agent_cache", "http"))
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(7 * 24 * 3600)))  # seconds
+HTTP_CACHE_GRAPHQL_TTL = int(os.getenv("HTTP_CACHE_GRAPHQL_TTL", "300"))  # GraphQL has no validators; cache by age
+
+# local git: fetch each repo at most once per interval; batch workers branch off a shared bare mirror
+FETCH_INTERVAL = int(os.getenv("FETCH_INTERVAL", "300"))  # seconds
+MIRROR_ROOT = os.getenv("MIRROR_ROOT", os.path.join(".agent_cache", "mirrors"))
+
+# repository tree index, cached per commit SHA
+TREE_CACHE_DIR = os.getenv("TREE_CACHE_DIR", os.path.join(".agent_cache", "trees"))
+TREE_PAGE_SIZE = int(os.getenv("TREE_PAGE_SIZE", "200"))
+TREE_KEEP_COMMITS = int(os.getenv("TREE_KEEP_COMMITS", "50"))  # most recently used commits whose index stays on disk
+
+# read_file: cached whole-file reads, mmap-backed ranges, outline instead of content past READ_MAX_BYTES
+READ_MAX_BYTES = int(os.getenv("READ_MAX_BYTES", str(256 * 1024)))
+READ_CACHE_BYTES = int(os.getenv("READ_CACHE_BYTES", str(32 * 1024 * 1024)))
+READ_MMAP_THRESHOLD = int(os.getenv("READ_MMAP_THRESHOLD", str(1024 * 1024)))
+READ_OUTLINE_LINES = int(os.getenv("READ_OUTLINE_LINES", "40"))
+
+# search_code: persistent trigram index over tracked files
+SEARCH_INDEX_DIR = os.getenv("SEARCH_INDEX_DIR", os.path.join(".agent_cache", "search"))
+SEARCH_MAX_FILE_BYTES = int(os.getenv("SEARCH_MAX_FILE_BYTES", str(2 * 1024 * 1024)))  # larger files aren't indexed
+SEARCH_RESULT_LIMIT = int(os.getenv("SEARCH_RESULT_LIMIT", "50"))
+
+# relevant-file pre-selection: BM25 over paths, declarations and docstrings, cached per commit
+RETRIEVAL_INDEX_DIR = os.getenv("RETRIEVAL_INDEX_DIR", os.path.join(".agent_cache", "retrieval"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))  # files suggested in the prompt; 0 disables
+RETRIEVAL_KEEP_COMMITS = int(os.getenv("RETRIEVAL_KEEP_COMMITS", "20"))  # commits whose documents survive pruning
+
+# run_tests: impacted-test selection from per-commit coverage maps, parallel shards, per-run timeout
+TEST_MAP_DIR = os.getenv("TEST_MAP_DIR", os.path.join(".agent_cache", "testmap"))
+TEST_TIMEOUT = int(os.getenv("TEST_TIMEOUT", "900"))  # seconds per pytest process
+TEST_WORKERS = int(os.getenv("TEST_WORKERS", str(os.cpu_count() or 1)))
+TEST_RESULTS_DIR = os.getenv("TEST_RESULTS_DIR", os.path.join(".agent_cache", "testresults"))  # memoized by tree state
+TEST_FAILURE_CHARS = int(os.getenv("TEST_FAILURE_CHARS", "2000"))  # failure output kept per test
+TEST_MAX_FAILURES = int(os.getenv("TEST_MAX_FAILURES", "5"))  # failures included in the summary
+TEST_VERIFY_BEFORE_PR = bool(int(os.getenv("TEST_VERIFY_BEFORE_PR", "1")))  # full suite must pass before pushing
+
+# batch tool: several tool calls in one agent step; consecutive read-only calls run concurrently
+TOOL_BATCH_WORKERS = int(os.getenv("TOOL_BATCH_WORKERS", "4"))  # 0 disables the batch tool
+TOOL_BATCH_MAX_CALLS = int(os.getenv("TOOL_BATCH_MAX_CALLS", "10"))
+
+# batch mode: one git worktree per issue, created off the shared clone
+WORKTREE_ROOT = os.getenv("WORKTREE_ROOT", os.path.join(".agent_cache", "worktrees"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# speculative mode: N independent attempts per issue, each in its own worktree at its own temperature, on a
+# process pool; the first attempt whose commit passes the full suite publishes the PR and the others stop
+SPECULATIVE_ATTEMPTS = int(os.getenv("SPECULATIVE_ATTEMPTS", "3"))
+SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", str(os.cpu_count() or 1)))  # lower it to match LLM capacity
+SPECULATIVE_TEMPERATURES = [float(t) for t in os.getenv("SPECULATIVE_TEMPERATURES", "0.2,0.6,1.0").split(",")]
+
+# server mode: webhook endpoint and queue directory feeding a bounded pool of warm workers
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8080"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "2"))
+SERVER_QUEUE_DIR = os.getenv("SERVER_QUEUE_DIR")  # unset: no queue directory, webhook only
+SERVER_POLL_INTERVAL = float(os.getenv("SERVER_POLL_INTERVAL", "2"))
+SERVER_KEEP_JOBS = int(os.getenv("SERVER_KEEP_JOBS", "200"))  # finished jobs still listed by GET /jobs
+SERVER_WEBHOOK_SECRET = os.getenv("SERVER_WEBHOOK_SECRET")  # if set, deliveries must carry a valid X-Hub-Signature-256
 
-STATE_FILE = ".agent_state.json"
+# tracing: spans for iterations, tool calls, LLM requests, subprocesses and HTTP calls; both unset: tracing off
+TRACE_FILE = os.getenv("TRACE_FILE")  # one JSON object per finished span, appended
+METRICS_FILE = os.getenv("METRICS_FILE")  # Prometheus text format, rewritten after each session and at exit
 
 DRY_RUN = bool(int(os.getenv("DRY_RUN", "1")))
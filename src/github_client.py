@@ -1,34 +1,211 @@
+import json
+import time
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import urlparse, parse_qs
 import requests
-from src.config import GITHUB_TOKEN, REPO_OWNER
-
-BASE_URL = "https://api.github.com"
-
-def get_issue_data(repo_name, issue_number):
-    headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github+json", "User-Agent": REPO_OWNER}
-    issue = requests.get(f"{BASE_URL}/repos/{REPO_OWNER}/{repo_name}/issues/{issue_number}", headers=headers).json()
-    comments = requests.get(f"{BASE_URL}/repos/{REPO_OWNER}/{repo_name}/issues/{issue_number}/comments", headers=headers).json()
-
-    # simple tree snapshot (recursive)
-    tree = requests.get(f"{BASE_URL}/repos/{REPO_OWNER}/{repo_name}/git/trees/main?recursive=1", headers=headers).json()
-
-    # GraphQL example for projects/epics (simplified — you can extend)
-    graphql_url = "https://api.github.com/graphql"
-    graphql_query = """
-    query($owner:String!, $name:String!, $number:Int!) {
-      repository(owner:$owner, name:$name) {
-        issue(number:$number) {
-          number
-          title
-          labels(first:10) { nodes { name } }
-          milestone { title, number }
-          projectCards(first:10) { nodes { project { name } } }
-        }
-      }
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from src.config import GITHUB_TOKEN, GITHUB_API_URL, REPO_OWNER, GITHUB_POOL_SIZE, HTTP_CACHE_GRAPHQL_TTL
+from src.http_cache import get_cache
+from src.github_scheduler import get_scheduler, resource_for
+from src import tracing
+
+BASE_URL = GITHUB_API_URL
+GRAPHQL_URL = f"{BASE_URL}/graphql"
+PER_PAGE = 100
+
+GRAPHQL_ISSUE_QUERY = """
+query($owner:String!, $name:String!, $number:Int!) {
+  repository(owner:$owner, name:$name) {
+    issue(number:$number) {
+      number
+      title
+      labels(first:10) { nodes { name } }
+      milestone { title, number }
+      projectCards(first:10) { nodes { project { name } } }
     }
+  }
+}
+"""
+
+_session = None
+_session_lock = threading.Lock()
+
+def _headers() -> dict:
+    return {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github+json", "User-Agent": REPO_OWNER}
+
+def get_session() -> requests.Session:
     """
-    gh_headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github+json", "User-Agent": REPO_OWNER}
-    resp = requests.post(graphql_url, json={"query": graphql_query, "variables":{"owner":REPO_OWNER,"name":repo_name,"number": issue_number}}, headers=gh_headers)
-    graphql_data = {}
+    Return the process-wide keep-alive session used for every GitHub call.
+    The connection pool is sized so concurrent fetches don't queue on sockets.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=GITHUB_POOL_SIZE, pool_maxsize=GITHUB_POOL_SIZE)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                s.headers.update(_headers())
+                _session = s
+    return _session
+
+def _from_cache(entry: dict) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = entry["status"]
+    resp.url = entry["url"]
+    resp.headers = CaseInsensitiveDict(entry["headers"])
+    resp._content = entry["body"].encode("utf-8")
+    resp.encoding = "utf-8"
+    return resp
+
+def _traced(method: str, url: str, send: Callable[[], requests.Response]) -> requests.Response:
+    """One HTTP attempt as an "http <METHOD>" span carrying the status and body sizes."""
+    with tracing.span(f"http {method}", url=url) as span:
+        resp = send()
+        if span.recording:
+            span.set(status=resp.status_code, bytes_in=len(resp.content), bytes_out=len(resp.request.body or b""))
+        return resp
+
+def _scheduled_get(url: str, params: dict, headers: dict) -> requests.Response:
+    # identical in-flight GETs (same URL, query and validators) share one request
+    coalesce_key = ("GET", url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())), tuple(sorted(headers.items())))
+    return get_scheduler().request(lambda: _traced("GET", url, lambda: get_session().get(url, params=params, headers=headers)), coalesce_key,
+                                   resource_for(url))
+
+def _get(url: str, params: dict=None) -> requests.Response:
+    """
+    GET through the on-disk cache: a cached entry is revalidated with its ETag / Last-Modified,
+    and a 304 (which GitHub does not count against the rate limit) is answered from disk.
+    """
+    cache = get_cache()
+    if cache is None:
+        return _scheduled_get(url, params, {})
+
+    key = cache.key("GET", url, params)
+    entry = cache.get(key)
+    conditional = {}
+    if entry:
+        if "ETag" in entry["headers"]:
+            conditional["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            conditional["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+
+    resp = _scheduled_get(url, params, conditional)
+    if resp.status_code == 304 and entry:
+        cache.touch(key)
+        return _from_cache(entry)
+    if resp.status_code == 200 and ("ETag" in resp.headers or "Last-Modified" in resp.headers):
+        cache.put(key, url, resp.status_code, resp.headers, resp.text)
+    return resp
+
+def post(url: str, payload: dict) -> requests.Response:
+    """POST over the shared session. Writes are never cached or coalesced."""
+    return get_scheduler().request(lambda: _traced("POST", url, lambda: get_session().post(url, json=payload)),
+                                   resource=resource_for(url))
+
+def _last_page(resp: requests.Response) -> int:
+    last = resp.links.get("last", {}).get("url")
+    if not last:
+        return 1
+    page = parse_qs(urlparse(last).query).get("page", ["1"])[0]
+    return int(page)
+
+def get_all_pages(url: str, params: dict=None, executor: ThreadPoolExecutor=None) -> list:
+    """
+    Fetch every page of a paginated list endpoint.
+    The first page tells us (via the Link header) how many pages exist; the rest are fetched in parallel.
+    Non-list payloads (e.g. an error document) are returned unchanged.
+    """
+    params = dict(params or {})
+    params.setdefault("per_page", PER_PAGE)
+    first = _get(url, params)
+    data = first.json()
+    if not isinstance(data, list):
+        return data
+
+    last = _last_page(first)
+    if last <= 1:
+        if "next" in first.links:
+            # no "last" relation: walk sequentially
+            next_url = first.links["next"]["url"]
+            while next_url:
+                resp = _get(next_url)
+                data.extend(resp.json())
+                next_url = resp.links.get("next", {}).get("url")
+        return data
+
+    def fetch(page):
+        return _get(url, {**params, "page": page}).json()
+
+    pages = range(2, last + 1)
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=GITHUB_POOL_SIZE) as pool:
+            rest = list(pool.map(tracing.bind(fetch), pages))
+    else:
+        rest = list(executor.map(tracing.bind(fetch), pages))
+    for chunk in rest:
+        if isinstance(chunk, list):
+            data.extend(chunk)
+    return data
+
+def _graphql(query: str, variables: dict) -> dict:
+    payload = {"query": query, "variables": variables}
+    cache = get_cache()
+    key = None
+    if cache is not None:
+        # GraphQL responses carry no validators, so a short freshness window is the best we can do
+        key = cache.key("POST", GRAPHQL_URL, None, payload)
+        entry = cache.get(key)
+        if entry and time.time() - entry["stored_at"] < HTTP_CACHE_GRAPHQL_TTL:
+            return json.loads(entry["body"]).get("data", {})
+
+    resp = post(GRAPHQL_URL, payload)
     if resp.status_code == 200:
-        graphql_data = resp.json().get("data", {})
-    return {"issue": issue, "comments": comments, "tree": tree, "graphql": graphql_data}
+        if key is not None:
+            cache.put(key, GRAPHQL_URL, resp.status_code, resp.headers, resp.text)
+        return resp.json().get("data", {})
+    return {}
+
+def _tree(repo_url: str, repo_root: str=None) -> dict:
+    if repo_root is not None:
+        # a local clone answers this from the cached per-commit index instead of a large API download
+        from src.tools.tree_index import get_index
+        try:
+            return get_index(repo_root).to_github_tree()
+        except subprocess.CalledProcessError:
+            pass
+    return _get(f"{repo_url}/git/trees/main", {"recursive": 1}).json()
+
+def get_issue_data(repo_name, issue_number, repo_root=None):
+    repo_url = f"{BASE_URL}/repos/{REPO_OWNER}/{repo_name}"
+    # the comment pager shares the outer pool, so it needs room beyond the four top-level requests
+    with ThreadPoolExecutor(max_workers=4 + GITHUB_POOL_SIZE) as pool:
+        issue_f = pool.submit(tracing.bind(lambda: _get(f"{repo_url}/issues/{issue_number}").json()))
+        comments_f = pool.submit(tracing.bind(get_all_pages), f"{repo_url}/issues/{issue_number}/comments", None, pool)
+        # simple tree snapshot (recursive)
+        tree_f = pool.submit(tracing.bind(_tree), repo_url, repo_root)
+        # GraphQL example for projects/epics (simplified — you can extend)
+        graphql_f = pool.submit(
+            tracing.bind(_graphql), GRAPHQL_ISSUE_QUERY, {"owner": REPO_OWNER, "name": repo_name, "number": issue_number}
+        )
+        return {
+            "issue": issue_f.result(),
+            "comments": comments_f.result(),
+            "tree": tree_f.result(),
+            "graphql": graphql_f.result(),
+        }
+
+def list_issues(repo_name, labels=None, state="open"):
+    """Return the numbers of issues (not pull requests) matching labels, across every page."""
+    params = {"state": state}
+    if labels:
+        params["labels"] = ",".join(labels)
+    issues = get_all_pages(f"{BASE_URL}/repos/{REPO_OWNER}/{repo_name}/issues", params)
+    if not isinstance(issues, list):
+        raise RuntimeError(f"Could not list issues for {repo_name}: {issues}")
+    return [i["number"] for i in issues if "pull_request" not in i]
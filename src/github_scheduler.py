@@ -0,0 +1,232 @@
+import time
+import random
+import threading
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Future
+from typing import Callable, Hashable, Optional
+from src.config import GITHUB_RATE_BURST, GITHUB_RATE_PER_SEC, GITHUB_MAX_RETRIES, GITHUB_BACKOFF_BASE, GITHUB_BACKOFF_MAX
+
+class _Bucket:
+    """Token bucket for one GitHub rate-limit resource (core, search, graphql, ...)."""
+    def __init__(self, burst: int, rate: float):
+        self.tokens = float(burst)
+        self.rate = rate
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+
+class GitHubScheduler:
+    """
+    Central gate for GitHub API calls.
+
+    GitHub meters each rate-limit resource (core REST, search, graphql, ...) separately, so each gets its
+    own token bucket. A bucket's refill rate is re-derived from every response's X-RateLimit-Remaining /
+    X-RateLimit-Reset, for the resource named by X-RateLimit-Resource, so the remaining quota is spread
+    evenly until the reset. Rate-limited responses are retried: an exhausted quota pauses the callers of
+    that resource until the reset, while 429s and secondary limits pause every caller for Retry-After or
+    a jittered exponential backoff. Identical GETs that are already in flight are coalesced onto a single request.
+    """
+    def __init__(self, burst: int = GITHUB_RATE_BURST, rate: float = GITHUB_RATE_PER_SEC, max_retries: int = GITHUB_MAX_RETRIES,
+                 backoff_base: float = GITHUB_BACKOFF_BASE, backoff_max: float = GITHUB_BACKOFF_MAX):
+        self.burst = burst
+        self.rate = rate  # initial rate of every bucket, until a response says otherwise
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets = {}
+        self._blocked_until = 0.0  # secondary limits: every resource waits
+        self._cond = threading.Condition()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "coalesced": 0,
+            "queue_depth": 0,
+            "max_queue_depth": 0,
+            "wait_seconds": 0.0,
+        }
+
+    def _bucket(self, resource: str) -> _Bucket:
+        bucket = self._buckets.get(resource)
+        if bucket is None:
+            bucket = self._buckets[resource] = _Bucket(self.burst, self.rate)
+        return bucket
+
+    def stats(self) -> dict:
+        """Counters, plus tokens and rate of the core bucket and of every bucket under "buckets"."""
+        with self._cond:
+            core = self._bucket("core")
+            buckets = {name: {"tokens": b.tokens, "rate": b.rate} for name, b in self._buckets.items()}
+            return dict(self.counters, tokens=core.tokens, rate=core.rate, buckets=buckets)
+
+    def request(self, send: Callable[[], object], coalesce_key: Optional[Hashable] = None, resource: str = "core"):
+        """
+        Run send() (a zero-argument callable returning a requests.Response) under the rate limit of resource.
+        Pass coalesce_key for idempotent reads; concurrent calls with the same key share one response.
+        """
+        if coalesce_key is None:
+            return self._send_with_retries(send, resource)
+
+        with self._inflight_lock:
+            future = self._inflight.get(coalesce_key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[coalesce_key] = future
+        if not leader:
+            with self._cond:
+                self.counters["coalesced"] += 1
+            return future.result()
+
+        try:
+            resp = self._send_with_retries(send, resource)
+            future.set_result(resp)
+            return resp
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(coalesce_key, None)
+
+    def _send_with_retries(self, send, resource: str):
+        attempt = 0
+        while True:
+            self._acquire(resource)
+            resp = send()
+            with self._cond:
+                self.counters["requests"] += 1
+            self._observe(resp, resource)
+            if not _is_rate_limited(resp):
+                return resp
+            with self._cond:
+                self.counters["rate_limited"] += 1
+            if attempt >= self.max_retries:
+                return resp
+            self._block_for(self._retry_delay(resp, attempt), _exhausted_resource(resp, resource))
+            attempt += 1
+            with self._cond:
+                self.counters["retries"] += 1
+
+    def _acquire(self, resource: str) -> None:
+        with self._cond:
+            bucket = self._bucket(resource)
+            self.counters["queue_depth"] += 1
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self.counters["queue_depth"])
+            start = time.monotonic()
+            try:
+                while True:
+                    now = time.monotonic()
+                    blocked_until = max(self._blocked_until, bucket.blocked_until)
+                    if now < blocked_until:
+                        self._cond.wait(blocked_until - now)
+                        continue
+                    self._refill(bucket, now)
+                    if bucket.tokens >= 1:
+                        bucket.tokens -= 1
+                        return
+                    self._cond.wait((1 - bucket.tokens) / bucket.rate)
+            finally:
+                self.counters["queue_depth"] -= 1
+                self.counters["wait_seconds"] += time.monotonic() - start
+
+    def _refill(self, bucket: _Bucket, now: float) -> None:
+        bucket.tokens = min(float(self.burst), bucket.tokens + (now - bucket.last_refill) * bucket.rate)
+        bucket.last_refill = now
+
+    def _observe(self, resp, resource: str) -> None:
+        headers = getattr(resp, "headers", None) or {}
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        remaining = int(remaining)
+        window = max(1.0, float(reset) - time.time())
+        with self._cond:
+            bucket = self._bucket(headers.get("X-RateLimit-Resource") or resource)
+            self._refill(bucket, time.monotonic())
+            bucket.tokens = min(bucket.tokens, float(remaining))
+            # spread what's left of the quota over the time until it resets
+            bucket.rate = max(remaining, 1) / window
+            if remaining == 0:
+                bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + window)
+            self._cond.notify_all()
+
+    def _retry_delay(self, resp, attempt: int) -> float:
+        headers = getattr(resp, "headers", None) or {}
+        retry_after = _seconds_until(headers.get("Retry-After"))
+        if retry_after is not None:
+            return retry_after
+        if headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset"):
+            return max(0.0, float(headers["X-RateLimit-Reset"]) - time.time())
+        # secondary limit without guidance: exponential backoff with equal jitter
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    def _block_for(self, delay: float, resource: Optional[str] = None) -> None:
+        """Pause the callers of resource, or every caller if resource is None."""
+        with self._cond:
+            until = time.monotonic() + delay
+            if resource is None:
+                self._blocked_until = max(self._blocked_until, until)
+            else:
+                bucket = self._bucket(resource)
+                bucket.blocked_until = max(bucket.blocked_until, until)
+            self._cond.notify_all()
+
+def _seconds_until(retry_after: Optional[str]) -> Optional[float]:
+    """A Retry-After value (delay in seconds or an HTTP-date) as seconds from now; None if missing or unparseable."""
+    if retry_after is None:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)  # HTTP-dates are always GMT
+    return max(0.0, when.timestamp() - time.time())
+
+def _exhausted_resource(resp, resource: str) -> Optional[str]:
+    """The resource whose primary quota resp reports as used up, or None for 429s and secondary limits."""
+    headers = getattr(resp, "headers", None) or {}
+    if headers.get("X-RateLimit-Remaining") == "0" and "Retry-After" not in headers:
+        return headers.get("X-RateLimit-Resource") or resource
+    return None
+
+def resource_for(url: str) -> str:
+    """The rate-limit resource a GitHub API URL counts against."""
+    path = url.split("://", 1)[-1].split("?", 1)[0]
+    if path.endswith("/graphql"):
+        return "graphql"
+    if "/search/" in path:
+        return "search"
+    return "core"
+
+def _is_rate_limited(resp) -> bool:
+    status = getattr(resp, "status_code", 200)
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    headers = getattr(resp, "headers", None) or {}
+    if "Retry-After" in headers or headers.get("X-RateLimit-Remaining") == "0":
+        return True
+    return "rate limit" in (getattr(resp, "text", "") or "").lower()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> GitHubScheduler:
+    """Return the scheduler shared by every GitHub call in this process."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = GitHubScheduler()
+    return _scheduler
@@ -0,0 +1,129 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Optional
+from src.config import HTTP_CACHE_ENABLED, HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_MAX_AGE
+
+# response headers worth keeping: validators plus what callers read back (pagination, content type).
+# Rate-limit headers are left out: a stored copy is stale, and the scheduler reads them from live responses.
+KEPT_HEADERS = ("ETag", "Last-Modified", "Link", "Content-Type")
+
+class HttpCache:
+    """
+    Persistent response cache for GitHub API reads.
+    One JSON file per (method, url, query, body). Entries are revalidated by the caller with
+    If-None-Match / If-Modified-Since and evicted once the cache grows past max_bytes (least recently
+    used first) or an entry was last stored or revalidated more than max_age seconds ago. A file's mtime
+    is that store/revalidation time and its atime, set on every read, the last use.
+    """
+    def __init__(self, root: str = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX_BYTES, max_age: int = HTTP_CACHE_MAX_AGE):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._total = None  # bytes on disk: the last evict() scan plus this process's writes since
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(method: str, url: str, params: Optional[dict] = None, body=None) -> str:
+        query = sorted((str(k), str(v)) for k, v in (params or {}).items())
+        raw = json.dumps([method.upper(), url, query, body], sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            st = os.stat(path)
+            if time.time() - st.st_mtime > self.max_age:
+                self._remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path, (time.time(), st.st_mtime))
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key: str, url: str, status: int, headers: dict, body: str) -> None:
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": {h: headers[h] for h in KEPT_HEADERS if h in headers},
+            "body": body,
+        }
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        written = os.path.getsize(path)
+        with self._lock:
+            if self._total is not None:
+                self._total += written - replaced
+            over = self._total is None or self._total > self.max_bytes
+        if over:
+            self.evict()
+
+    def touch(self, key: str) -> None:
+        """Restart an entry's max_age clock after a successful revalidation."""
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+
+    def evict(self) -> None:
+        with self._lock:
+            now = time.time()
+            entries = []
+            for e in os.scandir(self.root):
+                if not e.name.endswith(".json"):
+                    continue
+                st = e.stat()
+                if now - st.st_mtime > self.max_age:
+                    self._remove(e.path)
+                else:
+                    entries.append((st.st_atime, st.st_size, e.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+            self._total = total
+
+    def clear(self) -> None:
+        for e in os.scandir(self.root):
+            self._remove(e.path)
+        with self._lock:
+            self._total = None
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[HttpCache]:
+    """Return the shared cache, or None when HTTP_CACHE_ENABLED is off."""
+    global _cache
+    if not HTTP_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache()
+    return _cache
@@ -0,0 +1,73 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Optional
+from src.config import LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES
+
+MODES = ("off", "readwrite", "record", "replay")
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode when a prompt was not recorded; replay never calls the model."""
+
+class LLMCache:
+    """
+    Content-addressed store of LLM completions, one JSON file per (provider, model, prompt, params).
+    Hits touch the file, and entries are evicted least-recently-used first once the store passes
+    max_bytes. A recorded session is only deterministic if nothing is evicted, so callers recording or
+    replaying a session pass evict=False to put().
+    """
+    def __init__(self, root: str=LLM_CACHE_DIR, max_bytes: int=LLM_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def key(provider: str, model: str, prompt: str, params: dict) -> str:
+        raw = json.dumps([provider, model, prompt, params], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".json")
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["completion"]
+
+    def put(self, key: str, completion: str, meta: Optional[dict]=None, evict: bool=True) -> None:
+        entry = {**(meta or {}), "completion": completion, "stored_at": time.time()}
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+        if evict:
+            self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            entries = []
+            for e in os.scandir(self.root):
+                if e.name.endswith(".json"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                total -= size
@@ -0,0 +1,101 @@
+import re
+from typing import Any, Iterable, List, Optional, Sequence
+from langchain_core.language_models.llms import LLM
+
+ACTION_INPUT = re.compile(r"Action\s*\d*\s*Input\s*\d*\s*:")
+FINAL_ANSWER = re.compile(r"Final Answer\s*:")
+COMPLETE_MARKER = "TASK_COMPLETE"
+
+def _balanced_end(text: str, start: int) -> Optional[int]:
+    """Index just past the JSON object/array starting at text[start], or None if it isn't closed yet."""
+    depth, in_string, escaped = 0, False, False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+def _action_input_end(text: str, start: int) -> Optional[int]:
+    i = start
+    while i < len(text) and text[i].isspace():
+        i += 1
+    if i >= len(text):
+        return None
+    if text[i] in "{[":
+        return _balanced_end(text, i)
+    newline = text.find("\n", i)
+    return newline if newline != -1 else None
+
+def find_cut(text: str, stop: Sequence[str]=()) -> Optional[int]:
+    """
+    Return where a ReAct completion can be cut because nothing after it will be used, or None to keep going.
+    That is right after the TASK_COMPLETE marker in a final answer, right after a complete Action Input
+    (a closed JSON value, or the end of its line), or at a stop sequence, whichever comes first.
+    """
+    cut = None
+    for s in stop:
+        idx = text.find(s)
+        if idx != -1 and (cut is None or idx < cut):
+            cut = idx
+    final = FINAL_ANSWER.search(text)
+    if final:
+        idx = text.find(COMPLETE_MARKER, final.end())
+        if idx != -1:
+            end = idx + len(COMPLETE_MARKER)
+            return end if cut is None else min(cut, end)
+        return cut
+    action = ACTION_INPUT.search(text)
+    if action:
+        end = _action_input_end(text, action.end())
+        if end is not None:
+            return end if cut is None else min(cut, end)
+    return cut
+
+def take_until_done(chunks: Iterable[str], stop: Sequence[str]=(), on_chunk=None) -> str:
+    """Consume streamed chunks until find_cut() fires, then stop pulling (which ends generation)."""
+    text = ""
+    for chunk in chunks:
+        if on_chunk is not None:
+            on_chunk(chunk)
+        text += chunk
+        cut = find_cut(text, stop)
+        if cut is not None:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+            return text[:cut]
+    cut = find_cut(text, stop)
+    return text if cut is None else text[:cut]
+
+class StreamingLLM(LLM):
+    """
+    Streams from the wrapped Ollama/OpenAI LLM and returns as soon as the completion holds everything
+    the ReAct agent will use: a full action, or a final answer containing TASK_COMPLETE. Closing the
+    stream early stops the backend from generating the tokens the model would ramble on with.
+    """
+    llm: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.llm._identifying_params
+
+    def _call(self, prompt: str, stop: Optional[List[str]]=None, run_manager=None, **kwargs: Any) -> str:
+        on_chunk = run_manager.on_llm_new_token if run_manager is not None else None
+        return take_until_done(self.llm.stream(prompt, stop=stop, **kwargs), stop or (), on_chunk)
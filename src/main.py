@@ -1,11 +1,53 @@
 import argparse
-from src.ai_agent import run_agent
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
-    parser.add_argument("repo_name", type=str, help="GitHub repository name")
-    parser.add_argument("issue_number", type=int, help="GitHub issue number")
+    parser.add_argument("repo_name", type=str, nargs="?", help="GitHub repository name")
+    parser.add_argument("issue_number", type=int, nargs="?", help="GitHub issue number")
     parser.add_argument("--max_iterations", type=int, default=10)
+    parser.add_argument("--issues", type=int, nargs="+", help="Batch mode: process these issues concurrently")
+    parser.add_argument("--label", action="append", help="Batch mode: process open issues with this label (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="Batch and speculative mode: number of concurrent workers")
+    parser.add_argument("--attempts", type=int, default=None, help="Speculative mode: race this many attempts on the issue; the first to pass the tests opens the PR")
+    parser.add_argument("--serve", action="store_true", help="Server mode: take jobs from a webhook endpoint and/or a queue directory")
+    parser.add_argument("--port", type=int, default=None, help="Server mode: port to listen on")
+    parser.add_argument("--queue-dir", default=None, help="Server mode: directory to watch for job files")
     args = parser.parse_args()
 
-    run_agent(args.repo_name, args.issue_number, args.max_iterations)
+    if args.serve:
+        from src.server import serve
+        from src.config import SERVER_PORT, SERVER_QUEUE_DIR, SERVER_WORKERS
+
+        serve(port=args.port or SERVER_PORT, queue_dir=args.queue_dir or SERVER_QUEUE_DIR,
+              max_workers=args.workers or SERVER_WORKERS, max_iterations=args.max_iterations)
+    elif args.repo_name is None:
+        parser.error("repo_name is required unless --serve is given")
+    elif args.issues or args.label:
+        from src.batch import run_batch
+        from src.config import BATCH_WORKERS
+        from src.github_client import list_issues
+
+        issues = list(args.issues or [])
+        if args.label:
+            issues += [n for n in list_issues(args.repo_name, labels=args.label) if n not in issues]
+        results = run_batch(args.repo_name, issues, max_workers=args.workers or BATCH_WORKERS, max_iterations=args.max_iterations)
+        for n, r in sorted(results.items()):
+            print(f"#{n}: {r['status']}" + (f" ({r['error']})" if r.get("error") else ""))
+        from src.tools.git_utils import fetch_stats
+        stats = fetch_stats()
+        print(f"git fetch: {stats['fetches']} run ({stats['fetch_seconds']:.1f}s), {stats['skipped']} skipped "
+              f"(~{stats['saved_seconds']:.1f}s saved)")
+    elif args.issue_number is not None and args.attempts:
+        from src.speculative import run_speculative
+        from src.config import SPECULATIVE_WORKERS
+
+        result = run_speculative(args.repo_name, args.issue_number, attempts=args.attempts,
+                                 max_workers=args.workers or SPECULATIVE_WORKERS, max_iterations=args.max_iterations)
+        for r in result["attempts"]:
+            print(f"attempt {r['attempt']} (temperature {r['temperature']}): {r['status']}" + (f" ({r['error']})" if r.get("error") else ""))
+    elif args.issue_number is not None:
+        from src.ai_agent import run_agent
+
+        run_agent(args.repo_name, args.issue_number, args.max_iterations)
+    else:
+        parser.error("issue_number is required unless --issues or --label is given")
@@ -0,0 +1,125 @@
+import json
+from functools import lru_cache
+from src.config import (
+    LLM_PROVIDER, LLM_MODEL, PROMPT_BUDGET_ISSUE, PROMPT_BUDGET_COMMENTS, PROMPT_BUDGET_HISTORY,
+    PROMPT_KEEP_RECENT, PROMPT_SUMMARY_CHARS,
+)
+
+CHARS_PER_TOKEN = 4  # fallback estimate when no tokenizer is available for the model
+
+@lru_cache(maxsize=8)
+def _encoder(model: str):
+    if LLM_PROVIDER != "openai":
+        return None
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str, model: str=LLM_MODEL) -> int:
+    """Exact count with tiktoken for OpenAI models, otherwise a chars/4 estimate."""
+    enc = _encoder(model)
+    if enc is not None:
+        return len(enc.encode(text))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def truncate_to_tokens(text: str, budget: int, model: str=LLM_MODEL) -> str:
+    if text is None:
+        return text
+    total = count_tokens(text, model)
+    if total <= budget:
+        return text
+    cut = max(0, len(text) * budget // total)
+    while cut > 0 and count_tokens(text[:cut], model) > budget:
+        cut = cut * 9 // 10
+    return text[:cut] + f"... [truncated {total - count_tokens(text[:cut], model)} tokens]"
+
+class PromptBuilder:
+    """
+    Assembles the per-iteration agent input under a token budget.
+
+    The issue and comment sections never change during a run, so they are trimmed to their budgets and
+    serialized once. History keeps the last keep_recent iterations verbatim and compacts older ones to
+    short summaries (computed once per entry); if that is still over budget the oldest summaries are
+    dropped and replaced by a count.
+    """
+    def __init__(self, issue_data: dict, instructions: str, model: str=LLM_MODEL,
+                 issue_budget: int=PROMPT_BUDGET_ISSUE, comments_budget: int=PROMPT_BUDGET_COMMENTS,
+                 history_budget: int=PROMPT_BUDGET_HISTORY, keep_recent: int=PROMPT_KEEP_RECENT):
+        self.model = model
+        self.history_budget = history_budget
+        self.keep_recent = keep_recent
+        self._summaries = {}
+        self._sections = {}
+
+        issue = issue_data.get("issue") or {}
+        self.add_section("issue", {
+            "number": issue.get("number"),
+            "title": issue.get("title"),
+            "body": truncate_to_tokens(issue.get("body") or "", issue_budget, model),
+            "labels": [l["name"] for l in issue.get("labels", [])],
+        })
+        self.add_section("comments", self._fit_comments(issue_data.get("comments") or [], comments_budget))
+        self._instructions = json.dumps(instructions)
+
+    def add_section(self, name: str, value) -> None:
+        """Add a static section; it is serialized once and reused by every build()."""
+        self._sections[name] = json.dumps(value, ensure_ascii=False)
+
+    def _fit_comments(self, comments, budget: int) -> list:
+        # GitHub comment objects are mostly URLs and reaction metadata; keep author and text,
+        # newest first until the budget runs out, then restore chronological order
+        kept, used = [], 0
+        for c in reversed(comments if isinstance(comments, list) else []):
+            entry = {"author": (c.get("user") or {}).get("login"), "body": c.get("body") or ""}
+            cost = count_tokens(entry["body"], self.model)
+            if used + cost > budget:
+                if not kept:
+                    entry["body"] = truncate_to_tokens(entry["body"], budget, self.model)
+                    kept.append(entry)
+                break
+            kept.append(entry)
+            used += cost
+        omitted = len(comments) - len(kept) if isinstance(comments, list) else 0
+        kept.reverse()
+        if omitted:
+            kept.insert(0, {"omitted_earlier_comments": omitted})
+        return kept
+
+    def _summary(self, entry: dict) -> dict:
+        i = entry.get("iteration")
+        if i not in self._summaries:
+            text = " ".join(str(entry.get("result", "")).split())
+            if len(text) > PROMPT_SUMMARY_CHARS:
+                text = text[:PROMPT_SUMMARY_CHARS] + "..."
+            self._summaries[i] = {"iteration": i, "summary": text}
+        return self._summaries[i]
+
+    def compact_history(self, history: list) -> list:
+        recent = history[-self.keep_recent:] if self.keep_recent else []
+        older = history[:len(history) - len(recent)]
+        per_entry = max(1, self.history_budget // max(1, len(recent) + 1))
+        recent = [{"iteration": e.get("iteration"), "result": truncate_to_tokens(str(e.get("result", "")), per_entry, self.model)} for e in recent]
+        summaries = [self._summary(e) for e in older]
+
+        used = sum(count_tokens(json.dumps(e), self.model) for e in recent)
+        kept = []
+        for s in reversed(summaries):
+            cost = count_tokens(json.dumps(s), self.model)
+            if used + cost > self.history_budget:
+                break
+            kept.append(s)
+            used += cost
+        kept.reverse()
+        dropped = len(summaries) - len(kept)
+        return ([{"omitted_earlier_iterations": dropped}] if dropped else []) + kept + recent
+
+    def build(self, history: list) -> str:
+        parts = [f'"{name}": {value}' for name, value in self._sections.items()]
+        parts.append(f'"history": {json.dumps(self.compact_history(history), ensure_ascii=False)}')
+        parts.append(f'"instructions": {self._instructions}')
+        return "{" + ", ".join(parts) + "}"
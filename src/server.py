@@ -0,0 +1,236 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from src.config import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_QUEUE_DIR, SERVER_POLL_INTERVAL, SERVER_WEBHOOK_SECRET,
+    SERVER_KEEP_JOBS,
+)
+
+WEBHOOK_ACTIONS = ("opened", "reopened", "labeled")
+
+class AgentServer:
+    """
+    Runs issue jobs for as long as the process lives, so nothing is cold-started per issue: one LLM client
+    is built on first use and shared by every job, repos stay as mirrors whose fetches are throttled, and
+    the tree, search and retrieval indexes stay in their in-process caches. Jobs run on a bounded thread
+    pool; a job for an issue that is already queued or running is not submitted twice. Only the last
+    keep_jobs finished jobs are remembered.
+    """
+    def __init__(self, max_workers: int=SERVER_WORKERS, base_branch: str="main", max_iterations: int=10,
+                 runner: Optional[Callable]=None, keep_jobs: int=SERVER_KEEP_JOBS):
+        self.base_branch = base_branch
+        self.max_iterations = max_iterations
+        self.runner = runner or self._run_issue
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = {}
+        self._active = {}  # (repo, issue) -> job id, while queued or running
+        self._finished = deque()  # ids of finished jobs, oldest first
+        self.keep_jobs = keep_jobs
+        self._lock = threading.Lock()
+        self._llm = None
+
+    def llm(self):
+        with self._lock:
+            if self._llm is None:
+                from src.ai_agent import get_llm
+                self._llm = get_llm()
+            return self._llm
+
+    def _run_issue(self, repo_name: str, issue_number: int, max_iterations: int) -> None:
+        from src.batch import _run_issue
+        # off the mirror, which is only fetched when FETCH_INTERVAL has passed since the last job's fetch
+        _run_issue(repo_name, issue_number, None, self.base_branch, max_iterations, False, llm=self.llm())
+
+    def submit(self, repo_name: str, issue_number: int, max_iterations: Optional[int]=None,
+               on_done: Optional[Callable[[dict], None]]=None) -> dict:
+        """Queue a job; returns its record (the existing one, marked duplicate, if the issue is already pending)."""
+        key = (repo_name, int(issue_number))
+        with self._lock:
+            if key in self._active:
+                return dict(self.jobs[self._active[key]], duplicate=True)
+            job = {"id": uuid.uuid4().hex[:12], "repo": repo_name, "issue": int(issue_number), "status": "queued",
+                   "error": None, "submitted": time.time(), "started": None, "finished": None}
+            self.jobs[job["id"]] = job
+            self._active[key] = job["id"]
+            record = dict(job)
+        self.pool.submit(self._execute, job, max_iterations or self.max_iterations, on_done)
+        return record
+
+    def _execute(self, job: dict, max_iterations: int, on_done) -> None:
+        job.update(status="running", started=time.time())
+        try:
+            self.runner(job["repo"], job["issue"], max_iterations)
+            job["status"] = "done"
+        except Exception as e:
+            job.update(status="error", error=str(e))
+            print(f"Job {job['id']} ({job['repo']}#{job['issue']}) failed: {e}")
+        finally:
+            job["finished"] = time.time()
+            with self._lock:
+                self._active.pop((job["repo"], job["issue"]), None)
+                self._finished.append(job["id"])
+                while len(self._finished) > self.keep_jobs:
+                    self.jobs.pop(self._finished.popleft(), None)
+            if on_done is not None:
+                on_done(dict(job))
+
+    def status(self) -> dict:
+        with self._lock:
+            jobs = [dict(j) for j in self.jobs.values()]
+        counts = {}
+        for j in jobs:
+            counts[j["status"]] = counts.get(j["status"], 0) + 1
+        return {"counts": counts, "jobs": jobs}
+
+    def shutdown(self, wait: bool=True) -> None:
+        self.pool.shutdown(wait=wait)
+
+def _number(value, name: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().isdigit():
+        raise ValueError(f"{name} must be a whole number, got {value!r}")
+    return int(value)
+
+def parse_job(payload: dict, event: Optional[str]=None) -> Optional[tuple]:
+    """
+    (repo, issue, max_iterations) from a request body: either {"repo", "issue", "max_iterations"?} or a GitHub
+    "issues" webhook delivery (opened/reopened/labeled). None for events that don't start a job.
+    Any malformed body raises ValueError.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("expected a JSON object")
+    if event is not None and event != "issues":
+        return None
+    if "repository" in payload and isinstance(payload.get("issue"), dict):
+        if payload.get("action") not in WEBHOOK_ACTIONS:
+            return None
+        repository = payload["repository"]
+        if not isinstance(repository, dict) or not isinstance(repository.get("name"), str):
+            raise ValueError("webhook payload has no repository name")
+        return repository["name"], _number(payload["issue"].get("number"), "issue number"), None
+    if isinstance(payload.get("repo"), str) and payload["repo"] and payload.get("issue") is not None:
+        max_iterations = payload.get("max_iterations")
+        if max_iterations is not None:
+            max_iterations = _number(max_iterations, "max_iterations")
+        return payload["repo"], _number(payload["issue"], "issue"), max_iterations
+    raise ValueError('expected {"repo": ..., "issue": ...} or a GitHub issues webhook payload')
+
+def _signature_ok(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    expected = "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return signature is not None and hmac.compare_digest(expected, signature)
+
+def make_handler(server: AgentServer, secret: Optional[str]=SERVER_WEBHOOK_SECRET):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code: int, payload: dict) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("/jobs", "/health"):
+                self._reply(200, server.status())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/jobs", "/webhook"):
+                self._reply(404, {"error": "not found"})
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if secret and not _signature_ok(secret, body, self.headers.get("X-Hub-Signature-256")):
+                self._reply(401, {"error": "bad signature"})
+                return
+            try:
+                job = parse_job(json.loads(body or b"{}"), self.headers.get("X-GitHub-Event"))
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+                return
+            if job is None:
+                self._reply(202, {"ignored": True})
+                return
+            self._reply(202, server.submit(*job))
+
+        def log_message(self, format, *args):
+            pass  # job outcomes are logged by the server; per-request lines are noise
+
+    return Handler
+
+class QueueWatcher:
+    """
+    Picks up job files (*.json, same body as POST /jobs) dropped into a directory. A file is claimed by
+    renaming it, so several servers can share one queue directory, and moved to done/ or failed/ afterwards.
+    """
+    def __init__(self, server: AgentServer, queue_dir: str=SERVER_QUEUE_DIR, interval: float=SERVER_POLL_INTERVAL):
+        self.server = server
+        self.queue_dir = queue_dir
+        self.interval = interval
+        self._stop = threading.Event()
+        for sub in ("claimed", "done", "failed"):
+            os.makedirs(os.path.join(queue_dir, sub), exist_ok=True)
+
+    def poll(self) -> int:
+        """Claim and submit every pending job file. Returns how many were submitted."""
+        submitted = 0
+        names = sorted(n for n in os.listdir(self.queue_dir) if n.endswith(".json"))
+        for name in names:
+            claimed = os.path.join(self.queue_dir, "claimed", name)
+            try:
+                os.rename(os.path.join(self.queue_dir, name), claimed)
+            except FileNotFoundError:
+                continue  # another watcher got it
+            try:
+                with open(claimed, "r", encoding="utf-8") as f:
+                    repo, issue, max_iterations = parse_job(json.load(f))
+            except ValueError as e:
+                print(f"Bad job file {name}: {e}")
+                os.replace(claimed, os.path.join(self.queue_dir, "failed", name))
+                continue
+            job = self.server.submit(repo, issue, max_iterations, on_done=lambda job, name=name: self._finish(name, job))
+            if job.get("duplicate"):
+                self._finish(name, {"status": "done"})  # the pending job for this issue covers it
+                continue
+            submitted += 1
+        return submitted
+
+    def _finish(self, name: str, job: dict) -> None:
+        target = "done" if job["status"] == "done" else "failed"
+        os.replace(os.path.join(self.queue_dir, "claimed", name), os.path.join(self.queue_dir, target, name))
+
+    def run(self) -> None:
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+def serve(host: str=SERVER_HOST, port: int=SERVER_PORT, queue_dir: Optional[str]=SERVER_QUEUE_DIR,
+          max_workers: int=SERVER_WORKERS, base_branch: str="main", max_iterations: int=10) -> None:
+    """Run the webhook endpoint (and the queue-directory watcher if queue_dir is set) until interrupted."""
+    server = AgentServer(max_workers=max_workers, base_branch=base_branch, max_iterations=max_iterations)
+    server.llm()  # pay for imports and client construction now, not on the first job
+    watcher = None
+    if queue_dir:
+        watcher = QueueWatcher(server, queue_dir)
+        threading.Thread(target=watcher.run, daemon=True).start()
+    httpd = ThreadingHTTPServer((host, port), make_handler(server))
+    print(f"Listening on http://{host}:{port} (POST /jobs, /webhook; GET /jobs)" + (f", watching {queue_dir}" if queue_dir else ""))
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        if watcher is not None:
+            watcher.stop()
+        server.shutdown()
@@ -0,0 +1,136 @@
+import os
+import types
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Callable, Optional
+from src.config import SPECULATIVE_ATTEMPTS, SPECULATIVE_WORKERS, SPECULATIVE_TEMPERATURES, STATE_DIR
+from src.tools import git_utils, mirror
+from src.tools.changeset import issue_branch_name
+
+NO_WINNER = -1
+
+class Attempt:
+    """
+    One of several competing runs on the same issue. The shared winner slot (a value and a lock that
+    work across processes) decides which attempt may publish; every other attempt is cancelled once it is set.
+    """
+    def __init__(self, index: int, temperature: float, issue_number: int, winner, lock):
+        self.index = index
+        self.temperature = temperature
+        self.local_branch = f"{issue_branch_name(issue_number)}-attempt-{index}"
+        self._winner = winner
+        self._lock = lock
+
+    def claim(self) -> bool:
+        """True if this attempt is (or now becomes) the one that publishes."""
+        with self._lock:
+            if self._winner.value == NO_WINNER:
+                self._winner.value = self.index
+            return self._winner.value == self.index
+
+    def release(self) -> None:
+        """Give the slot back after a claim whose push or PR failed; other attempts may claim it again."""
+        with self._lock:
+            if self._winner.value == self.index:
+                self._winner.value = NO_WINNER
+
+    def cancelled(self) -> bool:
+        return self._winner.value not in (NO_WINNER, self.index)
+
+    def won(self) -> bool:
+        return self._winner.value == self.index
+
+def attempt_path(repo_name: str, issue_number: int, index: int) -> str:
+    from src.batch import worktree_path
+    return f"{worktree_path(repo_name, issue_number)}-attempt-{index}"
+
+def _cleanup(path: str, branch: str, repo_root: str) -> None:
+    if os.path.exists(path):
+        git_utils.remove_worktree(path, cwd=repo_root)
+    git_utils.delete_branch(branch, cwd=repo_root)
+
+def _prepare(repo_name: str, path: str, branch: str, repo_root: str, base_branch: str, base_sha: str) -> None:
+    """
+    Fresh worktree at base with the attempt's branch checked out. Runs in the parent: git_utils' worktree
+    lock and fetch throttle only hold within one process, and with its branch already checked out the
+    attempt's changeset never creates one (which would fetch).
+    """
+    _cleanup(path, branch, repo_root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    mirror.add_worktree(repo_name, path, base_branch, base_sha=base_sha, repo_root=repo_root)
+    git_utils._run(["git", "checkout", "-b", branch], cwd=path)
+
+def run_attempt(repo_name: str, issue_number: int, path: str, base_branch: str, max_iterations: int, attempt: Attempt) -> dict:
+    """Run one attempt in its prepared worktree at path with its own LLM temperature and state; runs in a pool worker."""
+    result = {"attempt": attempt.index, "temperature": attempt.temperature}
+    if attempt.cancelled():
+        return dict(result, status="cancelled")  # queued behind a run that already won
+    from src.ai_agent import get_llm, run_agent
+    state_dir = os.path.join(STATE_DIR, "speculative", f"attempt-{attempt.index}")
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(state_dir, repo_name, f"{issue_number}.jsonl"))  # every speculative run starts fresh
+    run_agent(repo_name, issue_number, max_iterations, base_branch=base_branch, repo_root=path, state_dir=state_dir,
+              llm=get_llm(temperature=attempt.temperature, variant=f"attempt-{attempt.index}"), attempt=attempt)
+    if attempt.won():
+        return dict(result, status="won")
+    return dict(result, status="cancelled" if attempt.cancelled() else "failed")
+
+def run_speculative(repo_name: str, issue_number: int, attempts: int=SPECULATIVE_ATTEMPTS, max_workers: int=SPECULATIVE_WORKERS,
+                    repo_root: Optional[str]=None, base_branch: str="main", max_iterations: int=10,
+                    temperatures: list=SPECULATIVE_TEMPERATURES, runner: Optional[Callable]=None,
+                    executor: Optional[Executor]=None) -> dict:
+    """
+    Race attempts independent runs of the agent on one issue, each in its own worktree (off the shared
+    clone at repo_root, or the repo's mirror) and at its own sampling temperature, cycling through
+    temperatures. This process fetches once and creates and removes every worktree; the attempts run as
+    separate processes, at most max_workers at a time. Every attempt's commits are checked against the
+    full test suite; the first one to pass claims the issue branch and opens the single PR (a claim whose
+    push or PR fails is released again), and the rest stop at their next tool call or iteration (queued
+    ones never start).
+
+    runner and executor replace run_attempt and the process pool (tests use threads).
+    Returns {"winner": attempt index or None, "attempts": [per-attempt result, in index order]}.
+    """
+    if repo_root is None:
+        repo_root = mirror.ensure_mirror(repo_name)
+    else:
+        git_utils.fetch(cwd=repo_root)
+    runner = runner or run_attempt
+    base_sha = git_utils._run(["git", "rev-parse", f"origin/{base_branch}"], cwd=repo_root).stdout.strip()
+    with contextlib.ExitStack() as worktrees, contextlib.ExitStack() as stack:
+        if executor is None:
+            # spawn, not fork: the parent may hold threads (scheduler, servers) mid-lock
+            ctx = multiprocessing.get_context("spawn")
+            manager = stack.enter_context(ctx.Manager())
+            winner, lock = manager.Value("i", NO_WINNER), manager.Lock()
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=max(1, min(max_workers, attempts)), mp_context=ctx))
+        else:
+            winner, lock = types.SimpleNamespace(value=NO_WINNER), threading.Lock()
+        futures = {}
+        for i in range(attempts):
+            attempt = Attempt(i, temperatures[i % len(temperatures)], issue_number, winner, lock)
+            path = attempt_path(repo_name, issue_number, i)
+            _prepare(repo_name, path, attempt.local_branch, repo_root, base_branch, base_sha)
+            # worktrees exits after stack, so the pool has shut down (every worker exited) by then
+            worktrees.callback(_cleanup, path, attempt.local_branch, repo_root)
+            futures[executor.submit(runner, repo_name, issue_number, path, base_branch, max_iterations, attempt)] = attempt
+        results = {}
+        for future in as_completed(futures):
+            attempt = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                results[attempt.index] = future.result()
+            except Exception as e:
+                results[attempt.index] = {"attempt": attempt.index, "temperature": attempt.temperature, "status": "error", "error": str(e)}
+                print(f"Attempt {attempt.index} on #{issue_number} failed: {e}")
+            if results[attempt.index].get("status") == "won":
+                for pending in futures:
+                    pending.cancel()  # not started yet: nothing to stop
+        for future, attempt in futures.items():
+            if future.cancelled():
+                results[attempt.index] = {"attempt": attempt.index, "temperature": attempt.temperature, "status": "cancelled"}
+        won = winner.value
+    return {"winner": None if won == NO_WINNER else won, "attempts": [results[i] for i in sorted(results)]}
@@ -1,15 +1,136 @@
+import os
 import json
-from typing import Optional, Dict
-from src.config import STATE_FILE
+import time
+import threading
+from typing import Iterator, Optional
+from src.config import STATE_DIR, STATE_FSYNC_EVERY, STATE_FSYNC_INTERVAL
 
-def save_state(issue_number: int, history: list, metadata: Optional[Dict]=None):
-    state = {"issue_number": issue_number, "history": history, "metadata": metadata or {}}
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+TAIL_CHUNK = 64 * 1024
 
-def load_state():
+class StateStore:
+    """
+    Append-only agent state for one (repo, issue), stored as JSONL at <root>/<repo>/<issue>.jsonl.
+
+    Every iteration or tool call is one appended line, so saving is O(record) instead of rewriting the
+    whole history. Writes are fsynced in batches: every fsync_every records or fsync_interval seconds,
+    and on flush()/close(). A crash can only lose the unsynced tail; a torn last line is skipped on load and
+    truncated before the next append.
+    Records are read lazily with iter_records(); last_iteration() only reads the end of the file.
+    Appends are thread-safe (batched tool calls record concurrently).
+    """
+    def __init__(self, repo_name: str, issue_number: int, root: str=STATE_DIR,
+                 fsync_every: int=STATE_FSYNC_EVERY, fsync_interval: float=STATE_FSYNC_INTERVAL):
+        self.repo_name = repo_name
+        self.issue_number = issue_number
+        self.path = os.path.join(root, repo_name, f"{issue_number}.jsonl")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._f = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.RLock()
+
+    def append(self, record: dict) -> None:
+        line = json.dumps({"ts": time.time(), **record}, default=str)
+        with self._lock:
+            if self._f is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                _drop_torn_tail(self.path)
+                self._f = open(self.path, "a", encoding="utf-8")
+            self._f.write(line + "\n")
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._f is None or not self._unsynced:
+                return
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self._unsynced = 0
+            self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self.flush()
+                self._f.close()
+                self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_records(self, kind: Optional[str]=None) -> Iterator[dict]:
+        """Yield stored records in order, optionally only those whose "type" is kind."""
+        if self._f is not None:
+            self._f.flush()
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                record = _parse(line)
+                if record is not None and (kind is None or record.get("type") == kind):
+                    yield record
+
+    def history(self) -> list:
+        return list(self.iter_records("iteration"))
+
+    def last_iteration(self) -> Optional[int]:
+        """Index of the last recorded iteration, read from the end of the file; None if there is none."""
+        if self._f is not None:
+            self._f.flush()
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            pos, tail = end, b""
+            while pos > 0:
+                pos = max(0, pos - TAIL_CHUNK)
+                f.seek(pos)
+                tail = f.read(end - pos)
+                lines = tail.split(b"\n")
+                # the first line may be cut by the chunk boundary unless we're at the start of the file
+                candidates = lines if pos == 0 else lines[1:]
+                for line in reversed(candidates):
+                    record = _parse(line.decode("utf-8", errors="replace"))
+                    if record is not None and record.get("type") == "iteration":
+                        return record.get("iteration")
+        return None
+
+def _drop_torn_tail(path: str) -> None:
+    """Truncate a line left unfinished by a crash, so the next append starts on a line of its own."""
     try:
-        with open(STATE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
+        f = open(path, "r+b")
     except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - TAIL_CHUNK)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                if pos == end and newline == pos - start - 1:
+                    return  # ends in a newline: nothing torn
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)  # a single torn line and nothing else
+
+def _parse(line: str) -> Optional[dict]:
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        return json.loads(line)
+    except ValueError:
         return None
@@ -0,0 +1,141 @@
+import os
+from typing import Callable, Optional, Tuple
+from src.tools import git_utils
+from src.tools.file_tools import make_unified_diff, apply_search_replace, _read_text
+
+def issue_branch_name(issue_number: int) -> str:
+    return f"agent/issue-{issue_number}"
+
+class Changeset:
+    """
+    Edits staged by the agent that are published together.
+    commit() turns every staged file into one combined patch, applies it with a single
+    `git apply --index`, commits and pushes once, and opens one PR per issue. The branch name is
+    fixed per issue, so later commits land on the same branch and update the already-open PR.
+    verify, if given, gates the push: it returns (ok, output) for the committed tree, typically the full test suite.
+    claim, if given, is asked after verification whether this changeset may publish; one that returns False stops
+    the push (a competing attempt got there first); release, if given, hands the claim back when publishing fails
+    before any PR exists, so a competing attempt can still publish. local_branch commits on a different local branch than the
+    issue branch it is pushed to, so several worktrees can work on the same issue.
+    """
+    def __init__(self, repo_name: str, issue_number: int, repo_root: str=".", base_branch: str="main", dry_run: bool=False,
+                 verify: Optional[Callable[[], Tuple[bool, str]]]=None, claim: Optional[Callable[[], bool]]=None,
+                 release: Optional[Callable[[], None]]=None, local_branch: Optional[str]=None):
+        self.repo_name = repo_name
+        self.issue_number = issue_number
+        self.repo_root = repo_root
+        self.base_branch = base_branch
+        self.dry_run = dry_run
+        self.branch_name = issue_branch_name(issue_number)
+        self.local_branch = local_branch or self.branch_name
+        self.verify = verify
+        self.claim = claim
+        self.release = release
+        self.published = False  # a PR exists for the issue branch
+        self.edits = {}
+
+    def stage(self, path: str, new_content: str) -> str:
+        self.edits[path] = new_content
+        return f"Staged {path} ({len(self.edits)} file(s) pending). Call commit_changes to publish."
+
+    def stage_hunks(self, path: str, edits: list) -> str:
+        """
+        Stage an edit given as search/replace hunks against the file's staged (or current) content,
+        so a one-line fix to a large file doesn't need the whole file regenerated.
+        """
+        current = self.edits.get(path)
+        if current is None:
+            current = _read_text(os.path.join(self.repo_root, path))
+        try:
+            new_content = apply_search_replace(current, edits)
+        except ValueError as e:
+            return f"Not staged: {e}."
+        return self.stage(path, new_content)
+
+    def discard(self, path: Optional[str]=None) -> str:
+        if path is None:
+            self.edits.clear()
+            return "Discarded all staged edits."
+        self.edits.pop(path, None)
+        return f"Discarded {path}."
+
+    def build_patch(self) -> str:
+        return "".join(make_unified_diff(p, c, repo_root=self.repo_root) for p, c in self.edits.items())
+
+    def _checkout_issue_branch(self) -> None:
+        if self.dry_run:
+            return
+        if git_utils.current_branch(cwd=self.repo_root) == self.local_branch:
+            return
+        if git_utils.branch_exists(self.local_branch, cwd=self.repo_root):
+            git_utils.checkout_branch(self.local_branch, cwd=self.repo_root)
+        else:
+            git_utils.create_branch(self.local_branch, cwd=self.repo_root)
+
+    def commit(self, commit_message: str) -> dict:
+        """
+        Publish the staged edits. Returns a dict shaped like apply_file_patch's result,
+        plus "files" (the paths included) and "pr_updated" (True if an existing PR was reused).
+        """
+        res = {"applied": False, "patch": None, "commit": None, "push": None, "pr": None, "error": None,
+               "dry_run": self.dry_run, "files": list(self.edits), "pr_updated": False}
+        claimed = False
+        if not self.edits:
+            res["error"] = "No staged edits."
+            return res
+        try:
+            self._checkout_issue_branch()
+            patch_text = self.build_patch()
+            res["patch"] = patch_text
+            if not patch_text.strip():
+                res["error"] = "No changes detected."
+                return res
+
+            ok, msg = git_utils.stage_patch(patch_text, dry_run=self.dry_run, cwd=self.repo_root)
+            if not ok:
+                res["error"] = f"git apply failed: {msg}"
+                return res
+
+            res["commit"] = git_utils.commit_index(commit_message, dry_run=self.dry_run, cwd=self.repo_root)
+            res["applied"] = True
+            self.edits.clear()
+
+            if self.verify is not None and not self.dry_run:
+                ok, output = self.verify()
+                if not ok:
+                    # the commit stays on the local branch and goes out with the next successful commit
+                    res["error"] = "Test suite failed; not pushed. Fix the failures and commit again."
+                    res["tests"] = output
+                    return res
+
+            if self.claim is not None and not self.claim():
+                res["error"] = "Another attempt already published a fix for this issue; not pushed. Stop here."
+                return res
+            claimed = self.claim is not None
+
+            okpush, push_msg = git_utils.push_branch(self.local_branch, dry_run=self.dry_run, cwd=self.repo_root,
+                                                     target=None if self.local_branch == self.branch_name else self.branch_name)
+            res["push"] = push_msg
+            if not okpush:
+                res["error"] = "Push failed: " + push_msg
+                return res
+
+            existing = git_utils.find_pull_request(self.repo_name, self.branch_name, dry_run=self.dry_run)
+            if existing:
+                res["pr"] = existing
+                res["pr_updated"] = True
+            else:
+                pr_title = f"[Issue #{self.issue_number}] {commit_message}"
+                pr_body = f"Automated change by agent for issue #{self.issue_number}"
+                res["pr"] = git_utils.create_pull_request(
+                    self.repo_name, self.branch_name, pr_title, pr_body, base=self.base_branch, dry_run=self.dry_run
+                )
+            self.published = True
+            return res
+
+        except Exception as e:
+            res["error"] = str(e)
+            return res
+        finally:
+            if claimed and not self.published and self.release is not None:
+                self.release()  # nothing went out under this claim: let another attempt publish
@@ -0,0 +1,307 @@
+import os
+import re
+import json
+import pickle
+import fnmatch
+import hashlib
+import tempfile
+import threading
+import contextlib
+from collections import OrderedDict
+from typing import Optional
+from src.config import SEARCH_INDEX_DIR, SEARCH_MAX_FILE_BYTES, SEARCH_RESULT_LIMIT
+from src.tools import git_utils
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+def trigrams(text: str) -> set:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def required_literals(pattern: str) -> list:
+    """
+    Literal strings every match of the regex must contain, for trigram prefiltering.
+    Conservative: alternations, classes and optional parts contribute nothing.
+    """
+    literals = []
+
+    def walk(parsed):
+        run = []
+        for op, av in parsed:
+            if op is sre_parse.LITERAL:
+                run.append(chr(av))
+                continue
+            if run:
+                literals.append("".join(run))
+                run = []
+            if op is sre_parse.SUBPATTERN:
+                walk(av[-1])
+            elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+                walk(av[2])
+        if run:
+            literals.append("".join(run))
+
+    walk(sre_parse.parse(pattern))
+    return [l for l in literals if len(l) >= 3]
+
+def tracked_files(repo_root: str) -> dict:
+    """
+    {path: content key} for every tracked file: the index blob SHA, or mtime/size for files
+    modified in the working tree, so only files whose key changes need re-indexing.
+    """
+    out = git_utils._run(["git", "ls-files", "-s", "-z"], cwd=repo_root).stdout
+    files = {}
+    for record in out.split("\0"):
+        if record:
+            meta, path = record.split("\t", 1)
+            files[path] = meta.split()[1]
+    modified = git_utils._run(["git", "ls-files", "-m", "-z"], cwd=repo_root).stdout
+    for path in modified.split("\0"):
+        if path in files:
+            try:
+                st = os.stat(os.path.join(repo_root, path))
+            except FileNotFoundError:
+                del files[path]
+                continue
+            files[path] = f"wt:{st.st_mtime_ns}:{st.st_size}"
+    return files
+
+def _read_lenient(path: str) -> str:
+    """File text for matching; bytes that aren't UTF-8 (Latin-1 sources, stray binary) become U+FFFD."""
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8", errors="replace")
+    except OSError:
+        return ""  # deleted or unreadable since it was indexed
+
+LOCAL_FIELDS = ("repo_root", "shared_repo")  # describe this worktree, so they aren't saved with the index
+MEMORY_SLOTS = 8  # worktree indexes kept in memory, most recently used first
+
+def _shared_repo(repo_root: str) -> str:
+    """The git directory every worktree of repo_root shares (repo_root itself outside a repository)."""
+    r = git_utils._run(["git", "rev-parse", "--path-format=absolute", "--git-common-dir"], cwd=repo_root, check=False)
+    return r.stdout.strip() if r.returncode == 0 else repo_root
+
+class TrigramIndex:
+    """
+    Persistent trigram index over a repo's tracked text files.
+    update() re-indexes only files whose content key changed; search() intersects the posting lists of
+    the query's trigrams and then confirms matches line by line, so it only opens candidate files.
+    The saved index belongs to the shared repository, not the worktree: content keys are blob SHAs, so a
+    fresh worktree starts from the last saved state and only re-indexes the files that differ.
+    """
+    def __init__(self, repo_root: str):
+        self.repo_root = os.path.abspath(repo_root)
+        self.shared_repo = _shared_repo(self.repo_root)
+        self.keys = {}       # path -> content key
+        self.ids = {}        # path -> file id
+        self.paths = {}      # file id -> path
+        self.grams = {}      # file id -> trigrams of that file (needed to unindex it)
+        self.postings = {}   # trigram -> set of file ids
+        self._next_id = 0
+
+    @property
+    def store_path(self) -> str:
+        name = hashlib.sha1(self.shared_repo.encode()).hexdigest() + ".pickle"
+        return os.path.join(SEARCH_INDEX_DIR, name)
+
+    def _remove(self, path: str) -> None:
+        fid = self.ids.pop(path)
+        del self.paths[fid]
+        for g in self.grams.pop(fid):
+            ids = self.postings.get(g)
+            if ids is not None:
+                ids.discard(fid)
+                if not ids:
+                    del self.postings[g]
+        del self.keys[path]
+
+    def _read_grams(self, path: str) -> frozenset:
+        full = os.path.join(self.repo_root, path)
+        try:
+            if os.path.getsize(full) <= SEARCH_MAX_FILE_BYTES:
+                with open(full, "rb") as f:
+                    data = f.read()
+                if b"\0" not in data[:8192]:
+                    return frozenset(trigrams(data.decode("utf-8", errors="replace")))
+        except OSError:
+            pass
+        return frozenset()
+
+    def _add(self, path: str, key: str, grams: frozenset) -> None:
+        fid = self._next_id
+        self._next_id += 1
+        self.keys[path], self.ids[path], self.paths[fid], self.grams[fid] = key, fid, path, grams
+        for g in grams:
+            self.postings.setdefault(g, set()).add(fid)
+
+    def update(self, changes: Optional[list]=None) -> int:
+        """
+        Bring the index in line with the working tree. Returns the number of files (re)indexed.
+        changes, if given, receives a ("-", path) or ("+", path, key, trigrams) record per change, for save_changes().
+        """
+        current = tracked_files(self.repo_root)
+        stale = [p for p, k in self.keys.items() if current.get(p) != k]
+        for path in stale:
+            self._remove(path)
+        fresh = [p for p in current if p not in self.keys]
+        for path in fresh:
+            grams = self._read_grams(path)
+            self._add(path, current[path], grams)
+            if changes is not None:
+                changes.append(("+", path, current[path], grams))
+        if changes is not None:
+            changes[:0] = [("-", path) for path in stale]
+        return len(fresh)
+
+    @property
+    def log_path(self) -> str:
+        return self.store_path[:-len(".pickle")] + ".log"
+
+    def save(self) -> None:
+        """Write the whole index and drop the change log it now contains."""
+        os.makedirs(SEARCH_INDEX_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SEARCH_INDEX_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump({k: v for k, v in self.__dict__.items() if k not in LOCAL_FIELDS}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.store_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.log_path)
+
+    def save_changes(self, changes: list) -> None:
+        """Append update() records to the change log; rewrite the whole index once the log outgrows half of it."""
+        try:
+            compact = os.path.getsize(self.log_path) > os.path.getsize(self.store_path) // 2
+        except FileNotFoundError:
+            compact = not os.path.exists(self.store_path)
+        if compact:
+            self.save()
+            return
+        with open(self.log_path, "ab") as f:
+            pickle.dump(changes, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, repo_root: str) -> "TrigramIndex":
+        """The saved index with its change log replayed; a torn last log record is ignored."""
+        index = cls(repo_root)
+        try:
+            with open(index.store_path, "rb") as f:
+                state = pickle.load(f)
+            index.__dict__.update({k: v for k, v in state.items() if k not in LOCAL_FIELDS})
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return cls(repo_root)
+        try:
+            with open(index.log_path, "rb") as f:
+                while True:
+                    for change in pickle.load(f):
+                        # worktrees of one repo share the log, so a record may not apply to this state
+                        if change[1] in index.keys:
+                            index._remove(change[1])
+                        if change[0] == "+":
+                            index._add(*change[1:])
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            pass
+        return index
+
+    def candidates(self, grams: set) -> list:
+        if not grams:
+            return sorted(self.ids)
+        sets = sorted((self.postings.get(g, set()) for g in grams), key=len)
+        ids = set(sets[0])
+        for s in sets[1:]:
+            ids &= s
+            if not ids:
+                break
+        return sorted(self.paths[i] for i in ids)
+
+    def search(self, query: str, regex: bool=False, case_sensitive: bool=False, path_glob: Optional[str]=None,
+               limit: int=SEARCH_RESULT_LIMIT) -> dict:
+        flags = re.MULTILINE | (0 if case_sensitive else re.IGNORECASE)
+        pattern = re.compile(query if regex else re.escape(query), flags)
+        literals = required_literals(query) if regex else [query]
+        grams = set()
+        for literal in literals:
+            grams |= trigrams(literal)
+
+        with _lock:  # get_index() may be updating the postings from another thread
+            paths = [p for p in self.candidates(grams) if self.grams[self.ids[p]]]  # skip binary or oversized files
+        matches, truncated = [], False
+        for path in paths:
+            if path_glob and not fnmatch.fnmatch(path, path_glob):
+                continue
+            text = _read_lenient(os.path.join(self.repo_root, path))
+            if not pattern.search(text):
+                continue
+            for n, line in enumerate(text.splitlines(), 1):
+                if pattern.search(line):
+                    if len(matches) >= limit:
+                        truncated = True
+                        break
+                    matches.append({"path": path, "line": n, "text": line.strip()[:200]})
+            if truncated:
+                break
+        return {"matches": matches, "truncated": truncated}
+
+_indexes = OrderedDict()  # repo root -> index, least recently used first
+_checked = {}  # repo root -> (HEAD, git index mtime) at its index's last update
+_lock = threading.Lock()
+
+def _repo_state(repo_root: str) -> Optional[tuple]:
+    """(HEAD commit, mtime of the git index file); None if there is no commit yet."""
+    r = git_utils._run(["git", "rev-parse", "HEAD", "--git-path", "index"], cwd=repo_root, check=False)
+    lines = r.stdout.split("\n")
+    if r.returncode != 0 or len(lines) < 2:
+        return None
+    try:
+        return lines[0], os.stat(os.path.join(repo_root, lines[1])).st_mtime_ns
+    except FileNotFoundError:
+        return lines[0], None
+
+def get_index(repo_root: str=".") -> TrigramIndex:
+    """
+    Loaded (and incrementally refreshed) index for repo_root. The tracked files are only re-listed when
+    HEAD or the git index changed since the last query (the agent's edits land through `git apply --index`),
+    and re-indexed files are appended to the saved index rather than rewriting it.
+    """
+    root = os.path.abspath(repo_root)
+    with _lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = TrigramIndex.load(root)
+            while len(_indexes) > MEMORY_SLOTS:
+                _checked.pop(_indexes.popitem(last=False)[0], None)
+        _indexes.move_to_end(root)
+        state = _repo_state(root)
+        if state is None or state != _checked.get(root):
+            changes = []
+            index.update(changes)
+            if changes:
+                index.save_changes(changes)
+            _checked[root] = state
+        return index
+
+def search_code(query: str, repo_root: str=".") -> dict:
+    """
+    Tool entry point: a plain string (case-insensitive literal search) or JSON with
+    query, regex (bool), case_sensitive (bool), path (glob) and limit.
+    """
+    query = query.strip()
+    args = {"query": query}
+    if query.startswith("{"):
+        try:
+            args = json.loads(query)
+        except ValueError as e:
+            return {"error": f"Invalid query, expected JSON: {e}"}
+    if not args.get("query"):
+        return {"error": "Empty query."}
+    try:
+        return get_index(repo_root).search(
+            args["query"], regex=bool(args.get("regex")), case_sensitive=bool(args.get("case_sensitive")),
+            path_glob=args.get("path"), limit=int(args.get("limit", SEARCH_RESULT_LIMIT)),
+        )
+    except re.error as e:
+        return {"error": f"Invalid regex: {e}"}
@@ -0,0 +1,194 @@
+from typing import Iterator, List, Tuple
+
+MYERS_MAX_COST = 512  # edit distance past which a region without anchors is emitted as one replace
+NO_NEWLINE = "\\ No newline at end of file\n"
+
+def _intern(a: list, b: list) -> Tuple[list, list]:
+    """Replace every line by a small int (equal lines share one), so comparisons are int compares."""
+    ids = {}
+    return [ids.setdefault(x, len(ids)) for x in a], [ids.setdefault(x, len(ids)) for x in b]
+
+def _lis(pairs: list) -> list:
+    """Longest run of pairs increasing in both coordinates (pairs come sorted by the first), patience sorting."""
+    tails, back, tops = [], [], []
+    for k, (_, j) in enumerate(pairs):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < j:
+                lo = mid + 1
+            else:
+                hi = mid
+        back.append(tops[lo - 1] if lo else -1)
+        if lo == len(tails):
+            tails.append(j)
+            tops.append(k)
+        else:
+            tails[lo], tops[lo] = j, k
+    out, k = [], tops[-1] if tops else -1
+    while k != -1:
+        out.append(pairs[k])
+        k = back[k]
+    out.reverse()
+    return out
+
+def _myers(a: list, alo: int, ahi: int, b: list, blo: int, bhi: int, out: list) -> None:
+    """Greedy O(ND) shortest edit script on a[alo:ahi] vs b[blo:bhi]; appends (i, j) for every matched line."""
+    n, m = ahi - alo, bhi - blo
+    limit = min(n + m, MYERS_MAX_COST)
+    offset = limit + 1
+    v = [0] * (2 * limit + 3)
+    trace = []
+    for d in range(limit + 1):
+        trace.append(v[offset - d:offset + d + 1] if d else [])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x, y = x + 1, y + 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            continue
+        break
+    else:
+        return  # too different: no matches, the region becomes a single replace
+
+    # walk the trace backwards collecting the diagonal (matching) moves
+    x, y, matches = n, m, []
+    for d in range(len(trace) - 1, 0, -1):
+        prev = trace[d]  # v as it was before step d, for k in [-(d-1), d-1]
+        k = x - y
+        def at(kk):
+            return prev[kk + d]
+        if k == -d or (k != d and at(k - 1) < at(k + 1)):
+            pk = k + 1
+        else:
+            pk = k - 1
+        px = at(pk)
+        py = px - pk
+        while x > px and y > py:
+            x, y = x - 1, y - 1
+            matches.append((alo + x, blo + y))
+        x, y = px, py
+    while x > 0 and y > 0:
+        x, y = x - 1, y - 1
+        matches.append((alo + x, blo + y))
+    out.extend(reversed(matches))
+
+def _patience(a: list, alo: int, ahi: int, b: list, blo: int, bhi: int, out: list) -> None:
+    """Anchor on lines unique to both sides (in order), recurse between anchors, Myers where there are none."""
+    while alo < ahi and blo < bhi and a[alo] == b[blo]:
+        out.append((alo, blo))
+        alo, blo = alo + 1, blo + 1
+    tail = []
+    while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+        ahi, bhi = ahi - 1, bhi - 1
+        tail.append((ahi, bhi))
+    if alo < ahi and blo < bhi:
+        counts = {}
+        for i in range(alo, ahi):
+            c = counts.get(a[i])
+            counts[a[i]] = (i, -1) if c is None else (-1, -1)
+        for j in range(blo, bhi):
+            c = counts.get(b[j])
+            if c is not None:
+                counts[b[j]] = (c[0], j if c[1] == -1 else -2)
+        anchors = _lis(sorted((i, j) for i, j in counts.values() if i >= 0 and j >= 0))
+        if anchors:
+            pi, pj = alo, blo
+            for i, j in anchors:
+                _patience(a, pi, i, b, pj, j, out)
+                out.append((i, j))
+                pi, pj = i + 1, j + 1
+            _patience(a, pi, ahi, b, pj, bhi, out)
+        else:
+            _myers(a, alo, ahi, b, blo, bhi, out)
+    out.extend(reversed(tail))
+
+def matching_blocks(a: list, b: list) -> List[Tuple[int, int, int]]:
+    """Like difflib.SequenceMatcher.get_matching_blocks(): (i, j, n) runs, ending with (len(a), len(b), 0)."""
+    ia, ib = _intern(a, b)
+    pairs = []
+    _patience(ia, 0, len(ia), ib, 0, len(ib), pairs)
+    blocks = []
+    for i, j in pairs:
+        if blocks and blocks[-1][0] + blocks[-1][2] == i and blocks[-1][1] + blocks[-1][2] == j:
+            blocks[-1][2] += 1
+        else:
+            blocks.append([i, j, 1])
+    blocks.append([len(a), len(b), 0])
+    return [tuple(block) for block in blocks]
+
+def opcodes(a: list, b: list) -> list:
+    """difflib-style (tag, i1, i2, j1, j2) opcodes."""
+    i = j = 0
+    codes = []
+    for ai, bj, size in matching_blocks(a, b):
+        tag = "replace" if i < ai and j < bj else "delete" if i < ai else "insert" if j < bj else ""
+        if tag:
+            codes.append((tag, i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            codes.append(("equal", ai, i, bj, j))
+    return codes or [("equal", 0, 0, 0, 0)]
+
+def grouped_opcodes(codes: list, n: int=3) -> Iterator[list]:
+    """Hunks of opcodes with up to n lines of context, as difflib.SequenceMatcher.get_grouped_opcodes()."""
+    codes = list(codes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * n:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+def _range(start: int, stop: int) -> str:
+    length = stop - start
+    beginning = start + 1
+    if length == 1:
+        return str(beginning)
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+def _line(prefix: str, line: str) -> str:
+    return prefix + line if line.endswith("\n") else prefix + line + "\n" + NO_NEWLINE
+
+def unified_diff(a: list, b: list, fromfile: str="", tofile: str="", n: int=3) -> Iterator[str]:
+    """
+    Drop-in for difflib.unified_diff over lists of lines (keepends=True), using patience/Myers matching on
+    interned lines: linear-ish on large files and files full of repeated lines, where difflib goes quadratic.
+    A last line without a newline gets git's "No newline at end of file" marker so the patch applies.
+    """
+    started = False
+    for group in grouped_opcodes(opcodes(a, b), n):
+        if not started:
+            started = True
+            yield f"--- {fromfile}\n"
+            yield f"+++ {tofile}\n"
+        first, last = group[0], group[-1]
+        yield f"@@ -{_range(first[1], last[2])} +{_range(first[3], last[4])} @@\n"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield _line(" ", line)
+                continue
+            for line in a[i1:i2]:
+                yield _line("-", line)
+            for line in b[j1:j2]:
+                yield _line("+", line)
@@ -1,39 +1,174 @@
 import os
-import difflib
-from typing import Tuple
+import re
+import json
+import mmap
+import threading
+from collections import OrderedDict
+from typing import Tuple, Optional
 import subprocess
-from src.tools import git_utils
+from src.config import READ_MAX_BYTES, READ_CACHE_BYTES, READ_MMAP_THRESHOLD, READ_OUTLINE_LINES
+from src.tools import git_utils, diff_engine
 
-def read_file(path: str) -> str:
-    if not os.path.exists(path):
+# top-level definitions in common languages, used to outline files too large to return whole
+OUTLINE_PATTERN = re.compile(
+    r"^(?:async\s+def|def|class|function|export|func|fn|pub\s+fn|struct|interface|type|impl|module|package)\b"
+)
+
+_cache = OrderedDict()  # (abs path, mtime_ns, size) -> content, least recently used first
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+def _file_key(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+def _read_text(path: str) -> str:
+    """
+    Whole-file read through an LRU cache keyed by path, mtime and size, so any write invalidates it.
+    Files larger than READ_MAX_BYTES are read but not cached.
+    """
+    global _cache_bytes
+    key = _file_key(path)
+    if key is None:
         return ""
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
     with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+        content = f.read()
+    if key[2] <= READ_MAX_BYTES:
+        with _cache_lock:
+            if key not in _cache:
+                _cache[key] = content
+                _cache_bytes += key[2]
+                while _cache_bytes > READ_CACHE_BYTES and _cache:
+                    old, _ = _cache.popitem(last=False)
+                    _cache_bytes -= old[2]
+    return content
+
+def _line_range_mmap(path: str, start_line: int, end_line: Optional[int]) -> str:
+    """Lines start_line..end_line (1-based, inclusive) located by scanning newlines in a memory map."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos, line = 0, 1
+        while line < start_line:
+            nl = mm.find(b"\n", pos)
+            if nl == -1:
+                return ""
+            pos, line = nl + 1, line + 1
+        end = pos
+        while end_line is None or line <= end_line:
+            nl = mm.find(b"\n", end)
+            if nl == -1:
+                end = len(mm)
+                break
+            end, line = nl + 1, line + 1
+        return mm[pos:end].decode("utf-8", errors="replace")
+
+def _byte_range(path: str, start: int, end: Optional[int]) -> str:
+    size = os.path.getsize(path)
+    end = size if end is None else min(end, size)
+    if start >= end:
+        return ""
+    if size >= READ_MMAP_THRESHOLD:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = mm[start:end]
+    else:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+    return data.decode("utf-8", errors="replace")
+
+def outline(path: str) -> str:
+    """First READ_OUTLINE_LINES lines plus every top-level definition, with line numbers."""
+    size = os.path.getsize(path)
+    head, defs, n = [], [], 0
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for n, line in enumerate(f, 1):
+            if n <= READ_OUTLINE_LINES:
+                head.append(line.rstrip("\n"))
+            elif OUTLINE_PATTERN.match(line):
+                defs.append(f"{n}: {line.strip()}")
+    parts = [f"[{path}: {size} bytes, {n} lines; too large to return whole. "
+             f"Request a range with start_line/end_line or start_byte/end_byte.]", "\n".join(head)]
+    if defs:
+        parts.append("[top-level definitions]\n" + "\n".join(defs))
+    return "\n".join(parts)
+
+def read_file(path: str, start_line: Optional[int]=None, end_line: Optional[int]=None,
+              start_byte: Optional[int]=None, end_byte: Optional[int]=None, max_bytes: int=READ_MAX_BYTES) -> str:
+    """
+    Read a file, optionally only a line range (1-based, inclusive) or a byte range ([start, end)).
+    Small files are served from an LRU cache; large ones are sliced through mmap. A whole-file read of a
+    file over max_bytes returns an outline instead of flooding the caller.
+    """
+    if not os.path.exists(path):
+        return ""
+    if start_byte is not None or end_byte is not None:
+        return _byte_range(path, start_byte or 0, end_byte)
+    size = os.path.getsize(path)
+    if start_line is not None or end_line is not None:
+        start_line = max(1, start_line or 1)
+        if size >= READ_MMAP_THRESHOLD:
+            return _line_range_mmap(path, start_line, end_line)
+        lines = _read_text(path).splitlines(keepends=True)
+        return "".join(lines[start_line - 1:end_line])
+    if size > max_bytes:
+        return outline(path)
+    return _read_text(path)
+
+def read_file_query(query: str, repo_root: str=".") -> str:
+    """Tool entry point: a plain path, or JSON {"path", "start_line", "end_line", "start_byte", "end_byte"}."""
+    query = query.strip()
+    if not query.startswith("{"):
+        return read_file(os.path.join(repo_root, query))
+    try:
+        args = json.loads(query)
+        path = args.pop("path")
+        return read_file(os.path.join(repo_root, path), **args)
+    except (ValueError, KeyError, TypeError) as e:
+        return f"Invalid read_file input: {e}"
 
 def make_unified_diff(path: str, new_content: str, repo_root: str = ".") -> str:
     """
     Return a unified diff for path between current repo content (or empty if new) and new_content.
     The result is a text patch suitable for 'git apply'.
     """
-    old_content = ""
     abs_path = os.path.join(repo_root, path)
-    if os.path.exists(abs_path):
-        with open(abs_path, "r", encoding="utf-8") as f:
-            old_content = f.read()
+    old_content = _read_text(abs_path)
 
     old_lines = old_content.splitlines(keepends=True)
     new_lines = new_content.splitlines(keepends=True)
 
     rel_path = os.path.relpath(abs_path, repo_root)
 
-    diff = difflib.unified_diff(
+    diff = diff_engine.unified_diff(
         old_lines, new_lines,
         fromfile=f"a/{rel_path}",
         tofile=f"b/{rel_path}"
     )
     return "".join(diff)
 
-def apply_file_patch(path: str, new_content: str, repo_name: str, branch_name: str, commit_message: str, issue_number: int=None, dry_run: bool=False) -> dict:
+def apply_search_replace(content: str, edits: list) -> str:
+    """
+    Apply search/replace hunks ([{"search": ..., "replace": ...}]) to content, in order.
+    Each search text must occur exactly once in the content it is applied to; raises ValueError otherwise.
+    """
+    for n, edit in enumerate(edits, 1):
+        search, replace = edit.get("search"), edit.get("replace", "")
+        if not search:
+            raise ValueError(f"hunk {n}: empty search text")
+        count = content.count(search)
+        if count != 1:
+            where = "not found" if count == 0 else f"found {count} times, add surrounding lines to make it unique"
+            raise ValueError(f"hunk {n}: search text {where}")
+        content = content.replace(search, replace, 1)
+    return content
+
+def apply_file_patch(path: str, new_content: str, repo_name: str, branch_name: str, commit_message: str, issue_number: int=None, dry_run: bool=False, repo_root: str=".") -> dict:
     """
     Create a branch (if needed), craft a patch, apply it safely, commit, push, and optionally open a PR.
     Returns a dict with status and messages.
@@ -41,24 +176,24 @@ def apply_file_patch(path: str, new_content: str, repo_name: str, branch_name: s
     # create branch
     res = {"applied": False, "patch": None, "commit": None, "push": None, "pr": None, "error": None, "dry_run": dry_run}
     try:
-        git_utils.create_branch(branch_name, dry_run=dry_run)
-        patch_text = make_unified_diff(path, new_content)
+        git_utils.create_branch(branch_name, dry_run=dry_run, cwd=repo_root)
+        patch_text = make_unified_diff(path, new_content, repo_root=repo_root)
         res["patch"] = patch_text
 
         if not patch_text.strip():
             res["error"] = "No changes detected."
             return res
 
-        ok, msg = git_utils.stage_patch(patch_text, dry_run=dry_run)
+        ok, msg = git_utils.stage_patch(patch_text, dry_run=dry_run, cwd=repo_root)
         if not ok:
             res["error"] = f"git apply failed: {msg}"
             return res
 
-        commit_sha = git_utils.commit_index(commit_message, dry_run=dry_run)
+        commit_sha = git_utils.commit_index(commit_message, dry_run=dry_run, cwd=repo_root)
         res["applied"] = True
         res["commit"] = commit_sha
 
-        okpush, push_msg = git_utils.push_branch(branch_name, dry_run=dry_run)
+        okpush, push_msg = git_utils.push_branch(branch_name, dry_run=dry_run, cwd=repo_root)
         res["push"] = push_msg
         if not okpush:
             res["error"] = "Push failed: " + push_msg
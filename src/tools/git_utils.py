@@ -1,31 +1,120 @@
 import subprocess
 import os
+import time
 import tempfile
+import threading
 import json
 from typing import Tuple, Optional
-from src.config import GITHUB_TOKEN, REPO_OWNER
+from src.config import GITHUB_TOKEN, REPO_OWNER, FETCH_INTERVAL
+from src import tracing
 
-def _run(cmd, check=True, capture_output=True, text=True, cwd=None):
-    return subprocess.run(cmd, check=check, capture_output=capture_output, text=text, cwd=cwd)
+# throttled fetches: last fetch time per (git common dir, remote), shared by every worktree of a repo
+_last_fetch = {}
+_fetch_locks = {}
+_fetch_locks_guard = threading.Lock()
+_fetch_stats = {"fetches": 0, "skipped": 0, "fetch_seconds": 0.0}
+_worktree_locks = {}  # git common dir -> lock; `worktree add` racing a `worktree prune` loses the new worktree
 
-def current_branch(dry_run: bool=False) -> str:
+def _run(cmd, check=True, capture_output=True, text=True, cwd=None, input=None):
+    stdin = {} if input is None else {"input": input}
+    with tracing.span(" ".join(str(c) for c in cmd[:2]), cwd=cwd) as span:
+        try:
+            r = subprocess.run(cmd, check=check, capture_output=capture_output, text=text, cwd=cwd, **stdin)
+        except subprocess.CalledProcessError as e:
+            span.set(exit_code=e.returncode)
+            raise
+        if span.recording:
+            span.set(exit_code=r.returncode, bytes_out=len(r.stdout or ""))
+        return r
+
+def current_branch(dry_run: bool=False, cwd: Optional[str]=None) -> str:
     if dry_run:
         return
-    r = _run(["git", "rev-parse", "--abbrev-ref", "HEAD"])
+    r = _run(["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=cwd)
     return r.stdout.strip()
 
-def create_branch(branch_name: str, dry_run: bool=False) -> None:
+def create_branch(branch_name: str, dry_run: bool=False, cwd: Optional[str]=None) -> None:
     if dry_run:
         return 
-    _run(["git", "fetch", "origin"])
-    _run(["git", "checkout", "-b", branch_name])
+    fetch("origin", cwd=cwd)
+    _run(["git", "checkout", "-b", branch_name], cwd=cwd)
+
+def _common_dir(cwd: Optional[str]) -> str:
+    r = _run(["git", "rev-parse", "--git-common-dir"], cwd=cwd, check=False)
+    common_dir = r.stdout.strip() if r.returncode == 0 else ""
+    return os.path.abspath(os.path.join(cwd or ".", common_dir))
+
+def _fetch_key(remote: str, cwd: Optional[str]) -> tuple:
+    return (_common_dir(cwd), remote)
+
+def _has_commit(sha: str, cwd: Optional[str]) -> bool:
+    return _run(["git", "cat-file", "-e", f"{sha}^{{commit}}"], cwd=cwd, check=False).returncode == 0
 
-def checkout_branch(branch_name: str, dry_run: bool=False) -> None:
+def fetch(remote: str = "origin", dry_run: bool=False, cwd: Optional[str]=None, force: bool=False, want: Optional[str]=None) -> bool:
+    """
+    Fetch remote, at most once per FETCH_INTERVAL seconds per repository (worktrees share the throttle).
+    force bypasses the throttle; want fetches anyway if that commit isn't present locally yet.
+    Returns True if a fetch actually ran. Timings are kept in fetch_stats().
+    """
+    if dry_run:
+        return False
+    key = _fetch_key(remote, cwd)
+    with _fetch_locks_guard:
+        lock = _fetch_locks.setdefault(key, threading.Lock())
+    # concurrent callers wait for the one in-flight fetch instead of starting their own
+    with lock:
+        last = _last_fetch.get(key)
+        fresh = last is not None and time.monotonic() - last < FETCH_INTERVAL
+        if fresh and not force and not (want and not _has_commit(want, cwd)):
+            with _fetch_locks_guard:
+                _fetch_stats["skipped"] += 1
+            return False
+        start = time.monotonic()
+        _run(["git", "fetch", remote], cwd=cwd)
+        _last_fetch[key] = time.monotonic()
+        with _fetch_locks_guard:
+            _fetch_stats["fetches"] += 1
+            _fetch_stats["fetch_seconds"] += _last_fetch[key] - start
+        return True
+
+def fetch_stats() -> dict:
+    """Fetch counters; saved_seconds estimates the time skipped fetches would have taken."""
+    stats = dict(_fetch_stats)
+    avg = stats["fetch_seconds"] / stats["fetches"] if stats["fetches"] else 0.0
+    stats["saved_seconds"] = stats["skipped"] * avg
+    return stats
+
+def branch_exists(branch_name: str, cwd: Optional[str]=None) -> bool:
+    return _run(["git", "rev-parse", "--verify", "--quiet", f"refs/heads/{branch_name}"], cwd=cwd, check=False).returncode == 0
+
+def checkout_branch(branch_name: str, dry_run: bool=False, cwd: Optional[str]=None) -> None:
     if dry_run:
         return
-    _run(["git", "checkout", branch_name])
+    _run(["git", "checkout", branch_name], cwd=cwd)
 
-def stage_patch(patch_text: str, dry_run: bool=False) -> Tuple[bool, str]:
+def add_worktree(path: str, base: str="HEAD", cwd: Optional[str]=None) -> None:
+    """
+    Check out base into a new detached worktree at path, sharing the object store of the repo at cwd.
+    Each worktree has its own HEAD and index, so branches can be created there without touching other checkouts.
+    """
+    with _worktree_lock(cwd):
+        _run(["git", "worktree", "add", "--detach", path, base], cwd=cwd)
+
+def remove_worktree(path: str, cwd: Optional[str]=None) -> None:
+    with _worktree_lock(cwd):
+        _run(["git", "worktree", "remove", "--force", path], cwd=cwd, check=False)
+        _run(["git", "worktree", "prune"], cwd=cwd, check=False)
+
+def delete_branch(branch_name: str, cwd: Optional[str]=None) -> None:
+    """Delete a local branch if it exists (it must not be checked out in any worktree)."""
+    _run(["git", "branch", "-D", branch_name], cwd=cwd, check=False)
+
+def _worktree_lock(cwd: Optional[str]) -> threading.Lock:
+    key = _common_dir(cwd)
+    with _fetch_locks_guard:
+        return _worktree_locks.setdefault(key, threading.Lock())
+
+def stage_patch(patch_text: str, dry_run: bool=False, cwd: Optional[str]=None) -> Tuple[bool, str]:
     """
     Apply a unified patch to the working tree and stage changes.
     Returns (success, message). If failure, returns git-apply stderr.
@@ -41,7 +130,7 @@ def stage_patch(patch_text: str, dry_run: bool=False) -> Tuple[bool, str]:
 
     try:
         # try to apply and index (stage) the changes
-        res = _run(["git", "apply", "--index", tmp_path], check=False)
+        res = _run(["git", "apply", "--index", tmp_path], check=False, cwd=cwd)
         if res.returncode != 0:
             # capture stderr (res.stderr)
             return False, res.stderr
@@ -52,7 +141,7 @@ def stage_patch(patch_text: str, dry_run: bool=False) -> Tuple[bool, str]:
         except Exception:
             pass
 
-def commit_index(message: str, author_name: Optional[str]=None, author_email: Optional[str]=None, dry_run: bool=False) -> str:
+def commit_index(message: str, author_name: Optional[str]=None, author_email: Optional[str]=None, dry_run: bool=False, cwd: Optional[str]=None) -> str:
     if dry_run:
         return True, "Dry run: patch validated but not applied."
     env = os.environ.copy()
@@ -63,14 +152,17 @@ def commit_index(message: str, author_name: Optional[str]=None, author_email: Op
         env["GIT_AUTHOR_EMAIL"] = author_email
         env["GIT_COMMITTER_EMAIL"] = author_email
 
-    _run(["git", "commit", "-m", message], cwd=None, check=True)
-    sha = _run(["git", "rev-parse", "HEAD"]).stdout.strip()
+    _run(["git", "commit", "-m", message], cwd=cwd, check=True)
+    sha = _run(["git", "rev-parse", "HEAD"], cwd=cwd).stdout.strip()
     return sha
 
-def push_branch(branch_name: str, remote: str = "origin", dry_run: bool=False) -> Tuple[bool, str]:
+def push_branch(branch_name: str, remote: str = "origin", dry_run: bool=False, cwd: Optional[str]=None,
+                target: Optional[str]=None) -> Tuple[bool, str]:
+    """Push the local branch to the same name on remote, or to target if given."""
     if dry_run:
         return True, f"Dry run: would have pushed branch {branch_name} to {remote}."
-    res = _run(["git", "push", "--set-upstream", remote, branch_name], check=False)
+    refspec = branch_name if target is None else f"{branch_name}:{target}"
+    res = _run(["git", "push", "--set-upstream", remote, refspec], check=False, cwd=cwd)
     if res.returncode != 0:
         return False, res.stderr
     return True, "Pushed."
@@ -87,10 +179,20 @@ def create_pull_request(repo_name: str, branch_name: str, title: str, body: str,
             "body": body,
             "dry_run": True
         }
-    import requests
-    url = f"https://api.github.com/repos/{REPO_OWNER}/{repo_name}/pulls"
-    headers = {"Authorization": f"token {GITHUB_TOKEN}", "Accept": "application/vnd.github+json"}
+    from src import github_client
+    url = f"{github_client.BASE_URL}/repos/{REPO_OWNER}/{repo_name}/pulls"
     payload = {"title": title, "head": branch_name, "base": base, "body": body}
-    resp = requests.post(url, headers=headers, json=payload)
+    resp = github_client.post(url, payload)
     resp.raise_for_status()
     return resp.json()
+
+def find_pull_request(repo_name: str, branch_name: str, dry_run: bool=False) -> Optional[dict]:
+    """Return the open PR whose head is branch_name, or None."""
+    if dry_run:
+        return None
+    from src import github_client
+    url = f"{github_client.BASE_URL}/repos/{REPO_OWNER}/{repo_name}/pulls"
+    pulls = github_client.get_all_pages(url, {"head": f"{REPO_OWNER}:{branch_name}", "state": "open"})
+    if isinstance(pulls, list) and pulls:
+        return pulls[0]
+    return None
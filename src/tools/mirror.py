@@ -0,0 +1,48 @@
+import os
+import threading
+from typing import Optional
+from src.config import MIRROR_ROOT, REPO_OWNER
+from src.tools import git_utils
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+def mirror_path(repo_name: str) -> str:
+    return os.path.abspath(os.path.join(MIRROR_ROOT, f"{repo_name}.git"))
+
+def remote_url(repo_name: str) -> str:
+    return f"https://github.com/{REPO_OWNER}/{repo_name}.git"
+
+def ensure_mirror(repo_name: str, url: Optional[str]=None, want: Optional[str]=None) -> str:
+    """
+    Return the path of the bare mirror for repo_name, cloning it on first use.
+    Later calls only fetch incrementally, and at most once per FETCH_INTERVAL unless want
+    (a base commit SHA) is missing locally. Branches are tracked as refs/remotes/origin/*
+    so worktrees created from the mirror can push back to origin normally.
+    """
+    path = mirror_path(repo_name)
+    with _locks_guard:
+        lock = _locks.setdefault(path, threading.Lock())
+    with lock:
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            git_utils._run(["git", "clone", "--bare", url or remote_url(repo_name), path])
+            git_utils._run(["git", "config", "remote.origin.fetch", "+refs/heads/*:refs/remotes/origin/*"], cwd=path)
+            git_utils.fetch(cwd=path, force=True)
+        else:
+            git_utils.fetch(cwd=path, want=want)
+    return path
+
+def add_worktree(repo_name: str, path: str, base_branch: str="main", base_sha: Optional[str]=None, url: Optional[str]=None,
+                 repo_root: Optional[str]=None) -> str:
+    """
+    Create a detached worktree at path, at base_sha if given, else origin/base_branch, off repo_root (a shared
+    clone) or else the mirror. Fetches through the same throttle, so only a stale repo or a missing base_sha
+    costs a fetch. Returns the repository the worktree belongs to.
+    """
+    if repo_root is None:
+        repo_root = ensure_mirror(repo_name, url=url, want=base_sha)
+    else:
+        git_utils.fetch(cwd=repo_root, want=base_sha)
+    git_utils.add_worktree(path, base_sha or f"origin/{base_branch}", cwd=repo_root)
+    return repo_root
@@ -0,0 +1,300 @@
+import os
+import re
+import math
+import pickle
+import hashlib
+import tempfile
+import contextlib
+import threading
+import subprocess
+from collections import Counter, OrderedDict
+from src.config import RETRIEVAL_INDEX_DIR, RETRIEVAL_KEEP_COMMITS, RETRIEVAL_TOP_K, SEARCH_MAX_FILE_BYTES
+from src.tools import git_utils, tree_index
+
+K1, B = 1.2, 0.75
+MEMORY_SLOTS = 8        # per-commit BM25 indexes kept in memory
+SNIPPET_LINES = 3
+MAX_OUTLINE_LINES = 400 # declaration/docstring/comment lines kept per file for snippets
+CAT_BATCH = 500         # blobs read per `git cat-file --batch` call
+
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+CAMEL = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+DECLARATION = re.compile(r"^\s*(?:export\s+)?(?:async\s+)?(?:def|class|function|func|fn|interface|struct|enum|type|module)\b")
+COMMENT = re.compile(r"^\s*(?:#|//|/\*|\*|--|\"\"\"|''')")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from has have how i if in into is it its not of on or so "
+    "that the this to was we what when where which will with would you self none true false return "
+    "import def class".split()
+)
+
+def tokenize(text: str) -> list:
+    """Lowercased words, with snake_case and camelCase identifiers also split into their parts."""
+    tokens = []
+    for word in WORD.findall(text):
+        word = word.strip("_")
+        if not word:
+            continue
+        lower = word.lower()
+        parts = [p.lower() for p in CAMEL.findall(word)]
+        if lower not in STOPWORDS:
+            tokens.append(lower)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS)
+    return tokens
+
+def outline(text: str) -> list:
+    """(line number, line) for the declaration, docstring and comment lines of a source file."""
+    lines, in_doc = [], False
+    for n, line in enumerate(text.splitlines(), 1):
+        stripped = line.strip()
+        quotes = stripped.count('"""') + stripped.count("'''")
+        keep = in_doc or quotes or DECLARATION.match(line) or COMMENT.match(line)
+        if quotes % 2:
+            in_doc = not in_doc
+        if keep and stripped:
+            lines.append((n, stripped[:200]))
+            if len(lines) >= MAX_OUTLINE_LINES:
+                break
+    return lines
+
+def document(path: str, data: bytes) -> tuple:
+    """(term counts, outline) for one file; paths count even for binary or oversized files."""
+    terms = Counter(tokenize(path.replace("/", " ")))
+    lines = []
+    if len(data) <= SEARCH_MAX_FILE_BYTES and b"\0" not in data[:8192]:
+        lines = outline(data.decode("utf-8", errors="replace"))
+        for _, line in lines:
+            terms.update(tokenize(line))
+    return terms, lines
+
+def _cat_blobs(repo_root: str, blobs: list) -> dict:
+    """Contents of many blobs from a single `git cat-file --batch` call."""
+    if not blobs:
+        return {}
+    out = git_utils._run(["git", "cat-file", "--batch"], text=False, cwd=repo_root,
+                         input="".join(b + "\n" for b in blobs).encode()).stdout
+    pos, contents = 0, {}
+    for blob in blobs:
+        end = out.index(b"\n", pos)
+        header = out[pos:end].split()
+        pos = end + 1
+        if len(header) < 3:  # "<sha> missing"
+            continue
+        size = int(header[2])
+        contents[blob] = out[pos:pos + size]
+        pos += size + 1
+    return contents
+
+class BlobStore:
+    """
+    Per-blob documents (term counts + outline), keyed by (blob, path) and grouped by key prefix into
+    at most 256 shard files under root/docs. Blobs are content-addressed, so a new commit only tokenizes
+    the files it actually changed, reading them CAT_BATCH blobs at a time, and only the shards holding
+    those are rewritten. Every indexed commit records the documents it uses under root/commits; beyond
+    the keep_commits most recently indexed, the oldest records go, and with them every document no
+    remaining commit uses.
+    """
+    def __init__(self, root: str=RETRIEVAL_INDEX_DIR, keep_commits: int=RETRIEVAL_KEEP_COMMITS):
+        self.root = root
+        self.keep_commits = keep_commits
+        self.docs = {}  # (blob, path) -> document, for the documents this process has used
+        self._lock = threading.Lock()  # guards docs and every read-modify-write of a shard
+
+    @staticmethod
+    def key(blob: str, path: str) -> str:
+        return hashlib.sha1(f"{blob}\0{path}".encode()).hexdigest()
+
+    def _shard_path(self, prefix: str) -> str:
+        return os.path.join(self.root, "docs", f"{prefix}.pickle")
+
+    def _commit_path(self, sha: str) -> str:
+        return os.path.join(self.root, "commits", f"{sha}.txt")
+
+    def _load_shard(self, prefix: str) -> dict:
+        """{key: document} stored in one shard."""
+        try:
+            with open(self._shard_path(prefix), "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return {}
+
+    def _save_shard(self, prefix: str, shard: dict) -> None:
+        if shard:
+            self._write(self._shard_path(prefix), pickle.dumps(shard, protocol=pickle.HIGHEST_PROTOCOL))
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._shard_path(prefix))
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _by_shard(keys) -> dict:
+        shards = {}
+        for key in keys:
+            shards.setdefault(key[:2], []).append(key)
+        return shards
+
+    def documents(self, repo_root: str, sha: str, entries: list) -> dict:
+        """{path: (terms, outline)} for the (path, size, blob) entries of the tree index of commit sha."""
+        with self._lock:
+            wanted = {self.key(blob, path): (path, blob) for path, _, blob in entries if (blob, path) not in self.docs}
+        found, missing = {}, []
+        for prefix, keys in self._by_shard(wanted).items():
+            shard = self._load_shard(prefix)
+            for key in keys:
+                path, blob = wanted[key]
+                if key in shard:
+                    found[(blob, path)] = shard[key]
+                else:
+                    missing.append((blob, path))
+        missing.sort()
+        for i in range(0, len(missing), CAT_BATCH):
+            batch = missing[i:i + CAT_BATCH]
+            contents = _cat_blobs(repo_root, sorted({blob for blob, _ in batch}))
+            for blob, path in batch:
+                found[(blob, path)] = document(path, contents.get(blob, b""))
+        if missing:
+            self._store({self.key(blob, path): found[(blob, path)] for blob, path in missing})
+        with self._lock:
+            self.docs.update(found)
+            docs = {path: self.docs[(blob, path)] for path, _, blob in entries}
+        self._record(sha, entries)
+        return docs
+
+    def _store(self, docs: dict) -> None:
+        """Add {key: document} to the shards; each affected shard is read and rewritten once."""
+        with self._lock:
+            for prefix, keys in self._by_shard(docs).items():
+                shard = self._load_shard(prefix)
+                shard.update((key, docs[key]) for key in keys)
+                self._save_shard(prefix, shard)
+
+    def _record(self, sha: str, entries: list) -> None:
+        """Mark commit sha as recently indexed, and prune once more than keep_commits are recorded."""
+        path = self._commit_path(sha)
+        if os.path.exists(path):
+            os.utime(path)
+            return
+        self._write(path, "\n".join(self.key(blob, p) for p, _, blob in entries).encode())
+        commits_dir = os.path.dirname(path)
+        records = sorted((os.path.join(commits_dir, n) for n in os.listdir(commits_dir) if n.endswith(".txt")),
+                         key=os.path.getmtime, reverse=True)
+        if len(records) > self.keep_commits:
+            for old in records[self.keep_commits:]:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(old)
+            self.prune(records[:self.keep_commits])
+
+    def prune(self, records: list) -> int:
+        """Delete the documents none of the given commit records use. Returns how many were deleted."""
+        keep = set()
+        for record in records:
+            with contextlib.suppress(FileNotFoundError), open(record, "r", encoding="utf-8") as f:
+                keep.update(f.read().split())
+        removed = 0
+        docs_dir = os.path.join(self.root, "docs")
+        with self._lock:
+            for name in os.listdir(docs_dir) if os.path.isdir(docs_dir) else []:
+                if not name.endswith(".pickle"):
+                    continue
+                prefix = name[:-len(".pickle")]
+                shard = self._load_shard(prefix)
+                kept = {k: d for k, d in shard.items() if k in keep}
+                if len(kept) < len(shard):
+                    self._save_shard(prefix, kept)
+                    removed += len(shard) - len(kept)
+            self.docs = {k: d for k, d in self.docs.items() if self.key(*k) in keep}
+        return removed
+
+class BM25Index:
+    """Okapi BM25 over the documents of one commit."""
+    def __init__(self, sha: str, docs: dict):
+        self.sha = sha
+        self.docs = docs
+        self.lengths = {path: sum(terms.values()) for path, (terms, _) in docs.items()}
+        self.avg_length = sum(self.lengths.values()) / max(1, len(docs))
+        self.df = Counter()
+        for terms, _ in docs.values():
+            self.df.update(terms.keys())
+
+    def idf(self, term: str) -> float:
+        n = self.df.get(term, 0)
+        return math.log(1 + (len(self.docs) - n + 0.5) / (n + 0.5))
+
+    def score(self, query_terms: Counter) -> list:
+        """[(score, path)] for every document matching at least one query term, best first."""
+        weights = {t: self.idf(t) * min(qtf, 3) for t, qtf in query_terms.items() if t in self.df}
+        scores = []
+        for path, (terms, _) in self.docs.items():
+            norm = K1 * (1 - B + B * self.lengths[path] / (self.avg_length or 1))
+            s = 0.0
+            for t, w in weights.items():
+                tf = terms.get(t)
+                if tf:
+                    s += w * tf * (K1 + 1) / (tf + norm)
+            if s > 0:
+                scores.append((s, path))
+        scores.sort(key=lambda x: (-x[0], x[1]))
+        return scores
+
+    def snippets(self, path: str, query_terms: Counter) -> list:
+        """The outline lines of path sharing the most query terms."""
+        ranked = []
+        for n, line in self.docs[path][1]:
+            hits = len(set(tokenize(line)) & query_terms.keys())
+            if hits:
+                ranked.append((-hits, n, line))
+        return [f"{n}: {line}" for _, n, line in sorted(ranked)[:SNIPPET_LINES]]
+
+_store = None
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+def get_index(repo_root: str=".") -> BM25Index:
+    """BM25 index for the commit HEAD points at, cached per commit SHA in memory; documents persist per blob."""
+    global _store
+    tree = tree_index.get_index(repo_root)
+    with _lock:
+        if tree.sha in _memory:
+            _memory.move_to_end(tree.sha)
+            return _memory[tree.sha]
+        if _store is None:
+            _store = BlobStore()
+        store = _store
+    index = BM25Index(tree.sha, store.documents(repo_root, tree.sha, tree.entries))
+    with _lock:
+        _memory[tree.sha] = index
+        while len(_memory) > MEMORY_SLOTS:
+            _memory.popitem(last=False)
+    return index
+
+def issue_terms(issue_data: dict) -> Counter:
+    """Query terms from an issue: the title counts double, then the body and comment bodies."""
+    issue = issue_data.get("issue") or {}
+    title = issue.get("title") or ""
+    terms = Counter(tokenize(title) * 2)
+    terms.update(tokenize(issue.get("body") or ""))
+    comments = issue_data.get("comments")
+    for c in comments if isinstance(comments, list) else []:
+        terms.update(tokenize(c.get("body") or ""))
+    return terms
+
+def rank_files(issue_data: dict, repo_root: str=".", top_k: int=RETRIEVAL_TOP_K) -> list:
+    """The top_k tracked files most relevant to the issue, as [{"path", "score", "snippets"}]."""
+    if top_k <= 0:
+        return []
+    query = issue_terms(issue_data)
+    if not query:
+        return []
+    try:
+        index = get_index(repo_root)
+    except subprocess.CalledProcessError:
+        return []  # no commit to index yet; the suggestions are only a head start
+    return [{"path": path, "score": round(score, 2), "snippets": index.snippets(path, query)}
+            for score, path in index.score(query)[:top_k]]
@@ -0,0 +1,98 @@
+import os
+import json
+import sqlite3
+import tempfile
+from typing import Optional
+from src.config import TEST_MAP_DIR
+from src.tools import git_utils
+from src.tools.test_results import _agent_excludes
+
+MAP_LOOKBACK = 50  # ancestors of HEAD searched for a stored coverage map
+# changes to these affect every test, so they force the full suite
+GLOBAL_FILES = ("conftest.py", "pytest.ini", "setup.cfg", "tox.ini", "pyproject.toml", "setup.py")
+
+def is_test_file(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+def read_coverage_contexts(coverage_file: str, repo_root: str) -> dict:
+    """
+    {source path relative to repo_root: sorted test node ids} from a coverage.py data file written with
+    pytest-cov's --cov-context=test (contexts look like "tests/test_x.py::test_y|run").
+    Reads the SQLite schema directly so the agent itself doesn't need coverage installed.
+    """
+    root = os.path.abspath(repo_root)
+    tests = {}
+    with sqlite3.connect(coverage_file) as db:
+        rows = db.execute(
+            "SELECT DISTINCT file.path, context.context FROM line_bits "
+            "JOIN file ON file.id = line_bits.file_id JOIN context ON context.id = line_bits.context_id"
+        )
+        for path, context in rows:
+            node = context.rsplit("|", 1)[0]
+            if not node:
+                continue  # lines run at import/collection time belong to no single test
+            rel = os.path.relpath(path, root)
+            if rel.startswith(".."):
+                continue
+            tests.setdefault(rel, set()).add(node)
+    return {path: sorted(nodes) for path, nodes in tests.items()}
+
+def _map_path(sha: str) -> str:
+    return os.path.join(TEST_MAP_DIR, f"{sha}.json")
+
+def save_map(sha: str, coverage_map: dict) -> None:
+    os.makedirs(TEST_MAP_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=TEST_MAP_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(coverage_map, f)
+    os.replace(tmp_path, _map_path(sha))
+
+def load_map(repo_root: str=".") -> Optional[tuple]:
+    """(commit, map) for the nearest ancestor of HEAD with a stored coverage map, or None."""
+    r = git_utils._run(["git", "rev-list", f"--max-count={MAP_LOOKBACK}", "HEAD"], cwd=repo_root, check=False)
+    for sha in r.stdout.split():
+        try:
+            with open(_map_path(sha), "r", encoding="utf-8") as f:
+                return sha, json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+    return None
+
+def changed_files(since: str, repo_root: str=".") -> list:
+    """
+    Files changed in the working tree (committed, staged, unstaged or untracked) relative to commit since,
+    leaving out the agent's own state and caches.
+    """
+    pathspec = ["--", "."] + _agent_excludes(repo_root)
+    diff = git_utils._run(["git", "diff", "--name-only", "-z", since] + pathspec, cwd=repo_root).stdout
+    untracked = git_utils._run(["git", "ls-files", "--others", "--exclude-standard", "-z"] + pathspec, cwd=repo_root).stdout
+    return sorted({p for p in (diff + untracked).split("\0") if p})
+
+def impacted_tests(repo_root: str=".") -> Optional[list]:
+    """
+    Test node ids (or whole test files) affected by changes since the last mapped commit.
+    None means "can't tell, run everything": no map yet, a change to conftest/pytest configuration, or a
+    changed file the map doesn't know. The map only holds Python lines run inside tests, so a module
+    executed purely at import time (constants, config), a new module, or a data file tests read (JSON
+    fixtures, templates) has no entry, and skipping it would select nothing for a change that can
+    affect any test.
+    """
+    found = load_map(repo_root)
+    if found is None:
+        return None
+    sha, coverage_map = found
+    selected = set()
+    for path in changed_files(sha, repo_root):
+        if os.path.basename(path) in GLOBAL_FILES:
+            return None
+        if is_test_file(path):
+            if os.path.exists(os.path.join(repo_root, path)):
+                selected.add(path)
+            continue
+        if path not in coverage_map:
+            return None
+        selected.update(coverage_map[path])
+    # a test file selected whole makes its individual node ids redundant
+    files = {s for s in selected if "::" not in s}
+    return sorted(s for s in selected if s in files or s.split("::", 1)[0] not in files)
@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import Optional
+from src.config import (
+    TEST_RESULTS_DIR, TEST_FAILURE_CHARS, TEST_MAX_FAILURES, STATE_DIR, LLM_CACHE_DIR, HTTP_CACHE_DIR, MIRROR_ROOT,
+    TREE_CACHE_DIR, SEARCH_INDEX_DIR, RETRIEVAL_INDEX_DIR, TEST_MAP_DIR, WORKTREE_ROOT,
+)
+from src.tools import git_utils
+
+# the agent's own state and caches; in single-issue mode they sit inside the target repo's work tree
+AGENT_DIRS = (STATE_DIR, LLM_CACHE_DIR, HTTP_CACHE_DIR, MIRROR_ROOT, TREE_CACHE_DIR, SEARCH_INDEX_DIR,
+              RETRIEVAL_INDEX_DIR, TEST_MAP_DIR, TEST_RESULTS_DIR, WORKTREE_ROOT)
+
+def _agent_excludes(cwd: Optional[str]) -> list:
+    """git pathspecs leaving out the AGENT_DIRS that lie inside the work tree at cwd."""
+    root = os.path.abspath(cwd or ".")
+    specs = []
+    for directory in AGENT_DIRS:
+        rel = os.path.relpath(os.path.abspath(directory), root)
+        if rel != "." and not rel.startswith(".."):
+            specs.append(f":(exclude){rel}")
+    return specs
+
+def tree_state(cwd: Optional[str]=None) -> Optional[str]:
+    """
+    Hash identifying the working tree's content: the index tree SHA plus a hash of every file that differs
+    from the index (modified, deleted or untracked). The agent's own state and cache directories don't count,
+    or every tool call would change it. None if the index can't be written (e.g. mid-merge).
+    """
+    r = git_utils._run(["git", "write-tree"], cwd=cwd, check=False)
+    if r.returncode != 0:
+        return None
+    h = hashlib.sha1(r.stdout.strip().encode())
+    pathspec = ["--", "."] + _agent_excludes(cwd)
+    dirty = git_utils._run(["git", "diff", "--name-only", "-z"] + pathspec, cwd=cwd).stdout
+    untracked = git_utils._run(["git", "ls-files", "--others", "--exclude-standard", "-z"] + pathspec, cwd=cwd).stdout
+    for path in sorted({p for p in (dirty + untracked).split("\0") if p}):
+        h.update(b"\0" + path.encode() + b"\0")
+        try:
+            with open(os.path.join(cwd or ".", path), "rb") as f:
+                h.update(hashlib.sha1(f.read()).digest())
+        except (FileNotFoundError, IsADirectoryError):
+            h.update(b"-")
+    return h.hexdigest()
+
+def parse_junit(path: str) -> list:
+    """[{"test", "outcome", "duration", "message"}] from a pytest --junitxml report; [] if there is none."""
+    try:
+        root = ET.parse(path).getroot()
+    except (FileNotFoundError, ET.ParseError):
+        return []
+    tests = []
+    for case in root.iter("testcase"):
+        entry = {"test": f"{case.get('classname')}.{case.get('name')}" if case.get("classname") else case.get("name"),
+                 "outcome": "passed", "duration": round(float(case.get("time") or 0), 3)}
+        for tag, outcome in (("failure", "failed"), ("error", "error"), ("skipped", "skipped")):
+            child = case.find(tag)
+            if child is not None:
+                entry["outcome"] = outcome
+                if outcome != "skipped":
+                    text = "\n".join(t for t in (child.get("message"), child.text) if t)
+                    entry["message"] = text[-TEST_FAILURE_CHARS:]
+                break
+        tests.append(entry)
+    return tests
+
+def summarize(exit_code: int, output: str, tests: list, mode: str, timed_out: bool=False) -> dict:
+    """Compact result for the prompt: counts, duration, and the first failures with truncated output."""
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    for t in tests:
+        counts[t["outcome"]] += 1
+    failures = [{"test": t["test"], "message": t.get("message", "")} for t in tests if t["outcome"] in ("failed", "error")]
+    result = {"mode": mode, "exit_code": exit_code, "timed_out": timed_out, **counts,
+              "duration": round(sum(t["duration"] for t in tests), 2), "failures": failures[:TEST_MAX_FAILURES]}
+    if not tests or (exit_code not in (0, 1, 5) and not failures):
+        # nothing structured to report (collection or usage error, timeout): keep the end of the raw output
+        result["output"] = output[-TEST_FAILURE_CHARS:]
+    return result
+
+class ResultCache:
+    """Test outcomes stored as JSON under root, keyed by tree state and test selection."""
+    def __init__(self, root: str=TEST_RESULTS_DIR):
+        self.root = root
+
+    def key(self, state: str, selection: str) -> str:
+        return hashlib.sha256(f"{state}\0{selection}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(os.path.join(self.root, f"{key}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, key: str, record: dict) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(tmp_path, os.path.join(self.root, f"{key}.json"))
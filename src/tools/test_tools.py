@@ -1,5 +1,180 @@
+import os
+import shlex
+import sqlite3
 import subprocess
+import tempfile
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+from src import tracing
+from src.config import TEST_TIMEOUT, TEST_WORKERS
+from src.tools import git_utils, test_impact
+from src.tools.test_results import ResultCache, parse_junit, summarize, tree_state
+from src.tools.tree_index import head_sha
 
-def run_tests():
-    result = subprocess.run(["pytest", "--maxfail=1"], capture_output=True, text=True)
-    return result.stdout or result.stderr
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: pyproject.toml addopts are dropped
+    tomllib = None
+
+PYTEST = ["pytest", "--maxfail=1", "-q", "-p", "no:cacheprovider"]
+# pytest-cov options that take a value; --cov's is optional, as in pytest-cov's own parser
+COV_VALUE_OPTIONS = ("--cov", "--cov-report", "--cov-config", "--cov-fail-under", "--cov-context")
+MAX_NODE_ARGS = 1000  # past this many selected node ids, pass their files instead
+USAGE_ERROR, NO_TESTS = 4, 5
+TIMED_OUT = -1
+_cov_unavailable = False  # set once pytest rejects the --cov options: pytest-cov isn't installed, stop trying
+
+def configured_addopts(repo_root: str) -> list:
+    """addopts from the pytest config file in repo_root, found in pytest's order ([] if none)."""
+    for name, section in (("pytest.ini", "pytest"), (".pytest.ini", "pytest"), ("pyproject.toml", None),
+                          ("tox.ini", "pytest"), ("setup.cfg", "tool:pytest")):
+        path = os.path.join(repo_root, name)
+        if not os.path.isfile(path):
+            continue
+        if section is None:
+            if tomllib is None:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    options = tomllib.load(f).get("tool", {}).get("pytest", {}).get("ini_options")
+            except (OSError, ValueError):
+                continue
+            if options is None:
+                continue
+            addopts = options.get("addopts", [])
+            return shlex.split(addopts) if isinstance(addopts, str) else [str(a) for a in addopts]
+        parser = configparser.ConfigParser(interpolation=None)
+        try:
+            parser.read(path, encoding="utf-8")
+        except configparser.Error:
+            continue
+        if parser.has_section(section):
+            return shlex.split(parser.get(section, "addopts", fallback=""))
+        if name == "pytest.ini":
+            return []  # pytest.ini is the config file even without a [pytest] section
+    return []
+
+def without_coverage(args: list) -> list:
+    """args minus pytest-cov's options (and their values); coverage is switched on only by run_full."""
+    kept, i = [], 0
+    while i < len(args):
+        arg = args[i]
+        i += 1
+        if not arg.startswith(("--cov", "--no-cov")):
+            kept.append(arg)
+        elif arg in COV_VALUE_OPTIONS and i < len(args) and not args[i].startswith("-"):
+            i += 1
+    return kept
+
+def _pytest(args: list, cwd: Optional[str], timeout: int, env: Optional[dict]=None) -> Tuple[int, str, list]:
+    """Run pytest; returns (exit code, output, per-test results from its junit report)."""
+    # the target repo's addopts stay in effect, except coverage: it slows every run down
+    addopts = shlex.join(without_coverage(configured_addopts(cwd or ".")))
+    fd, junit = tempfile.mkstemp(suffix=".xml")
+    os.close(fd)
+    try:
+        with tracing.span("pytest", cwd=cwd) as span:
+            try:
+                result = subprocess.run(PYTEST + ["-o", f"addopts={addopts}", f"--junitxml={junit}"] + args,
+                                        capture_output=True, text=True, cwd=cwd, timeout=timeout, env=env)
+            except subprocess.TimeoutExpired as e:
+                span.set(exit_code=TIMED_OUT, timed_out=True)
+                out = e.stdout.decode(errors="replace") if isinstance(e.stdout, bytes) else (e.stdout or "")
+                return TIMED_OUT, out + f"\n[timed out after {timeout}s]", []
+            span.set(exit_code=result.returncode)
+            return result.returncode, result.stdout or result.stderr, parse_junit(junit)
+    finally:
+        os.remove(junit)
+
+def passed(code: int) -> bool:
+    return code in (0, NO_TESTS)
+
+def _clean(cwd: Optional[str]) -> bool:
+    r = git_utils._run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd, check=False)
+    return r.returncode == 0 and not r.stdout.strip()
+
+def run_full(cwd: Optional[str]=None, timeout: int=TEST_TIMEOUT) -> Tuple[int, str, list]:
+    """
+    Full suite in one process. When pytest-cov is available it also records which tests cover which
+    files, and a passing run on a clean tree is stored as the impact map for HEAD.
+    """
+    global _cov_unavailable
+    root = cwd or "."
+    if _cov_unavailable:
+        return _pytest([], cwd, timeout)
+    fd, coverage_file = tempfile.mkstemp(suffix=".coverage")
+    os.close(fd)
+    try:
+        env = dict(os.environ, COVERAGE_FILE=coverage_file)
+        cov_args = [f"--cov={os.path.abspath(root)}", "--cov-context=test", "--cov-report="]
+        code, out, tests = _pytest(cov_args, cwd, timeout, env)
+        if code == USAGE_ERROR:
+            _cov_unavailable = True
+            return _pytest([], cwd, timeout)
+        if code == 0 and _clean(cwd):
+            try:
+                test_impact.save_map(head_sha(root), test_impact.read_coverage_contexts(coverage_file, root))
+            except sqlite3.Error:
+                pass  # the suite passed; only the map is missing
+        return code, out, tests
+    finally:
+        os.remove(coverage_file)
+
+def _shards(selected: list, workers: int) -> list:
+    """Split node ids into at most workers groups, keeping each test file's tests in one group."""
+    if len(selected) > MAX_NODE_ARGS:
+        selected = sorted({s.split("::", 1)[0] for s in selected})
+    by_file = {}
+    for node in selected:
+        by_file.setdefault(node.split("::", 1)[0], []).append(node)
+    groups = [[] for _ in range(max(1, min(workers, len(by_file))))]
+    for nodes in sorted(by_file.values(), key=len, reverse=True):
+        min(groups, key=len).extend(nodes)
+    return [g for g in groups if g]
+
+def run_selected(selected: list, cwd: Optional[str]=None, timeout: int=TEST_TIMEOUT, workers: int=TEST_WORKERS) -> Tuple[int, str, list]:
+    """Run the given node ids as parallel pytest processes, one per shard; the first failing code wins."""
+    shards = _shards(selected, workers)
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        results = list(pool.map(tracing.bind(lambda shard: _pytest(shard, cwd, timeout)), shards))
+    code = next((c for c, _, _ in results if not passed(c)), 0)
+    return code, "\n".join(out for _, out, _ in results), [t for _, _, tests in results for t in tests]
+
+def run_tests(mode: str="full", cwd: Optional[str]=None, timeout: int=TEST_TIMEOUT, cache: Optional[ResultCache]=None) -> dict:
+    """
+    mode "full" runs the whole suite; "impacted" runs only the tests covering files changed since the
+    last mapped commit, in parallel, and falls back to the full suite when that can't be determined.
+    Every pytest process is killed after timeout seconds.
+
+    Returns a compact summary (counts, duration, first failures). Outcomes are memoized by working-tree
+    state and selection, so re-running an unchanged (or reverted-to) tree returns at once with "cached".
+    """
+    cache = cache or ResultCache()
+    selected = None
+    if (mode or "").strip().lower() == "impacted":
+        selected = test_impact.impacted_tests(cwd or ".")
+        if selected == []:
+            return {"mode": "impacted", "selected": 0, "message": "No tests cover the changed files."}
+    selection = "full" if selected is None else "impacted:" + "\n".join(selected)
+
+    state = tree_state(cwd)
+    key = cache.key(state, selection) if state else None
+    record = cache.get(key) if key else None
+    if record is not None:
+        return dict(record["summary"], cached=True)
+
+    if selected is None:
+        code, out, tests = run_full(cwd, timeout)
+        summary = summarize(code, out, tests, "full", timed_out=code == TIMED_OUT)
+    else:
+        code, out, tests = run_selected(selected, cwd, timeout)
+        summary = dict(summarize(code, out, tests, "impacted", timed_out=code == TIMED_OUT), selected=len(selected))
+    if key and code in (0, 1, NO_TESTS):  # definite outcomes only; timeouts and crashes are retried
+        cache.put(key, {"summary": summary, "tests": tests})
+    return dict(summary, cached=False)
+
+def verify_full_suite(cwd: Optional[str]=None, timeout: int=TEST_TIMEOUT) -> Tuple[bool, dict]:
+    """Full-suite gate run before changes are pushed and a PR is opened."""
+    result = run_tests("full", cwd, timeout)
+    return passed(result["exit_code"]), result
@@ -0,0 +1,68 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+from src import tracing
+from src.config import TOOL_BATCH_WORKERS, TOOL_BATCH_MAX_CALLS
+
+# tools that only look at the repo (run_tests writes nothing but its own caches); everything else is serialized
+READ_ONLY = frozenset({"read_file", "list_repo_tree", "search_code", "run_tests"})
+
+def parse_calls(tool_input: str) -> list:
+    """[(tool name, input string)] from a JSON list of {"tool", "input"} objects; raises ValueError."""
+    calls = json.loads(tool_input)
+    if isinstance(calls, dict):
+        calls = calls.get("calls")
+    if not isinstance(calls, list) or not calls:
+        raise ValueError('expected a JSON list of {"tool": ..., "input": ...} objects')
+    if len(calls) > TOOL_BATCH_MAX_CALLS:
+        raise ValueError(f"at most {TOOL_BATCH_MAX_CALLS} calls per batch, got {len(calls)}")
+    parsed = []
+    for call in calls:
+        if not isinstance(call, dict) or not isinstance(call.get("tool"), str):
+            raise ValueError(f"each call needs a tool name, got {call!r}")
+        value = call.get("input", "")
+        # tools take one string; structured inputs are passed on as the JSON they document
+        parsed.append((call["tool"], value if isinstance(value, str) else json.dumps(value)))
+    return parsed
+
+def _call(funcs: Dict[str, Callable], name: str, tool_input: str) -> str:
+    if name not in funcs:
+        return f"Unknown tool {name!r}; available: {', '.join(sorted(funcs))}"
+    try:
+        return str(funcs[name](tool_input))
+    except Exception as e:
+        return f"Error: {type(e).__name__}: {e}"
+
+def run_calls(calls: list, funcs: Dict[str, Callable], read_only=READ_ONLY, workers: int=TOOL_BATCH_WORKERS) -> list:
+    """
+    Run (tool name, input) calls and return their outputs in call order. Each run of consecutive read-only
+    calls executes concurrently; any other call waits for everything before it and runs alone, so edits
+    and commits keep their order and never overlap a read. A failing call yields an error text, not an exception.
+    """
+    outputs = [None] * len(calls)
+    i = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while i < len(calls):
+            if calls[i][0] not in read_only:
+                outputs[i] = _call(funcs, *calls[i])
+                i += 1
+                continue
+            j = i
+            while j < len(calls) and calls[j][0] in read_only:
+                j += 1
+            futures = [(k, pool.submit(tracing.bind(_call), funcs, *calls[k])) for k in range(i, j)]
+            for k, future in futures:
+                outputs[k] = future.result()
+            i = j
+    return outputs
+
+def batch_query(tool_input: str, funcs: Dict[str, Callable], read_only=READ_ONLY, workers: int=TOOL_BATCH_WORKERS) -> str:
+    """The batch tool: run every call in tool_input and return all results as one numbered observation."""
+    try:
+        calls = parse_calls(tool_input)
+    except ValueError as e:
+        return f"Invalid batch input: {e}"
+    with tracing.span("tool batch", calls=len(calls)):
+        outputs = run_calls(calls, funcs, read_only, workers)
+    return "\n\n".join(f"[{n}] {name} {tool_input[:80]!r}:\n{output}"
+                       for n, ((name, tool_input), output) in enumerate(zip(calls, outputs), 1))
@@ -0,0 +1,151 @@
+import os
+import json
+import bisect
+import fnmatch
+import tempfile
+import threading
+import contextlib
+from collections import OrderedDict
+from typing import Optional
+from src.config import TREE_CACHE_DIR, TREE_KEEP_COMMITS, TREE_PAGE_SIZE
+from src.tools import git_utils
+
+MEMORY_SLOTS = 8  # indexes kept in memory, most recently used commits
+
+class TreeIndex:
+    """
+    Sorted list of the files tracked at one commit, with their sizes and blob SHAs.
+    Prefix queries are a bisect over the sorted paths, so browsing a 200k-file tree stays cheap.
+    """
+    def __init__(self, sha: str, entries: list):
+        self.sha = sha
+        self.entries = sorted(entries)
+        self.paths = [e[0] for e in self.entries]
+
+    def files(self, prefix: str="", pattern: Optional[str]=None) -> list:
+        """Entries under the directory prefix ("src" is "src/", not "src2/"), or the file it names."""
+        exact = []
+        if prefix and not prefix.endswith("/"):
+            i = bisect.bisect_left(self.paths, prefix)
+            exact = self.entries[i:i + 1] if self.paths[i:i + 1] == [prefix] else []
+            prefix += "/"
+        lo = bisect.bisect_left(self.paths, prefix)
+        hi = bisect.bisect_left(self.paths, prefix + "\U0010ffff") if prefix else len(self.paths)
+        selected = exact + self.entries[lo:hi]
+        if pattern:
+            selected = [e for e in selected if fnmatch.fnmatch(e[0], pattern) or fnmatch.fnmatch(os.path.basename(e[0]), pattern)]
+        return selected
+
+    def page(self, prefix: str="", pattern: Optional[str]=None, page: int=1, page_size: int=TREE_PAGE_SIZE) -> dict:
+        selected = self.files(prefix, pattern)
+        pages = max(1, -(-len(selected) // page_size))
+        page = min(max(1, page), pages)
+        chunk = selected[(page - 1) * page_size:page * page_size]
+        return {"commit": self.sha, "total": len(selected), "page": page, "pages": pages,
+                "files": [{"path": p, "size": size} for p, size, _ in chunk]}
+
+    def summarize(self, prefix: str="") -> dict:
+        """Immediate children of the directory prefix: subdirectories with file counts and total bytes, plus files."""
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        dirs = OrderedDict()
+        files = []
+        for path, size, _ in self.files(prefix):
+            rest = path[len(prefix):]
+            if "/" in rest:
+                d = prefix + rest.split("/", 1)[0] + "/"
+                count, total = dirs.get(d, (0, 0))
+                dirs[d] = (count + 1, total + size)
+            else:
+                files.append({"path": path, "size": size})
+        return {"commit": self.sha, "prefix": prefix,
+                "dirs": [{"path": d, "files": c, "bytes": b} for d, (c, b) in dirs.items()], "files": files}
+
+    def to_github_tree(self) -> dict:
+        """Same shape as GitHub's recursive git/trees response (blobs only)."""
+        return {"sha": self.sha, "truncated": False,
+                "tree": [{"path": p, "type": "blob", "size": size, "sha": blob} for p, size, blob in self.entries]}
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+def head_sha(repo_root: str=".", rev: str="HEAD") -> str:
+    return git_utils._run(["git", "rev-parse", rev], cwd=repo_root).stdout.strip()
+
+def _build(repo_root: str, sha: str) -> list:
+    out = git_utils._run(["git", "ls-tree", "-r", "-l", "-z", sha], cwd=repo_root).stdout
+    entries = []
+    for record in out.split("\0"):
+        if not record:
+            continue
+        meta, path = record.split("\t", 1)
+        _, kind, blob, size = meta.split()
+        if kind == "blob":
+            entries.append((path, int(size), blob))
+    return entries
+
+def _prune(keep: int) -> None:
+    """Delete the saved indexes of all but the keep most recently used commits."""
+    saved = [os.path.join(TREE_CACHE_DIR, n) for n in os.listdir(TREE_CACHE_DIR) if n.endswith(".json")]
+    if len(saved) <= keep:
+        return
+    saved.sort(key=os.path.getmtime, reverse=True)
+    for old in saved[keep:]:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(old)
+
+def get_index(repo_root: str=".", rev: str="HEAD") -> TreeIndex:
+    """
+    Index for the commit rev currently points at. Indexes are keyed by commit SHA, so a moved HEAD
+    simply selects (or builds) another one; they are kept in memory and on disk under TREE_CACHE_DIR,
+    where only the TREE_KEEP_COMMITS most recently used survive.
+    """
+    sha = head_sha(repo_root, rev)
+    with _lock:
+        if sha in _memory:
+            _memory.move_to_end(sha)
+            return _memory[sha]
+
+    path = os.path.join(TREE_CACHE_DIR, f"{sha}.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = [tuple(e) for e in json.load(f)]
+        os.utime(path)  # recently used, so kept by _prune
+    except (FileNotFoundError, ValueError):
+        entries = _build(repo_root, sha)
+        os.makedirs(TREE_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=TREE_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+        _prune(TREE_KEEP_COMMITS)
+
+    index = TreeIndex(sha, entries)
+    with _lock:
+        _memory[sha] = index
+        while len(_memory) > MEMORY_SLOTS:
+            _memory.popitem(last=False)
+    return index
+
+def list_repo_tree(query: str="", repo_root: str=".") -> dict:
+    """
+    Tool entry point. query is empty (top-level summary) or JSON with any of
+    prefix, pattern (glob), page, page_size and summary (true for directory counts instead of a file list).
+    """
+    try:
+        args = json.loads(query) if query and query.strip() else {"summary": True}
+    except ValueError as e:
+        return {"error": f"Invalid query, expected JSON: {e}"}
+    if not isinstance(args, dict):
+        return {"error": "Invalid query, expected a JSON object."}
+    prefix, pattern = args.get("prefix", ""), args.get("pattern")
+    if not isinstance(prefix, str) or not isinstance(pattern, (str, type(None))):
+        return {"error": "prefix and pattern must be strings."}
+    page, page_size = args.get("page", 1), args.get("page_size", TREE_PAGE_SIZE)
+    for name, value in (("page", page), ("page_size", page_size)):
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            return {"error": f"{name} must be a positive integer, got {value!r}."}
+    index = get_index(repo_root)
+    if args.get("summary"):
+        return index.summarize(prefix)
+    return index.page(prefix, pattern, page, page_size)
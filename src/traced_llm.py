@@ -0,0 +1,26 @@
+from typing import Any, List, Optional
+from langchain_core.language_models.llms import LLM
+from src import tracing
+from src.prompt_builder import count_tokens
+
+class TracedLLM(LLM):
+    """
+    Wraps a langchain LLM so every completion is an "llm" span with prompt and completion token counts
+    (tiktoken for OpenAI models, otherwise the prompt builder's chars/4 estimate). Outermost wrapper, so
+    cache hits show up as fast spans rather than disappearing.
+    """
+    llm: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return self.llm._llm_type
+
+    @property
+    def _identifying_params(self) -> dict:
+        return self.llm._identifying_params
+
+    def _call(self, prompt: str, stop: Optional[List[str]]=None, run_manager=None, **kwargs: Any) -> str:
+        with tracing.span("llm", llm_type=self.llm._llm_type) as span:
+            completion = self.llm.invoke(prompt, stop=stop, **kwargs)
+            span.set(prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(completion))
+            return completion
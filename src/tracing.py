@@ -0,0 +1,236 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import tempfile
+import threading
+import contextvars
+from typing import Optional
+from src.config import TRACE_FILE, METRICS_FILE
+
+try:
+    import fcntl
+except ImportError:  # Windows: merges aren't serialized, a racing flush may miss another's latest snapshot
+    fcntl = None
+
+# span attributes that are also summed into <name>_total counters in the metrics file
+COUNTED = ("prompt_tokens", "completion_tokens", "bytes_in", "bytes_out")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_trace_file = TRACE_FILE
+_metrics_file = METRICS_FILE
+_enabled = bool(TRACE_FILE or METRICS_FILE)
+_current = contextvars.ContextVar("span", default=None)
+_lock = threading.Lock()
+_out = None
+_durations = {}  # span name -> [bucket counts..., +Inf count, sum]
+_counters = {}   # (metric, span name) -> value
+
+class _NoopSpan:
+    """Returned while tracing is off: entering, setting and ending cost a method call and nothing else."""
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def end(self, error: Optional[BaseException]=None) -> None:
+        pass
+
+_NOOP = _NoopSpan()
+
+class Span:
+    """A timed operation. Spans started inside another span's `with` block (same thread) become its children."""
+    recording = True
+
+    def __init__(self, name: str, attrs: dict, parent: Optional["Span"]=None):
+        self.name = name
+        self.attrs = attrs
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.end(exc)
+        return False
+
+    def end(self, error: Optional[BaseException]=None) -> None:
+        duration = time.perf_counter() - self._t0
+        failed = error is not None or self.attrs.get("exit_code") not in (None, 0)
+        record = {"trace": self.trace_id, "span": self.span_id, "parent": self.parent_id, "name": self.name,
+                  "start": round(self.start, 6), "duration": round(duration, 6), "status": "error" if failed else "ok",
+                  "attrs": self.attrs}
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        _record(record, duration, failed)
+
+def enabled() -> bool:
+    return _enabled
+
+def configure(trace_file: Optional[str]=None, metrics_file: Optional[str]=None) -> None:
+    """Point tracing at new files (or turn it off with neither) and clear the metrics collected so far."""
+    global _trace_file, _metrics_file, _enabled, _out
+    with _lock:
+        if _out is not None:
+            _out.close()
+            _out = None
+        _trace_file, _metrics_file = trace_file, metrics_file
+        _enabled = bool(trace_file or metrics_file)
+        _durations.clear()
+        _counters.clear()
+
+def span(name: str, **attrs):
+    """Context manager timing the enclosed block; a shared no-op when tracing is off."""
+    if not _enabled:
+        return _NOOP
+    return Span(name, attrs, _current.get())
+
+def bind(func):
+    """func, made to run under the caller's current span when it's handed to another thread (spans follow threads)."""
+    if not _enabled:
+        return func
+    parent = _current.get()
+    def bound(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return bound
+
+def _record(record: dict, duration: float, failed: bool) -> None:
+    global _out
+    name = record["name"]
+    with _lock:
+        hist = _durations.setdefault(name, [0] * (len(BUCKETS) + 1) + [0.0])
+        for i, bound in enumerate(BUCKETS):
+            if duration <= bound:
+                hist[i] += 1
+        hist[len(BUCKETS)] += 1
+        hist[-1] += duration
+        if failed:
+            _counters[("errors", name)] = _counters.get(("errors", name), 0) + 1
+        for attr in COUNTED:
+            value = record["attrs"].get(attr)
+            if isinstance(value, (int, float)):
+                _counters[(attr, name)] = _counters.get((attr, name), 0) + value
+        if _trace_file:
+            if _out is None:
+                os.makedirs(os.path.dirname(os.path.abspath(_trace_file)), exist_ok=True)
+                _out = open(_trace_file, "a", encoding="utf-8")
+            _out.write(json.dumps(record, default=str) + "\n")
+            _out.flush()
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def metrics_text() -> str:
+    """Everything this process collected so far in the Prometheus text exposition format."""
+    with _lock:
+        durations = {name: list(hist) for name, hist in _durations.items()}
+        counters = dict(_counters)
+    return _render(durations, counters)
+
+def _render(durations: dict, counters: dict) -> str:
+    lines = ["# HELP agent_span_duration_seconds Duration of agent operations by span name.",
+             "# TYPE agent_span_duration_seconds histogram"]
+    for name in sorted(durations):
+        hist, label = durations[name], _label(name)
+        for i, bound in enumerate(BUCKETS):
+            lines.append(f'agent_span_duration_seconds_bucket{{span="{label}",le="{bound}"}} {hist[i]}')
+        lines.append(f'agent_span_duration_seconds_bucket{{span="{label}",le="+Inf"}} {hist[len(BUCKETS)]}')
+        lines.append(f'agent_span_duration_seconds_sum{{span="{label}"}} {hist[-1]:.6f}')
+        lines.append(f'agent_span_duration_seconds_count{{span="{label}"}} {hist[len(BUCKETS)]}')
+    for metric in ("errors",) + COUNTED:
+        rows = sorted((name, value) for (m, name), value in counters.items() if m == metric)
+        if not rows:
+            continue
+        lines.append(f"# TYPE agent_{metric}_total counter")
+        lines.extend(f'agent_{metric}_total{{span="{_label(name)}"}} {value}' for name, value in rows)
+    return "\n".join(lines) + "\n"
+
+def _write(path: str, text: str) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _merge(parts: list) -> tuple:
+    """Summed (durations, counters) of metric snapshots as written by flush()."""
+    durations, counters = {}, {}
+    for part in parts:
+        for name, hist in part["durations"].items():
+            total = durations.setdefault(name, [0] * len(hist))
+            durations[name] = [a + b for a, b in zip(total, hist)]
+        for metric, name, value in part["counters"]:
+            counters[(metric, name)] = counters.get((metric, name), 0) + value
+    return durations, counters
+
+def _snapshot(durations: dict, counters: dict) -> dict:
+    return {"durations": durations, "counters": [[m, name, value] for (m, name), value in counters.items()]}
+
+def flush() -> None:
+    """
+    Write the metrics file (atomically, so a scraper never reads half of it). No-op without METRICS_FILE.
+    Several processes may share one metrics file (speculative attempts run in a process pool): each keeps
+    its own snapshot under <metrics file>.parts/<pid>.json and the file is their sum, rebuilt under a lock.
+    Snapshots of processes that have exited are folded into base.json, so the parts stay one per live process.
+    """
+    path = _metrics_file
+    if not path:
+        return
+    path = os.path.abspath(path)
+    parts_dir = path + ".parts"
+    os.makedirs(parts_dir, exist_ok=True)
+    with _lock:
+        own = _snapshot({name: list(hist) for name, hist in _durations.items()}, dict(_counters))
+    _write(os.path.join(parts_dir, f"{os.getpid()}.json"), json.dumps(own))
+    with open(path + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        base, live, dead = os.path.join(parts_dir, "base.json"), [], []
+        for name in os.listdir(parts_dir):
+            pid = name[:-len(".json")]
+            if name.endswith(".json") and pid.isdigit():
+                (live if _alive(int(pid)) else dead).append(os.path.join(parts_dir, name))
+        snapshots = {}
+        for part in [base] + live + dead:
+            try:
+                with open(part, "r", encoding="utf-8") as f:
+                    snapshots[part] = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+        if dead:
+            folded = _merge([snapshots[p] for p in [base] + dead if p in snapshots])
+            _write(base, json.dumps(_snapshot(*folded)))
+            for part in dead:
+                os.remove(part)
+        _write(path, _render(*_merge(list(snapshots.values()))))
+
+atexit.register(flush)
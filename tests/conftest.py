@@ -0,0 +1,25 @@
+import os
+import pytest
+from tests.helpers import commit, git
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """An empty repository at tmp_path/repo on branch main, with a committer configured."""
+    root = str(tmp_path / "repo")
+    os.makedirs(root)
+    git("init", "-b", "main", cwd=root)
+    git("config", "user.email", "t@example.com", cwd=root)
+    git("config", "user.name", "t", cwd=root)
+    return root
+
+@pytest.fixture
+def origin_clone(tmp_path):
+    """(clone, bare origin): a clone at tmp_path/work of a local bare origin whose main has one commit (README.md)."""
+    origin, work = str(tmp_path / "origin.git"), str(tmp_path / "work")
+    git("init", "--bare", "-b", "main", origin, cwd=tmp_path)
+    git("clone", origin, work, cwd=tmp_path)
+    git("config", "user.email", "t@example.com", cwd=work)
+    git("config", "user.name", "t", cwd=work)
+    commit(work, {"README.md": "hello\n"}, "init")
+    git("push", "origin", "HEAD:main", cwd=work)
+    return work, origin
@@ -0,0 +1,19 @@
+"""Helpers for tests that drive real git repositories."""
+import os
+import subprocess
+
+def git(*args, cwd) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+def write(root, path, content, mode="w"):
+    full = os.path.join(root, path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, mode) as f:
+        f.write(content)
+
+def commit(root, files, message):
+    """Write files ({path: content}) and commit everything in the working tree."""
+    for path, content in files.items():
+        write(root, path, content)
+    git("add", "-A", cwd=root)
+    git("commit", "-m", message, cwd=root)
@@ -0,0 +1,51 @@
+import os
+import threading
+import pytest
+import src.batch as batch
+from tests.helpers import git
+
+@pytest.fixture
+def clone(origin_clone, tmp_path, monkeypatch):
+    """A clone of a local bare 'origin' with one commit on main."""
+    monkeypatch.setattr(batch, "WORKTREE_ROOT", str(tmp_path / "worktrees"))
+    return origin_clone[0]
+
+def test_run_batch_gives_each_issue_its_own_worktree(clone, monkeypatch):
+    seen = {}
+    lock = threading.Lock()
+    def fake_run_agent(repo_name, issue_number, max_iterations, base_branch, repo_root, llm=None):
+        assert os.path.exists(os.path.join(repo_root, "README.md"))
+        with lock:
+            seen[issue_number] = repo_root
+    monkeypatch.setattr(batch, "run_agent", fake_run_agent)
+
+    results = batch.run_batch("repo", [1, 2, 3], max_workers=3, repo_root=clone)
+
+    assert results == {n: {"status": "done"} for n in (1, 2, 3)}
+    roots = set(seen.values())
+    assert len(roots) == 3
+    # worktrees are cleaned up afterwards
+    assert not any(os.path.exists(r) for r in roots)
+
+def test_run_batch_reports_failures_per_issue(clone, monkeypatch):
+    def fake_run_agent(repo_name, issue_number, *args, **kwargs):
+        if issue_number == 2:
+            raise RuntimeError("boom")
+    monkeypatch.setattr(batch, "run_agent", fake_run_agent)
+
+    results = batch.run_batch("repo", [1, 2], max_workers=2, repo_root=clone)
+    assert results[1] == {"status": "done"}
+    assert results[2] == {"status": "error", "error": "boom"}
+
+def test_workers_start_from_one_base_commit_without_fetching_again(clone, monkeypatch):
+    fetched, fetch = [], batch.git_utils.fetch
+    monkeypatch.setattr(batch.git_utils, "fetch", lambda *a, **kw: fetched.append(fetch(*a, **kw)) or fetched[-1])
+    heads = {}
+    def fake_run_agent(repo_name, issue_number, max_iterations, base_branch, repo_root, llm=None):
+        heads[issue_number] = git("rev-parse", "HEAD", cwd=repo_root)
+    monkeypatch.setattr(batch, "run_agent", fake_run_agent)
+
+    batch.run_batch("repo", [1, 2], max_workers=2, repo_root=clone)
+    base = git("rev-parse", "origin/main", cwd=clone)
+    assert heads == {1: base, 2: base}
+    assert fetched == [True, False, False]  # run_batch's own fetch; the workers' base commit is already there
@@ -0,0 +1,67 @@
+import pytest
+import src.github_client as github_client
+
+class FakeResponse:
+    def __init__(self, payload, links=None, status_code=200, headers=None):
+        self._payload = payload
+        self.links = links or {}
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self._payload
+
+class FakeSession:
+    """Routes GET/POST calls to canned responses and records what was requested."""
+    def __init__(self, comment_pages=1):
+        self.comment_pages = comment_pages
+        self.calls = []
+
+    def get(self, url, params=None, headers=None):
+        params = params or {}
+        self.calls.append(("GET", url, dict(params)))
+        if url.endswith("/comments"):
+            page = int(params.get("page", 1))
+            links = {}
+            if page == 1 and self.comment_pages > 1:
+                links = {
+                    "next": {"url": f"{url}?per_page=100&page=2"},
+                    "last": {"url": f"{url}?per_page=100&page={self.comment_pages}"},
+                }
+            return FakeResponse([{"id": page * 1000 + i} for i in range(2)], links)
+        if "/git/trees/" in url:
+            return FakeResponse({"sha": "abc", "tree": []})
+        return FakeResponse({"number": 7, "title": "Bug"})
+
+    def post(self, url, json=None):
+        self.calls.append(("POST", url, json))
+        return FakeResponse({"data": {"repository": {"issue": {"number": 7}}}})
+
+@pytest.fixture
+def fake_session(monkeypatch):
+    session = FakeSession(comment_pages=3)
+    monkeypatch.setattr(github_client, "get_session", lambda: session)
+    monkeypatch.setattr(github_client, "get_cache", lambda: None)
+    return session
+
+def test_get_issue_data_shape(fake_session):
+    data = github_client.get_issue_data("repo", 7)
+    assert set(data) == {"issue", "comments", "tree", "graphql"}
+    assert data["issue"]["title"] == "Bug"
+    assert data["tree"]["sha"] == "abc"
+    assert data["graphql"]["repository"]["issue"]["number"] == 7
+
+def test_get_issue_data_follows_comment_pagination_in_order(fake_session):
+    data = github_client.get_issue_data("repo", 7)
+    ids = [c["id"] for c in data["comments"]]
+    assert ids == [1000, 1001, 2000, 2001, 3000, 3001]
+    pages = sorted(p.get("page", 1) for m, u, p in fake_session.calls if m == "GET" and u.endswith("/comments"))
+    assert pages == [1, 2, 3]
+
+def test_get_all_pages_returns_error_payload_unchanged(monkeypatch):
+    class ErrorSession(FakeSession):
+        def get(self, url, params=None, headers=None):
+            return FakeResponse({"message": "Not Found"})
+    monkeypatch.setattr(github_client, "get_session", lambda: ErrorSession())
+    monkeypatch.setattr(github_client, "get_cache", lambda: None)
+    assert github_client.get_all_pages("https://api.github.com/x") == {"message": "Not Found"}
@@ -0,0 +1,106 @@
+import time
+import threading
+from email.utils import formatdate
+from src.github_scheduler import GitHubScheduler, resource_for
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, text=""):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+def test_request_returns_response_and_counts():
+    sched = GitHubScheduler(burst=5, rate=100)
+    resp = sched.request(lambda: FakeResponse())
+    assert resp.status_code == 200
+    stats = sched.stats()
+    assert stats["requests"] == 1
+    assert stats["queue_depth"] == 0
+
+def test_retry_after_is_honoured_then_retried():
+    sched = GitHubScheduler(burst=5, rate=100)
+    responses = [FakeResponse(429, {"Retry-After": "0.05"}), FakeResponse(200)]
+    start = time.monotonic()
+    resp = sched.request(lambda: responses.pop(0))
+    assert resp.status_code == 200
+    assert time.monotonic() - start >= 0.05
+    stats = sched.stats()
+    assert stats["retries"] == 1
+    assert stats["rate_limited"] == 1
+
+def test_retry_after_may_be_an_http_date():
+    sched = GitHubScheduler(burst=5, rate=100, backoff_base=0.001, backoff_max=0.01)
+    later = formatdate(time.time() + 30, usegmt=True)
+    assert 25 < sched._retry_delay(FakeResponse(429, {"Retry-After": later}), 0) <= 30
+    assert sched._retry_delay(FakeResponse(429, {"Retry-After": formatdate(time.time() - 30, usegmt=True)}), 0) == 0
+    assert sched._retry_delay(FakeResponse(429, {"Retry-After": "soon"}), 0) <= 0.01  # unparseable: backoff
+
+def test_secondary_limit_gives_up_after_max_retries():
+    sched = GitHubScheduler(burst=5, rate=100, max_retries=2, backoff_base=0.001, backoff_max=0.01)
+    calls = []
+    def send():
+        calls.append(1)
+        return FakeResponse(403, text="You have exceeded a secondary rate limit")
+    resp = sched.request(send)
+    assert resp.status_code == 403
+    assert len(calls) == 3
+
+def test_plain_403_is_not_retried():
+    sched = GitHubScheduler(burst=5, rate=100)
+    calls = []
+    def send():
+        calls.append(1)
+        return FakeResponse(403, text="Resource not accessible by integration")
+    assert sched.request(send).status_code == 403
+    assert len(calls) == 1
+
+def test_headers_retune_rate_and_cap_tokens():
+    sched = GitHubScheduler(burst=20, rate=100)
+    reset = time.time() + 100
+    sched.request(lambda: FakeResponse(200, {"X-RateLimit-Remaining": "50", "X-RateLimit-Reset": str(reset)}))
+    stats = sched.stats()
+    assert 0.4 < stats["rate"] < 0.6
+    sched.request(lambda: FakeResponse(200, {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset": str(reset)}))
+    assert sched.stats()["tokens"] <= 3
+
+def test_identical_inflight_requests_are_coalesced():
+    sched = GitHubScheduler(burst=5, rate=100)
+    release = threading.Event()
+    started = threading.Event()
+    calls = []
+    def send():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return FakeResponse(200)
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(sched.request(send, "k")))
+    leader.start()
+    started.wait(2)
+    follower = threading.Thread(target=lambda: results.append(sched.request(send, "k")))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join(2)
+    follower.join(2)
+    assert len(calls) == 1
+    assert len(results) == 2 and results[0] is results[1]
+    assert sched.stats()["coalesced"] == 1
+
+def test_each_rate_limit_resource_has_its_own_bucket():
+    sched = GitHubScheduler(burst=20, rate=100)
+    reset = str(time.time() + 100)
+    sched.request(lambda: FakeResponse(200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset,
+                                             "X-RateLimit-Resource": "graphql"}), resource="graphql")
+    start = time.monotonic()
+    sched.request(lambda: FakeResponse(200, {"X-RateLimit-Remaining": "4000", "X-RateLimit-Reset": reset,
+                                             "X-RateLimit-Resource": "core"}))
+    assert time.monotonic() - start < 1  # an exhausted graphql quota doesn't hold back REST calls
+    buckets = sched.stats()["buckets"]
+    assert buckets["graphql"]["tokens"] == 0 and 39 < buckets["core"]["rate"] < 41
+
+def test_resource_for():
+    assert resource_for("https://api.github.com/graphql") == "graphql"
+    assert resource_for("https://api.github.com/search/issues?q=x") == "search"
+    assert resource_for("https://api.github.com/repos/o/r/issues") == "core"
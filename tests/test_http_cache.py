@@ -0,0 +1,89 @@
+import os
+import time
+import pytest
+import src.github_client as github_client
+from src.http_cache import HttpCache
+
+class FakeResponse:
+    def __init__(self, status_code, text="", headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+@pytest.fixture
+def cache(tmp_path):
+    return HttpCache(root=str(tmp_path), max_bytes=10_000, max_age=3600)
+
+def test_key_ignores_param_order():
+    a = HttpCache.key("GET", "https://x/y", {"a": 1, "b": 2})
+    b = HttpCache.key("get", "https://x/y", {"b": 2, "a": 1})
+    assert a == b
+    assert a != HttpCache.key("GET", "https://x/y", {"a": 1})
+
+def test_put_and_get_round_trip(cache):
+    cache.put("k", "https://x", 200, {"ETag": '"abc"', "Server": "gh"}, '{"a": 1}')
+    entry = cache.get("k")
+    assert entry["body"] == '{"a": 1}'
+    assert entry["headers"] == {"ETag": '"abc"'}
+
+def test_get_drops_expired_entries(cache):
+    cache.put("k", "https://x", 200, {}, "{}")
+    cache.max_age = 0
+    time.sleep(0.01)
+    assert cache.get("k") is None
+    assert not os.path.exists(os.path.join(cache.root, "k.json"))
+
+def test_evict_removes_least_recently_used_first(cache):
+    cache.max_bytes = 10**9
+    body = "x" * 400
+    for name in ("old", "mid", "new"):
+        cache.put(name, "https://x", 200, {}, body)
+    past = time.time() - 100
+    os.utime(os.path.join(cache.root, "old.json"), (past, past))
+    os.utime(os.path.join(cache.root, "mid.json"), (past + 1, past + 1))
+    cache.get("old")  # touching makes it most recently used
+    cache.max_bytes = 1100
+    cache.evict()
+    assert cache.get("mid") is None
+    assert cache.get("old") is not None
+    assert cache.get("new") is not None
+
+def test_put_only_scans_the_directory_when_over_budget(cache, monkeypatch):
+    scans = []
+    evict = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: scans.append(1) or evict())
+    for n in range(5):
+        cache.put(f"k{n}", "https://x", 200, {}, "x" * 1000)
+    assert len(scans) == 1  # the first write measures the directory
+    for n in range(5, 10):
+        cache.put(f"k{n}", "https://x", 200, {}, "x" * 1000)
+    assert len(scans) > 1 and sum(e.stat().st_size for e in os.scandir(cache.root)) <= cache.max_bytes
+
+def test_touch_restarts_the_clock_without_rewriting(cache):
+    cache.put("k", "https://x", 200, {"ETag": '"v1"'}, "{}")
+    path = os.path.join(cache.root, "k.json")
+    past = time.time() - 7200
+    os.utime(path, (past, past))
+    inode = os.stat(path).st_ino
+    cache.touch("k")
+    assert os.stat(path).st_ino == inode and cache.get("k")["headers"] == {"ETag": '"v1"'}
+
+def test_get_revalidates_and_serves_304_from_disk(cache, monkeypatch):
+    sent = []
+    responses = [
+        FakeResponse(200, '{"title": "Bug"}', {"ETag": '"v1"', "Content-Type": "application/json"}),
+        FakeResponse(304),
+    ]
+    class Session:
+        def get(self, url, params=None, headers=None):
+            sent.append(headers)
+            return responses.pop(0)
+    monkeypatch.setattr(github_client, "get_session", lambda: Session())
+    monkeypatch.setattr(github_client, "get_cache", lambda: cache)
+
+    first = github_client._get("https://api.github.com/repos/o/r/issues/1")
+    second = github_client._get("https://api.github.com/repos/o/r/issues/1")
+    assert sent == [{}, {"If-None-Match": '"v1"'}]
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert second.json() == {"title": "Bug"}
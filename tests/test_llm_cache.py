@@ -0,0 +1,63 @@
+import os
+import time
+import pytest
+from langchain_community.llms.fake import FakeListLLM
+from src.llm_cache import LLMCache, ReplayMissError
+from src.cached_llm import CachedLLM
+
+class CountingLLM(FakeListLLM):
+    calls: int = 0
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return super()._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+@pytest.fixture
+def store(tmp_path):
+    return LLMCache(root=str(tmp_path))
+
+def test_key_depends_on_every_component():
+    base = LLMCache.key("ollama", "llama3", "p", {"temperature": 0})
+    assert base == LLMCache.key("ollama", "llama3", "p", {"temperature": 0})
+    assert base != LLMCache.key("openai", "llama3", "p", {"temperature": 0})
+    assert base != LLMCache.key("ollama", "llama3:70b", "p", {"temperature": 0})
+    assert base != LLMCache.key("ollama", "llama3", "p2", {"temperature": 0})
+    assert base != LLMCache.key("ollama", "llama3", "p", {"temperature": 1})
+
+def test_evicts_least_recently_used(store):
+    for name in ("a", "b", "c"):
+        store.put(name, "x" * 300, evict=False)
+    past = time.time() - 100
+    for i, name in enumerate(("a", "b", "c")):
+        os.utime(os.path.join(store.root, name + ".json"), (past + i, past + i))
+    store.get("a")
+    store.max_bytes = 800
+    store.evict()
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+def test_readwrite_serves_repeated_prompts_from_cache(store):
+    inner = CountingLLM(responses=["one", "two"])
+    llm = CachedLLM(llm=inner, provider="fake", store=store)
+    assert llm.invoke("hello") == "one"
+    assert llm.invoke("hello") == "one"
+    assert llm.invoke("other") == "two"
+    assert inner.calls == 2
+
+def test_variants_do_not_share_completions(store):
+    inner = CountingLLM(responses=["a", "b"])
+    first, second = (CachedLLM(llm=inner, provider="fake", store=store, variant=f"attempt-{n}") for n in (0, 1))
+    assert first.invoke("p") == "a" and second.invoke("p") == "b"
+    assert first.invoke("p") == "a" and second.invoke("p") == "b" and inner.calls == 2
+
+def test_record_then_replay_makes_no_model_calls(store):
+    recorder = CachedLLM(llm=CountingLLM(responses=["a", "b"]), provider="fake", store=store, mode="record")
+    assert [recorder.invoke("p1"), recorder.invoke("p2")] == ["a", "b"]
+
+    # same model parameters (for the fake, its response list) but it is never called
+    inner = CountingLLM(responses=["a", "b"])
+    replay = CachedLLM(llm=inner, provider="fake", store=store, mode="replay")
+    assert [replay.invoke("p1"), replay.invoke("p2")] == ["a", "b"]
+    assert inner.calls == 0
+    with pytest.raises(ReplayMissError):
+        replay.invoke("unrecorded")
@@ -0,0 +1,36 @@
+from langchain_community.llms.fake import FakeStreamingListLLM
+from src.llm_streaming import find_cut, take_until_done, StreamingLLM
+
+def test_cut_after_single_line_action_input():
+    text = "Thought: look\nAction: read_file\nAction Input: src/a.py\nThought: and then I will"
+    assert text[:find_cut(text)] == "Thought: look\nAction: read_file\nAction Input: src/a.py"
+
+def test_incomplete_action_input_keeps_going():
+    assert find_cut("Action: read_file\nAction Input: src/a") is None
+    assert find_cut('Action: stage_edit\nAction Input: {"path": "a", "new_content": "x}\\n') is None
+
+def test_cut_after_balanced_json_input_with_braces_in_strings():
+    text = 'Action: stage_edit\nAction Input: {"path": "a.py", "new_content": "d = {\\"k\\": 1}\\n"}\nblah blah'
+    assert text[:find_cut(text)].endswith('"}')
+
+def test_cut_after_task_complete_in_final_answer():
+    text = "Thought: done\nFinal Answer: TASK_COMPLETE. Also, here is a long essay"
+    assert text[:find_cut(text)] == "Thought: done\nFinal Answer: TASK_COMPLETE"
+    assert find_cut("Thought: done\nFinal Answer: I fixed it and") is None
+
+def test_stop_sequence_wins_when_earlier():
+    text = "Action: run_tests\nAction Input: \nObservation: made up"
+    assert text[:find_cut(text, ["\nObservation:"])] == "Action: run_tests\nAction Input: "
+
+def test_take_until_done_stops_pulling_chunks():
+    pulled = []
+    def chunks():
+        for c in ["Action: read", "_file\nAction Input: a.py", "\n", "Thought: ramble", " ramble", " ramble"]:
+            pulled.append(c)
+            yield c
+    assert take_until_done(chunks()) == "Action: read_file\nAction Input: a.py"
+    assert len(pulled) == 3
+
+def test_streaming_llm_truncates_rambling():
+    inner = FakeStreamingListLLM(responses=["Thought: ok\nFinal Answer: TASK_COMPLETE and more words"])
+    assert StreamingLLM(llm=inner).invoke("prompt") == "Thought: ok\nFinal Answer: TASK_COMPLETE"
@@ -0,0 +1,46 @@
+import json
+from src.prompt_builder import PromptBuilder, count_tokens, truncate_to_tokens
+
+ISSUE = {
+    "issue": {"number": 3, "title": "Crash", "body": "It crashes", "labels": [{"name": "bug"}]},
+    "comments": [{"user": {"login": f"u{i}"}, "body": f"comment {i} " + "x" * 400, "reactions": {"+1": 0}} for i in range(10)],
+}
+
+def test_count_and_truncate():
+    assert count_tokens("abcd" * 10) == 10
+    text = "word " * 400
+    out = truncate_to_tokens(text, 50)
+    assert count_tokens(out) < 70
+    assert "[truncated" in out
+    assert truncate_to_tokens("short", 50) == "short"
+
+def test_build_is_valid_json_with_compact_comments():
+    builder = PromptBuilder(ISSUE, "do it", comments_budget=350)
+    prompt = json.loads(builder.build([]))
+    assert prompt["issue"] == {"number": 3, "title": "Crash", "body": "It crashes", "labels": ["bug"]}
+    assert prompt["instructions"] == "do it"
+    comments = prompt["comments"]
+    # newest comments are kept, older ones counted
+    assert comments[0] == {"omitted_earlier_comments": 7}
+    assert [c["author"] for c in comments[1:]] == ["u7", "u8", "u9"]
+    assert "reactions" not in comments[1]
+
+def test_history_is_compacted_and_bounded():
+    builder = PromptBuilder(ISSUE, "do it", history_budget=400, keep_recent=2)
+    history = [{"iteration": i, "result": f"result {i} " + "y" * 1000} for i in range(30)]
+    compacted = json.loads(builder.build(history))["history"]
+    recent = [e for e in compacted if "result" in e]
+    assert [e["iteration"] for e in recent] == [28, 29]
+    summaries = [e for e in compacted if "summary" in e]
+    assert summaries and all(len(s["summary"]) <= 203 for s in summaries)
+    assert "omitted_earlier_iterations" in compacted[0]
+    assert count_tokens(json.dumps(compacted)) < 600
+
+def test_prompt_size_stays_flat_as_history_grows():
+    builder = PromptBuilder(ISSUE, "do it", history_budget=500)
+    history = []
+    sizes = []
+    for i in range(50):
+        history.append({"iteration": i, "result": "z" * 2000})
+        sizes.append(count_tokens(builder.build(history)))
+    assert max(sizes[10:]) - min(sizes[10:]) < 100
@@ -0,0 +1,112 @@
+import os
+import hmac
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.error
+import pytest
+from http.server import ThreadingHTTPServer
+from src.server import AgentServer, QueueWatcher, make_handler, parse_job
+
+def _wait(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_jobs_run_with_bounded_concurrency_and_dedupe():
+    release = threading.Event()
+    running, peak, lock = [0], [0], threading.Lock()
+    def runner(repo, issue, max_iterations):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(5)
+        with lock:
+            running[0] -= 1
+        if issue == 3:
+            raise RuntimeError("boom")
+
+    server = AgentServer(max_workers=2, runner=runner)
+    jobs = [server.submit("repo", n) for n in (1, 2, 3)]
+    assert server.submit("repo", 1)["duplicate"] is True
+    _wait(lambda: running[0] == 2)
+    assert server.status()["counts"] == {"running": 2, "queued": 1}
+    release.set()
+    server.shutdown()
+
+    assert peak[0] == 2
+    statuses = {j["issue"]: j["status"] for j in server.status()["jobs"]}
+    assert statuses == {1: "done", 2: "done", 3: "error"}
+    assert len({j["id"] for j in jobs}) == 3
+
+def test_only_the_last_finished_jobs_are_kept():
+    server = AgentServer(max_workers=1, runner=lambda *args: None, keep_jobs=2)
+    for n in range(5):
+        server.submit("repo", n)
+    server.shutdown()
+    assert [j["issue"] for j in server.status()["jobs"]] == [3, 4]
+
+def test_parse_job_accepts_plain_jobs_and_github_issue_events():
+    assert parse_job({"repo": "r", "issue": "7"}) == ("r", 7, None)
+    delivery = {"action": "opened", "issue": {"number": 9}, "repository": {"name": "r"}}
+    assert parse_job(delivery, "issues") == ("r", 9, None)
+    assert parse_job(dict(delivery, action="closed"), "issues") is None
+    assert parse_job(delivery, "push") is None
+    malformed = [{"issue": 1}, {"repo": "r", "issue": {}}, {"repo": "r", "issue": 1, "max_iterations": "x"},
+                 dict(delivery, repository={}), dict(delivery, repository="r"), dict(delivery, issue={"number": None})]
+    for payload in malformed:
+        with pytest.raises(ValueError):
+            parse_job(payload, "issues")
+
+@pytest.fixture
+def http_server():
+    submitted = []
+    server = AgentServer(max_workers=1, runner=lambda *args: submitted.append(args))
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(server, secret="s3cret"))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", server, submitted
+    httpd.shutdown()
+    httpd.server_close()
+    server.shutdown()
+
+def _post(url, payload, secret=None, headers=None):
+    body = json.dumps(payload).encode()
+    req = urllib.request.Request(url, data=body, method="POST", headers=dict(headers or {}))
+    if secret:
+        req.add_header("X-Hub-Signature-256", "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest())
+    try:
+        with urllib.request.urlopen(req) as r:
+            return r.status, json.loads(r.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_webhook_endpoint_checks_signature_and_queues_jobs(http_server):
+    url, server, submitted = http_server
+    assert _post(url + "/jobs", {"repo": "r", "issue": 1})[0] == 401
+    status, job = _post(url + "/jobs", {"repo": "r", "issue": 1, "max_iterations": 3}, secret="s3cret")
+    assert status == 202 and job["status"] == "queued"
+    status, body = _post(url + "/webhook", {"action": "closed", "issue": {"number": 2}, "repository": {"name": "r"}},
+                         secret="s3cret", headers={"X-GitHub-Event": "issues"})
+    assert status == 202 and body == {"ignored": True}
+    assert _post(url + "/jobs", {"nope": 1}, secret="s3cret")[0] == 400
+    _wait(lambda: submitted)
+    assert submitted == [("r", 1, 3)]
+    with urllib.request.urlopen(url + "/jobs") as r:
+        assert [j["issue"] for j in json.loads(r.read())["jobs"]] == [1]
+
+def test_queue_directory_claims_and_files_jobs(tmp_path):
+    queue = str(tmp_path / "queue")
+    server = AgentServer(max_workers=1, runner=lambda repo, issue, n: None if issue == 1 else 1 / 0)
+    watcher = QueueWatcher(server, queue, interval=0.01)
+    for name, body in {"a.json": {"repo": "r", "issue": 1}, "b.json": {"repo": "r", "issue": 2}, "c.json": {"bad": 1},
+                       "d.json": {"action": "opened", "issue": {}, "repository": {"name": "r"}}}.items():
+        with open(os.path.join(queue, name), "w") as f:
+            json.dump(body, f)
+    assert watcher.poll() == 2
+    server.shutdown()
+    assert sorted(os.listdir(os.path.join(queue, "done"))) == ["a.json"]
+    assert sorted(os.listdir(os.path.join(queue, "failed"))) == ["b.json", "c.json", "d.json"]
+    assert os.listdir(os.path.join(queue, "claimed")) == []
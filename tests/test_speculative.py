@@ -0,0 +1,97 @@
+import time
+import threading
+import types
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from tests.helpers import git
+from src import batch, speculative
+from src.speculative import Attempt, NO_WINNER
+
+def _attempts(n):
+    winner, lock = types.SimpleNamespace(value=NO_WINNER), threading.Lock()
+    return [Attempt(i, 0.5, 7, winner, lock) for i in range(n)]
+
+def test_first_claim_wins_and_cancels_the_others():
+    a, b = _attempts(2)
+    assert not a.cancelled() and not b.cancelled()
+    assert b.claim() and b.claim()  # the winner may keep committing
+    assert not a.claim()
+    assert a.cancelled() and not b.cancelled()
+    assert b.won() and not a.won()
+    assert a.local_branch == "agent/issue-7-attempt-0"
+
+def test_released_claim_can_be_won_by_another_attempt():
+    a, b = _attempts(2)
+    assert a.claim() and b.cancelled()
+    b.release()  # only the holder can release
+    assert a.won()
+    a.release()
+    assert not a.won() and not b.cancelled()
+    assert b.claim() and a.cancelled()
+
+def _wait_until_cancelled(attempt, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not attempt.cancelled() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return attempt.cancelled()
+
+def race_runner(repo_name, issue_number, path, base_branch, max_iterations, attempt):
+    """Attempt 1 passes; every other attempt keeps working until it is cancelled."""
+    if attempt.index == 1:
+        time.sleep(0.05)
+        return {"attempt": 1, "status": "won" if attempt.claim() else "failed"}
+    return {"attempt": attempt.index, "status": "cancelled" if _wait_until_cancelled(attempt) else "failed"}
+
+@pytest.fixture
+def clone(origin_clone, tmp_path, monkeypatch):
+    """A clone of a local bare origin; attempt worktrees go under tmp_path."""
+    monkeypatch.setattr(batch, "WORKTREE_ROOT", str(tmp_path / "worktrees"))
+    return origin_clone[0]
+
+def test_first_passing_attempt_wins_and_the_others_are_cancelled(clone):
+    temperatures = {}
+    def runner(*args):
+        temperatures[args[-1].index] = args[-1].temperature
+        return race_runner(*args)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        result = speculative.run_speculative("repo", 7, attempts=4, repo_root=clone, runner=runner, executor=pool,
+                                             temperatures=[0.1, 0.9])
+    assert result["winner"] == 1
+    assert [a["status"] for a in result["attempts"]] == ["cancelled", "won", "cancelled", "cancelled"]
+    assert all(temperatures[i] == [0.1, 0.9][i % 2] for i in temperatures)
+
+def test_attempt_started_after_a_win_does_no_work():
+    loser, winner = _attempts(2)
+    winner.claim()
+    result = speculative.run_attempt("repo", 7, "/nonexistent", "main", 10, loser)
+    assert result == {"attempt": 0, "temperature": 0.5, "status": "cancelled"}
+
+def test_no_winner_when_every_attempt_fails(clone):
+    def runner(repo_name, issue_number, path, base_branch, max_iterations, attempt):
+        if attempt.index == 0:
+            raise RuntimeError("worktree add failed")
+        return {"attempt": attempt.index, "temperature": attempt.temperature, "status": "failed"}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        result = speculative.run_speculative("repo", 7, attempts=2, repo_root=clone, runner=runner, executor=pool)
+    assert result["winner"] is None
+    assert result["attempts"][0]["status"] == "error" and "worktree add failed" in result["attempts"][0]["error"]
+    assert result["attempts"][1]["status"] == "failed"
+
+def test_attempts_race_across_processes(clone):
+    result = speculative.run_speculative("repo", 7, attempts=2, max_workers=2, repo_root=clone, runner=race_runner)
+    assert result["winner"] == 1
+    assert [a["status"] for a in result["attempts"]] == ["cancelled", "won"]
+
+def test_parent_prepares_and_removes_every_worktree(clone, monkeypatch):
+    fetched, fetch = [], speculative.git_utils.fetch
+    monkeypatch.setattr(speculative.git_utils, "fetch", lambda *a, **kw: fetched.append(fetch(*a, **kw)) or fetched[-1])
+    seen = {}
+    def runner(repo_name, issue_number, path, base_branch, max_iterations, attempt):
+        seen[attempt.index] = git("rev-parse", "--abbrev-ref", "HEAD", cwd=path)
+        return {"attempt": attempt.index, "status": "failed"}
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        speculative.run_speculative("repo", 7, attempts=2, repo_root=clone, runner=runner, executor=pool)
+    assert fetched == [True, False, False]  # the parent's; the base commit is there when the worktrees are made
+    assert seen == {0: "agent/issue-7-attempt-0", 1: "agent/issue-7-attempt-1"}
+    assert git("worktree", "list", "--porcelain", cwd=clone).count("worktree ") == 1
+    assert git("branch", "--list", "agent/*", cwd=clone) == ""
@@ -0,0 +1,44 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# cold-start import budget for the CLI entry points; they measure ~0.1s, the heavy stack takes seconds
+IMPORT_BUDGET_SECONDS = 0.5
+HEAVY = ("langchain", "langchain_core", "langchain_community", "openai", "requests", "urllib3")
+
+def _python(code: str, **env) -> dict:
+    r = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=ROOT, capture_output=True, text=True,
+                       env=dict(os.environ, **env), check=True)
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+def _loaded(names):
+    return f"sorted({{m.split('.')[0] for m in sys.modules}} & set({list(names)!r}))"
+
+def test_entry_points_import_within_budget_without_heavy_dependencies():
+    result = _python(
+        "import sys, json, time\n"
+        "start = time.perf_counter()\n"
+        "import src.main, src.ai_agent, src.batch, src.server\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': elapsed, 'heavy': {_loaded(HEAVY)}}}))"
+    )
+    assert result["heavy"] == []
+    assert result["seconds"] < IMPORT_BUDGET_SECONDS, f"import took {result['seconds']:.2f}s"
+
+def test_help_does_not_load_the_agent():
+    r = subprocess.run([sys.executable, "-X", "importtime", "-m", "src.main", "--help"], cwd=ROOT,
+                       capture_output=True, text=True, check=True)
+    assert "usage:" in r.stdout
+    assert not any(line.split("|")[-1].strip().startswith(HEAVY) for line in r.stderr.splitlines())
+
+def test_get_llm_imports_only_the_selected_provider():
+    result = _python(
+        "import sys, json\n"
+        "from src.ai_agent import get_llm\n"
+        "llm = get_llm()\n"
+        "print(json.dumps({'type': type(llm).__name__, 'openai': 'langchain_community.llms.openai' in sys.modules}))",
+        LLM_PROVIDER="ollama", LLM_STREAM="0", LLM_CACHE_MODE="off",
+    )
+    assert result == {"type": "Ollama", "openai": False}
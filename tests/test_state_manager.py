@@ -0,0 +1,58 @@
+import os
+from src.state_manager import StateStore
+
+def test_append_and_reload_keyed_by_repo_and_issue(tmp_path):
+    with StateStore("repo", 1, root=str(tmp_path)) as store:
+        store.append({"type": "iteration", "iteration": 0, "result": "a"})
+        store.append({"type": "tool", "iteration": 1, "tool": "read_file", "output": "x" * 100})
+        store.append({"type": "iteration", "iteration": 1, "result": "b"})
+    with StateStore("other", 1, root=str(tmp_path)) as other:
+        other.append({"type": "iteration", "iteration": 0, "result": "z"})
+
+    reloaded = StateStore("repo", 1, root=str(tmp_path))
+    assert [r["result"] for r in reloaded.history()] == ["a", "b"]
+    assert [r["tool"] for r in reloaded.iter_records("tool")] == ["read_file"]
+    assert reloaded.last_iteration() == 1
+    assert StateStore("other", 1, root=str(tmp_path)).last_iteration() == 0
+    assert StateStore("repo", 2, root=str(tmp_path)).last_iteration() is None
+
+def test_appends_do_not_rewrite_the_file(tmp_path):
+    store = StateStore("repo", 1, root=str(tmp_path), fsync_every=1)
+    store.append({"type": "iteration", "iteration": 0, "result": "a"})
+    size = os.path.getsize(store.path)
+    store.append({"type": "iteration", "iteration": 1, "result": "b"})
+    with open(store.path, "rb") as f:
+        assert len(f.read().splitlines()) == 2
+    assert os.path.getsize(store.path) > size
+    store.close()
+
+def test_fsync_batching(tmp_path):
+    store = StateStore("repo", 1, root=str(tmp_path), fsync_every=3, fsync_interval=3600)
+    store.append({"type": "iteration", "iteration": 0, "result": "a"})
+    store.append({"type": "iteration", "iteration": 1, "result": "b"})
+    assert store._unsynced == 2
+    store.append({"type": "iteration", "iteration": 2, "result": "c"})
+    assert store._unsynced == 0
+    store.close()
+
+def test_torn_last_line_is_skipped(tmp_path):
+    with StateStore("repo", 1, root=str(tmp_path)) as store:
+        store.append({"type": "iteration", "iteration": 0, "result": "a"})
+    with open(store.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "iteration", "iteration": 1, "res')
+    reloaded = StateStore("repo", 1, root=str(tmp_path))
+    assert [r["iteration"] for r in reloaded.history()] == [0]
+    assert reloaded.last_iteration() == 0
+    with reloaded:  # resuming appends after the torn line without merging into it
+        reloaded.append({"type": "iteration", "iteration": 1, "result": "b"})
+        reloaded.append({"type": "iteration", "iteration": 2, "result": "c"})
+    assert [r["iteration"] for r in StateStore("repo", 1, root=str(tmp_path)).history()] == [0, 1, 2]
+
+def test_last_iteration_reads_across_tail_chunks(tmp_path, monkeypatch):
+    import src.state_manager as state_manager
+    monkeypatch.setattr(state_manager, "TAIL_CHUNK", 16)
+    with StateStore("repo", 1, root=str(tmp_path)) as store:
+        store.append({"type": "iteration", "iteration": 4, "result": "done"})
+        for _ in range(5):
+            store.append({"type": "tool", "iteration": 5, "output": "y" * 50})
+    assert StateStore("repo", 1, root=str(tmp_path)).last_iteration() == 4
@@ -0,0 +1,110 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+from src import tracing
+from src.tools import git_utils
+
+@pytest.fixture
+def traced(tmp_path):
+    trace, metrics = tmp_path / "trace.jsonl", tmp_path / "metrics.prom"
+    tracing.configure(str(trace), str(metrics))
+    yield trace, metrics
+    tracing.configure()
+
+def _spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_disabled_spans_are_a_shared_noop(tmp_path):
+    tracing.configure()
+    with tracing.span("anything", x=1) as span:
+        span.set(y=2)
+    assert span is tracing.span("other")
+    assert not span.recording
+    assert "anything" not in tracing.metrics_text()
+
+def test_nested_spans_share_a_trace_and_link_to_their_parent(traced):
+    trace, _ = traced
+    with tracing.span("session", issue=7):
+        with tracing.span("iteration", iteration=0) as inner:
+            inner.set(prompt_tokens=10)
+    child, parent = _spans(trace)
+    assert (child["name"], parent["name"]) == ("iteration", "session")
+    assert child["trace"] == parent["trace"]
+    assert child["parent"] == parent["span"] and parent["parent"] is None
+    assert child["attrs"] == {"iteration": 0, "prompt_tokens": 10}
+    assert child["status"] == "ok" and child["duration"] >= 0
+
+def test_exceptions_are_recorded_and_propagate(traced):
+    trace, _ = traced
+    with pytest.raises(ValueError):
+        with tracing.span("tool read_file"):
+            raise ValueError("no such file")
+    (record,) = _spans(trace)
+    assert record["status"] == "error"
+    assert record["error"] == "ValueError: no such file"
+
+def test_bind_carries_the_parent_span_into_another_thread(traced):
+    trace, _ = traced
+    from concurrent.futures import ThreadPoolExecutor
+    with tracing.span("session"):
+        def work():
+            with tracing.span("http GET"):
+                pass
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(tracing.bind(work)).result()
+    child, parent = _spans(trace)
+    assert child["parent"] == parent["span"]
+
+def test_git_subprocess_spans_record_exit_codes(traced, tmp_path):
+    trace, _ = traced
+    git_utils._run(["git", "init", "-q", str(tmp_path / "repo")])
+    with pytest.raises(subprocess.CalledProcessError):
+        git_utils._run(["git", "rev-parse", "HEAD"], cwd=str(tmp_path / "repo"))
+    init, rev_parse = _spans(trace)
+    assert init["name"] == "git init" and init["attrs"]["exit_code"] == 0
+    assert rev_parse["name"] == "git rev-parse" and rev_parse["status"] == "error"
+    assert rev_parse["attrs"]["exit_code"] != 0
+
+def test_metrics_file_is_prometheus_text(traced):
+    _, metrics = traced
+    for _ in range(3):
+        with tracing.span("llm") as span:
+            span.set(prompt_tokens=100, completion_tokens=20)
+    with tracing.span("git fetch") as span:
+        span.set(exit_code=128)
+    tracing.flush()
+    text = metrics.read_text()
+    assert "# TYPE agent_span_duration_seconds histogram" in text
+    assert 'agent_span_duration_seconds_count{span="llm"} 3' in text
+    assert 'agent_span_duration_seconds_bucket{span="llm",le="+Inf"} 3' in text
+    assert 'agent_prompt_tokens_total{span="llm"} 300' in text
+    assert 'agent_completion_tokens_total{span="llm"} 60' in text
+    assert 'agent_errors_total{span="git fetch"} 1' in text
+
+def test_processes_sharing_a_metrics_file_are_summed(traced):
+    _, metrics = traced
+    with tracing.span("llm") as span:
+        span.set(prompt_tokens=100)
+    tracing.flush()
+    child = ("from src import tracing\n"
+             f"tracing.configure(metrics_file={str(metrics)!r})\n"
+             "with tracing.span('llm') as span:\n"
+             "    span.set(prompt_tokens=5)\n")  # flushed at exit, like a speculative attempt's worker
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", child], cwd=os.path.dirname(os.path.dirname(__file__)), check=True)
+    assert 'agent_prompt_tokens_total{span="llm"} 110' in metrics.read_text()
+    tracing.flush()  # the exited children's snapshots are folded into one, and counted once
+    assert 'agent_prompt_tokens_total{span="llm"} 110' in metrics.read_text()
+    assert set(os.listdir(str(metrics) + ".parts")) == {"base.json", f"{os.getpid()}.json"}
+
+def test_traced_llm_counts_tokens(traced):
+    trace, _ = traced
+    from langchain_core.language_models.fake import FakeListLLM
+    from src.traced_llm import TracedLLM
+    llm = TracedLLM(llm=FakeListLLM(responses=["Final Answer: TASK_COMPLETE"]))
+    assert llm.invoke("x" * 400) == "Final Answer: TASK_COMPLETE"
+    (record,) = _spans(trace)
+    assert record["name"] == "llm"
+    assert record["attrs"]["prompt_tokens"] > 0 and record["attrs"]["completion_tokens"] > 0
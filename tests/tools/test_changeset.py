@@ -0,0 +1,114 @@
+import os
+import pytest
+from tests.helpers import commit, git
+from src.tools import git_utils
+from src.tools.changeset import Changeset
+
+@pytest.fixture
+def repo(origin_clone, monkeypatch):
+    """A clone of a local bare 'origin' with a.py on main, with PR lookups/creation stubbed out."""
+    work, origin = origin_clone
+    commit(work, {"a.py": "a = 1\n"}, "a.py")
+    git("push", "origin", "HEAD:main", cwd=work)
+
+    prs = []
+    def fake_find(repo_name, branch_name, dry_run=False):
+        return prs[0] if prs else None
+    def fake_create(repo_name, branch_name, title, body, base="main", dry_run=False):
+        prs.append({"html_url": "http://pr/1", "head": branch_name, "title": title})
+        return prs[0]
+    monkeypatch.setattr(git_utils, "find_pull_request", fake_find)
+    monkeypatch.setattr(git_utils, "create_pull_request", fake_create)
+    return work, origin, prs
+
+def test_commit_publishes_all_staged_files_as_one_commit(repo):
+    work, origin, prs = repo
+    cs = Changeset("repo", 5, repo_root=work)
+    cs.stage("a.py", "a = 2\n")
+    cs.stage("pkg/b.py", "b = 1\n")
+    res = cs.commit("Fix things")
+
+    assert res["error"] is None
+    assert res["applied"] and res["files"] == ["a.py", "pkg/b.py"]
+    assert git("rev-parse", "--abbrev-ref", "HEAD", cwd=work) == "agent/issue-5"
+    assert git("show", "--name-only", "--format=", "HEAD", cwd=work).splitlines() == ["a.py", "pkg/b.py"]
+    assert git("rev-parse", "refs/heads/agent/issue-5", cwd=origin) == res["commit"]
+    assert len(prs) == 1 and res["pr_updated"] is False
+    assert cs.edits == {}
+
+def test_second_commit_reuses_branch_and_pr(repo):
+    work, origin, prs = repo
+    cs = Changeset("repo", 5, repo_root=work)
+    cs.stage("a.py", "a = 2\n")
+    first = cs.commit("First")
+    cs.stage("a.py", "a = 3\n")
+    second = cs.commit("Second")
+
+    assert second["error"] is None
+    assert second["pr_updated"] is True and second["pr"] is first["pr"]
+    assert len(prs) == 1
+    assert git("rev-list", "--count", "main..agent/issue-5", cwd=work) == "2"
+
+def test_commit_without_edits_or_changes(repo):
+    work, _, _ = repo
+    cs = Changeset("repo", 5, repo_root=work)
+    assert cs.commit("Nothing")["error"] == "No staged edits."
+    cs.stage("a.py", "a = 1\n")
+    assert cs.commit("Same")["error"] == "No changes detected."
+
+def test_dry_run_builds_combined_patch(repo):
+    work, _, prs = repo
+    cs = Changeset("repo", 5, repo_root=work, dry_run=True)
+    cs.stage("a.py", "a = 2\n")
+    cs.stage("c.py", "c = 1\n")
+    res = cs.commit("Dry")
+    assert res["applied"] and res["dry_run"]
+    assert "+a = 2\n" in res["patch"] and "+c = 1\n" in res["patch"]
+    assert git("status", "--porcelain", cwd=work) == ""
+
+def test_stage_hunks_edits_staged_or_current_content(repo):
+    work, origin, prs = repo
+    cs = Changeset("repo", 5, repo_root=work)
+    assert cs.stage_hunks("a.py", [{"search": "a = 1", "replace": "a = 2"}]).startswith("Staged a.py")
+    cs.stage_hunks("a.py", [{"search": "a = 2\n", "replace": "a = 2\nb = 3\n"}])
+    assert cs.edits["a.py"] == "a = 2\nb = 3\n"
+    assert cs.stage_hunks("a.py", [{"search": "zzz", "replace": ""}]) == "Not staged: hunk 1: search text not found."
+    assert cs.commit("Hunks")["error"] is None
+    assert (open(os.path.join(work, "a.py")).read()) == "a = 2\nb = 3\n"
+
+def test_attempt_branch_is_pushed_to_the_issue_branch_only_after_a_successful_claim(repo):
+    work, origin, prs = repo
+    claims = [False, True]
+    cs = Changeset("repo", 5, repo_root=work, claim=lambda: claims.pop(0), local_branch="agent/issue-5-attempt-1")
+    cs.stage("a.py", "a = 2\n")
+    lost = cs.commit("Lost the race")
+    assert lost["applied"] and lost["error"].startswith("Another attempt already published")
+    assert prs == [] and git("branch", "-r", cwd=work) == "origin/main"
+
+    cs.stage("a.py", "a = 3\n")
+    won = cs.commit("Won")
+    assert won["error"] is None and len(prs) == 1
+    assert git("rev-parse", "--abbrev-ref", "HEAD", cwd=work) == "agent/issue-5-attempt-1"
+    assert git("rev-parse", "refs/heads/agent/issue-5", cwd=origin) == won["commit"]
+    assert prs[0]["head"] == "agent/issue-5"
+
+def test_claim_is_released_when_the_pr_cannot_be_opened(repo, monkeypatch):
+    work, origin, prs = repo
+    released, create = [], git_utils.create_pull_request
+    def flaky_create(*args, **kwargs):
+        if not released:
+            raise RuntimeError("422 Unprocessable Entity")
+        return create(*args, **kwargs)
+    monkeypatch.setattr(git_utils, "create_pull_request", flaky_create)
+    cs = Changeset("repo", 5, repo_root=work, claim=lambda: True, release=lambda: released.append(True),
+                   local_branch="agent/issue-5-attempt-0")
+    cs.stage("a.py", "a = 2\n")
+    assert cs.commit("Fix")["error"] == "422 Unprocessable Entity"
+    assert released == [True] and prs == []
+
+    cs.stage("a.py", "a = 3\n")
+    assert cs.commit("Fix again")["error"] is None and len(prs) == 1
+    monkeypatch.setattr(git_utils, "push_branch", lambda *a, **kw: (False, "rejected"))
+    cs.stage("a.py", "a = 4\n")
+    assert cs.commit("Later")["error"] == "Push failed: rejected"
+    assert released == [True]  # a PR is already out under this claim: keep it
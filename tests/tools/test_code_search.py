@@ -0,0 +1,104 @@
+import os
+import pytest
+from tests.helpers import commit, git, write
+from src.tools import code_search
+from src.tools.code_search import TrigramIndex, required_literals, search_code
+
+@pytest.fixture
+def repo(git_repo, tmp_path, monkeypatch):
+    root = git_repo
+    write(root, "data.bin", b"\0\x01handle_request", mode="wb")
+    commit(root, {"src/app.py": "import os\n\ndef handle_request(req):\n    return req\n",
+                  "src/util.py": "def helper():\n    pass\n"}, "init")
+    monkeypatch.setattr(code_search, "SEARCH_INDEX_DIR", str(tmp_path / "search"))
+    code_search._indexes.clear()
+    code_search._checked.clear()
+    return root
+
+def test_required_literals():
+    assert required_literals("def handle_\\w+") == ["def handle_"]
+    assert required_literals("foo(bar|baz)qux") == ["foo", "qux"]
+    assert required_literals("abcd?") == ["abc"]
+    assert required_literals("a|b") == []
+
+def test_literal_search_is_case_insensitive_and_skips_binaries(repo):
+    res = search_code("HANDLE_REQUEST", repo)
+    assert res["matches"] == [{"path": "src/app.py", "line": 3, "text": "def handle_request(req):"}]
+
+def test_regex_search_with_path_filter_and_limit(repo):
+    res = search_code('{"query": "^def \\\\w+", "regex": true}', repo)
+    assert [(m["path"], m["line"]) for m in res["matches"]] == [("src/app.py", 3), ("src/util.py", 1)]
+    res = search_code('{"query": "^def \\\\w+", "regex": true, "path": "src/util*"}', repo)
+    assert [m["path"] for m in res["matches"]] == ["src/util.py"]
+    res = search_code('{"query": "def", "limit": 1}', repo)
+    assert len(res["matches"]) == 1 and res["truncated"] is True
+
+def test_invalid_inputs(repo):
+    assert "error" in search_code('{"query": "(", "regex": true}', repo)
+    assert "error" in search_code("", repo)
+
+def test_index_updates_only_changed_files_and_persists(repo):
+    index = code_search.get_index(repo)
+    assert search_code("brand_new_symbol", repo)["matches"] == []
+
+    write(repo, "src/util.py", "def brand_new_symbol():\n    pass\n")
+    assert index.update() == 1
+    assert search_code("brand_new_symbol", repo)["matches"][0]["path"] == "src/util.py"
+    assert search_code("helper", repo)["matches"] == []
+    index.save()
+
+    reloaded = TrigramIndex.load(repo)
+    assert reloaded.update() == 0
+    assert reloaded.search("brand_new_symbol")["matches"][0]["line"] == 1
+
+def test_non_utf8_files_are_searched_not_fatal(repo):
+    write(repo, "src/legacy.py", "# caf\xe9\ndef handle_legacy():\n    pass\n".encode("latin-1"), mode="wb")
+    git("add", ".", cwd=repo)
+    res = search_code("handle_legacy", repo)
+    assert res["matches"] == [{"path": "src/legacy.py", "line": 2, "text": "def handle_legacy():"}]
+    assert search_code("caf", repo)["matches"][0]["text"] == "# caf�"
+
+def test_queries_skip_the_file_scan_until_head_or_the_git_index_change(repo, monkeypatch):
+    search_code("helper", repo)
+    scans = []
+    listing = code_search.tracked_files
+    monkeypatch.setattr(code_search, "tracked_files", lambda root: scans.append(root) or listing(root))
+    search_code("helper", repo)
+    assert scans == []
+    write(repo, "src/util.py", "def renamed_helper():\n    pass\n")
+    git("add", "src/util.py", cwd=repo)  # what `git apply --index` does for the agent's edits
+    assert search_code("renamed_helper", repo)["matches"][0]["path"] == "src/util.py"
+    assert len(scans) == 1
+
+def test_changes_are_appended_to_the_saved_index(repo):
+    code_search.get_index(repo)
+    index = TrigramIndex.load(repo)
+    snapshot = os.path.getmtime(index.store_path)
+    write(repo, "src/new.py", "def appended_symbol():\n    pass\n")
+    os.remove(os.path.join(repo, "src/util.py"))
+    git("add", "-A", cwd=repo)
+    code_search.get_index(repo)
+    assert os.path.getmtime(index.store_path) == snapshot and os.path.exists(index.log_path)
+    reloaded = TrigramIndex.load(repo)
+    assert reloaded.keys == code_search.get_index(repo).keys and "src/util.py" not in reloaded.keys
+    assert reloaded.search("appended_symbol")["matches"][0]["path"] == "src/new.py"
+    assert reloaded.update() == 0
+
+def test_worktrees_share_the_saved_index_and_memory_is_bounded(repo, tmp_path, monkeypatch):
+    code_search.get_index(repo)
+    trees = [str(tmp_path / f"wt{n}") for n in range(3)]
+    for path in trees:
+        git("worktree", "add", "--detach", path, cwd=repo)
+    read = []
+    real = TrigramIndex._read_grams
+    monkeypatch.setattr(TrigramIndex, "_read_grams", lambda self, path: read.append(path) or real(self, path))
+    index = code_search.get_index(trees[0])
+    assert index.store_path == code_search.get_index(repo).store_path and read == []  # nothing re-indexed
+    assert search_code("handle_request", trees[0])["matches"][0]["path"] == "src/app.py"
+    assert len(os.listdir(tmp_path / "search")) == 1
+
+    monkeypatch.setattr(code_search, "MEMORY_SLOTS", 2)
+    for path in trees[1:]:
+        code_search.get_index(path)
+    assert list(code_search._indexes) == [os.path.abspath(p) for p in trees[1:]]
+    assert set(code_search._checked) == set(code_search._indexes)
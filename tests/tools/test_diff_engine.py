@@ -0,0 +1,46 @@
+import difflib
+import random
+import subprocess
+from src.tools import diff_engine
+
+def _apply(a, b, codes):
+    out = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2]
+        out += b[j1:j2]
+    return out
+
+def test_matches_difflib_output_for_typical_edits():
+    rng = random.Random(0)
+    for _ in range(200):
+        a = [f"line {i}\n" for i in range(300)]
+        b = list(a)
+        b[rng.randrange(300)] = "changed\n"
+        b.insert(rng.randrange(300), "inserted\n")
+        del b[rng.randrange(300)]
+        assert "".join(diff_engine.unified_diff(a, b, "a/f", "b/f")) == "".join(difflib.unified_diff(a, b, "a/f", "b/f"))
+
+def test_opcodes_reconstruct_target_with_repeated_lines():
+    rng = random.Random(1)
+    for _ in range(500):
+        a = [f"{rng.randrange(3)}\n" for _ in range(rng.randrange(40))]
+        b = [f"{rng.randrange(3)}\n" for _ in range(rng.randrange(40))]
+        assert _apply(a, b, diff_engine.opcodes(a, b)) == b
+    assert list(diff_engine.unified_diff(["x\n"], ["x\n"])) == []
+
+def test_myers_finds_a_longest_common_subsequence():
+    a, b = list("abcabba"), list("cbabac")
+    out = []
+    diff_engine._myers(a, 0, len(a), b, 0, len(b), out)
+    assert len(out) == 4 and all(a[i] == b[j] for i, j in out)
+
+def test_patch_applies_with_git_including_missing_final_newline(tmp_path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    (tmp_path / "f.txt").write_text("one\ntwo\nthree")
+    a = ["one\n", "two\n", "three"]
+    b = ["one\n", "2\n", "three\n", "four"]
+    patch = "".join(diff_engine.unified_diff(a, b, "a/f.txt", "b/f.txt"))
+    assert diff_engine.NO_NEWLINE in patch
+    subprocess.run(["git", "apply", "-"], input=patch, text=True, cwd=tmp_path, check=True)
+    assert (tmp_path / "f.txt").read_text() == "one\n2\nthree\nfour"
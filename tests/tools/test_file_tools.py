@@ -1,7 +1,7 @@
 import os
 import tempfile
 import pytest
-from src.tools.file_tools import read_file, make_unified_diff, apply_file_patch
+from src.tools.file_tools import read_file, make_unified_diff, apply_file_patch, apply_search_replace
 
 @pytest.fixture
 def temp_file():
@@ -105,3 +105,69 @@ def test_apply_file_patch_dry_run(temp_file):
     assert "patch" in result and result["patch"] is not None
     # Because dry run, applied should be True if patch generated
     assert result["applied"] or result["error"] == "No changes detected."
+
+def _write_lines(path, n):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(1, n + 1):
+            f.write(f"line {i}\n")
+
+def test_read_file_line_range(temp_file):
+    tmpdir, path = temp_file
+    _write_lines(path, 10)
+    assert read_file(path, start_line=3, end_line=4) == "line 3\nline 4\n"
+    assert read_file(path, start_line=9) == "line 9\nline 10\n"
+    assert read_file(path, start_line=20) == ""
+
+def test_read_file_line_range_via_mmap(temp_file, monkeypatch):
+    import src.tools.file_tools as file_tools
+    monkeypatch.setattr(file_tools, "READ_MMAP_THRESHOLD", 1)
+    tmpdir, path = temp_file
+    _write_lines(path, 10)
+    assert read_file(path, start_line=3, end_line=4) == "line 3\nline 4\n"
+    assert read_file(path, start_line=10) == "line 10\n"
+    assert read_file(path, start_line=2, end_line=2) == "line 2\n"
+
+def test_read_file_byte_range(temp_file):
+    tmpdir, path = temp_file
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("0123456789")
+    assert read_file(path, start_byte=2, end_byte=5) == "234"
+    assert read_file(path, start_byte=8) == "89"
+
+def test_read_file_cache_invalidated_on_write(temp_file):
+    tmpdir, path = temp_file
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("first")
+    assert read_file(path) == "first"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("second!")
+    assert read_file(path) == "second!"
+
+def test_read_file_oversized_returns_outline(temp_file):
+    tmpdir, path = temp_file
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("import os\n")
+        for i in range(200):
+            f.write(f"def func_{i}():\n    return {i}\n")
+    out = read_file(path, max_bytes=100)
+    assert "too large" in out
+    assert "import os" in out
+    assert "def func_199():" in out
+    assert "return 199" not in out
+
+def test_read_file_query_accepts_path_or_json(temp_file):
+    from src.tools.file_tools import read_file_query
+    tmpdir, path = temp_file
+    _write_lines(path, 5)
+    name = os.path.basename(path)
+    assert read_file_query(name, repo_root=tmpdir).startswith("line 1\n")
+    assert read_file_query('{"path": "%s", "start_line": 5}' % name, repo_root=tmpdir) == "line 5\n"
+    assert "Invalid" in read_file_query('{"start_line": 5}', repo_root=tmpdir)
+
+def test_apply_search_replace_requires_unique_matches():
+    content = "a = 1\nb = 2\nb = 2\n"
+    assert apply_search_replace(content, [{"search": "a = 1", "replace": "a = 3"}]) == "a = 3\nb = 2\nb = 2\n"
+    with pytest.raises(ValueError, match="found 2 times"):
+        apply_search_replace(content, [{"search": "b = 2", "replace": "b = 3"}])
+    with pytest.raises(ValueError, match="hunk 2: search text not found"):
+        apply_search_replace(content, [{"search": "a = 1", "replace": "a = 3"}, {"search": "a = 1", "replace": "x"}])
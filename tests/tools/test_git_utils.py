@@ -31,6 +31,12 @@ def test_current_branch_dry_run():
     result = git_utils.current_branch(dry_run=True)
     assert result is None
 
+@pytest.fixture(autouse=True)
+def reset_fetch_throttle():
+    git_utils._last_fetch.clear()
+    yield
+    git_utils._last_fetch.clear()
+
 def test_create_branch_calls_git_commands():
     with patch("subprocess.run") as mock_run:
         mock_run.return_value = mock_subprocess_run()
@@ -39,6 +45,31 @@ def test_create_branch_calls_git_commands():
         assert ["git", "fetch", "origin"] in calls
         assert ["git", "checkout", "-b", "test-branch"] in calls
 
+def test_create_branch_fetches_at_most_once_per_interval():
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = mock_subprocess_run(stdout=".git\n")
+        git_utils.create_branch("first")
+        git_utils.create_branch("second")
+        calls = [call.args[0] for call in mock_run.call_args_list]
+        assert calls.count(["git", "fetch", "origin"]) == 1
+        assert ["git", "checkout", "-b", "second"] in calls
+
+def test_fetch_runs_when_wanted_commit_is_missing():
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = mock_subprocess_run(stdout=".git\n")
+        assert git_utils.fetch() is True
+        mock_run.return_value = mock_subprocess_run(returncode=1, check=False)
+        assert git_utils.fetch(want="deadbeef") is True
+        assert git_utils.fetch_stats()["fetches"] >= 2
+
+def test_fetch_skips_within_interval_and_records_savings():
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = mock_subprocess_run(stdout=".git\n")
+        assert git_utils.fetch() is True
+        before = git_utils.fetch_stats()["skipped"]
+        assert git_utils.fetch() is False
+        assert git_utils.fetch_stats()["skipped"] == before + 1
+
 def test_create_branch_dry_run():
     with patch("subprocess.run") as mock_run:
         git_utils.create_branch("test-branch", dry_run=True)
@@ -108,6 +139,13 @@ def test_push_branch_failure():
         assert not ok
         assert "push error" in msg
 
+def test_push_branch_to_another_remote_name():
+    with patch("subprocess.run") as mock_run:
+        mock_run.return_value = mock_subprocess_run(returncode=0)
+        ok, _ = git_utils.push_branch("agent/issue-5-attempt-1", cwd="w", target="agent/issue-5")
+        assert ok
+        assert mock_run.call_args.args[0] == ["git", "push", "--set-upstream", "origin", "agent/issue-5-attempt-1:agent/issue-5"]
+
 def test_push_branch_dry_run():
     ok, msg = git_utils.push_branch("feature-branch", dry_run=True)
     assert ok
@@ -120,22 +158,22 @@ def test_create_pull_request_dry_run():
     assert pr["title"] == "title"
     assert "https://github.com/" in pr["html_url"]
 
-@pytest.mark.skipif("requests" not in globals(), reason="requests not installed")
 def test_create_pull_request_real(monkeypatch):
-    # We patch requests.post to simulate a GitHub API response
-    import requests
+    # We patch the shared GitHub session to simulate a GitHub API response
+    from src import github_client
     class DummyResponse:
         def raise_for_status(self):
             pass
         def json(self):
             return {"html_url": "http://fakepr.url", "title": "pr title"}
 
-    def fake_post(url, headers, json):
-        assert "Authorization" in headers
-        assert json["title"] == "Test PR"
-        return DummyResponse()
+    class DummySession:
+        def post(self, url, json):
+            assert url.endswith("/repos/davidgraymi/repo/pulls")
+            assert json["title"] == "Test PR"
+            return DummyResponse()
 
-    monkeypatch.setattr(requests, "post", fake_post)
+    monkeypatch.setattr(github_client, "get_session", lambda: DummySession())
     pr = git_utils.create_pull_request("repo", "branch", "Test PR", "PR body")
     assert pr["html_url"] == "http://fakepr.url"
     assert pr["title"] == "pr title"
@@ -0,0 +1,42 @@
+import os
+import pytest
+from tests.helpers import commit, git
+from src.tools import git_utils, mirror
+
+@pytest.fixture
+def origin(origin_clone, tmp_path, monkeypatch):
+    """A local bare 'origin' with one commit on main, plus a scratch clone to push more commits from."""
+    work, origin = origin_clone
+    monkeypatch.setattr(mirror, "MIRROR_ROOT", str(tmp_path / "mirrors"))
+    return origin, work
+
+def test_ensure_mirror_clones_once_and_tracks_origin_branches(origin):
+    url, _ = origin
+    path = mirror.ensure_mirror("repo", url=url)
+    assert path == mirror.mirror_path("repo")
+    assert git("rev-parse", "--is-bare-repository", cwd=path) == "true"
+    assert git("rev-parse", "origin/main", cwd=path)
+    assert mirror.ensure_mirror("repo", url=url) == path
+
+def test_ensure_mirror_fetches_when_base_sha_is_missing(origin):
+    url, work = origin
+    path = mirror.ensure_mirror("repo", url=url)
+    commit(work, {"b.txt": "b\n"}, "second")
+    git("push", "origin", "HEAD:main", cwd=work)
+    new_sha = git("rev-parse", "HEAD", cwd=work)
+
+    # still inside the fetch interval, so a plain call doesn't see the new commit ...
+    mirror.ensure_mirror("repo", url=url)
+    assert not git_utils._has_commit(new_sha, path)
+    # ... but asking for it explicitly does
+    mirror.ensure_mirror("repo", url=url, want=new_sha)
+    assert git_utils._has_commit(new_sha, path)
+
+def test_add_worktree_checks_out_base_from_mirror(origin, tmp_path):
+    url, _ = origin
+    wt = str(tmp_path / "wt")
+    repo = mirror.add_worktree("repo", wt, url=url)
+    assert repo == mirror.mirror_path("repo")
+    assert open(os.path.join(wt, "README.md")).read() == "hello\n"
+    git_utils.remove_worktree(wt, cwd=repo)  # how batch and speculative clean up
+    assert not os.path.exists(wt)
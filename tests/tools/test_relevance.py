@@ -0,0 +1,77 @@
+import os
+import pytest
+from tests.helpers import commit
+from src.tools import relevance, tree_index
+
+FILES = {
+    "README.md": "# Demo\n",
+    "src/auth/login.py": 'def validate_password(user, password):\n    """Check the password hash for a user."""\n    return True\n',
+    "src/billing/invoice.py": 'class InvoiceRenderer:\n    """Render invoices as PDF."""\n',
+    "src/util.py": "def helper():\n    pass\n",
+}
+
+@pytest.fixture
+def repo(git_repo, tmp_path, monkeypatch):
+    root = git_repo
+    commit(root, FILES, "init")
+    monkeypatch.setattr(tree_index, "TREE_CACHE_DIR", str(tmp_path / "trees"))
+    monkeypatch.setattr(relevance, "_store", relevance.BlobStore(str(tmp_path / "retrieval")))
+    tree_index._memory.clear()
+    relevance._memory.clear()
+    return root
+
+def _issue(title, body="", comments=()):
+    return {"issue": {"title": title, "body": body}, "comments": [{"body": c} for c in comments]}
+
+def test_tokenize_splits_identifiers():
+    assert relevance.tokenize("validatePassword in login_form") == ["validatepassword", "validate", "password", "login_form", "login", "form"]
+
+def test_ranks_files_by_issue_terms_with_snippets(repo):
+    ranked = relevance.rank_files(_issue("Login fails", "password validation is wrong", ["see validate_password"]), repo)
+    assert ranked[0]["path"] == "src/auth/login.py"
+    assert ranked[0]["snippets"][0].startswith("1: def validate_password")
+    assert "src/util.py" not in [r["path"] for r in ranked]
+    assert relevance.rank_files(_issue("PDF invoices render blank"), repo, top_k=1)[0]["path"] == "src/billing/invoice.py"
+    assert relevance.rank_files(_issue("the and of"), repo) == []
+
+def test_index_is_per_commit_and_only_new_blobs_are_tokenized(repo, monkeypatch):
+    first = relevance.get_index(repo)
+    assert relevance.get_index(repo) is first
+
+    built = []
+    document = relevance.document
+    monkeypatch.setattr(relevance, "document", lambda path, data: built.append(path) or document(path, data))
+    commit(repo, {"src/billing/refund.py": "def issue_refund(invoice):\n    pass\n"}, "refunds")
+    second = relevance.get_index(repo)
+    assert second.sha != first.sha
+    assert built == ["src/billing/refund.py"]
+
+    built.clear()
+    fresh = relevance.BlobStore(relevance._store.root)  # a new process reads the stored documents back
+    tree = tree_index.get_index(repo)
+    assert fresh.documents(repo, tree.sha, tree.entries) == second.docs and built == []
+
+def test_documents_only_old_commits_use_are_pruned(repo, tmp_path):
+    store = relevance.BlobStore(str(tmp_path / "pruned"), keep_commits=1)
+    first = tree_index.get_index(repo)
+    store.documents(repo, first.sha, first.entries)
+    util_blob = dict((p, b) for p, _, b in first.entries)["src/util.py"]
+    commit(repo, {"src/util.py": "def helper():\n    return 1\n"}, "util")
+    second = tree_index.get_index(repo)
+    store.documents(repo, second.sha, second.entries)
+    assert os.listdir(os.path.join(store.root, "commits")) == [f"{second.sha}.txt"]
+    stored = {k for name in os.listdir(os.path.join(store.root, "docs")) for k in store._load_shard(name[:2])}
+    assert stored == {store.key(b, p) for p, _, b in second.entries}
+    assert store.key(util_blob, "src/util.py") not in stored
+
+def test_blobs_are_read_in_batches_and_stored_in_shards(repo, tmp_path, monkeypatch):
+    reads = []
+    cat = relevance._cat_blobs
+    monkeypatch.setattr(relevance, "_cat_blobs", lambda root, blobs: reads.append(len(blobs)) or cat(root, blobs))
+    monkeypatch.setattr(relevance, "CAT_BATCH", 2)
+    store = relevance.BlobStore(str(tmp_path / "batched"))
+    tree = tree_index.get_index(repo)
+    docs = store.documents(repo, tree.sha, tree.entries)
+    assert reads == [2, 2] and docs["src/util.py"][1] == [(1, "def helper():")]
+    shards = os.listdir(os.path.join(store.root, "docs"))
+    assert len(shards) <= len(FILES) and all(len(name) == len("ab.pickle") for name in shards)
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import pytest
+from tests.helpers import commit, git, write
+from src.tools import test_impact, test_results, test_tools
+from src.tools.test_results import ResultCache, parse_junit, tree_state
+from src.tools.changeset import Changeset
+
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/a.py": "def one():\n    return 1\n",
+    "pkg/b.py": "def two():\n    return 2\n",
+    "tests/test_a.py": "from pkg.a import one\n\ndef test_one():\n    assert one() == 1\n",
+    "tests/test_b.py": "from pkg.b import two\n\ndef test_two():\n    assert two() == 2\n",
+}
+
+@pytest.fixture
+def repo(git_repo, tmp_path, monkeypatch):
+    root = git_repo
+    ini = '[pytest]\npythonpath = .\nmarkers = slow\naddopts = --cov=pkg --cov-report term -m "not slow"\n'
+    commit(root, {**FILES, "pytest.ini": ini}, "init")
+    monkeypatch.setattr(test_impact, "TEST_MAP_DIR", str(tmp_path / "testmap"))
+    monkeypatch.setattr(test_tools, "ResultCache", lambda: ResultCache(str(tmp_path / "results")))
+    return root
+
+def _coverage_db(path, root, rows):
+    with sqlite3.connect(path) as db:
+        db.executescript("CREATE TABLE file (id INTEGER PRIMARY KEY, path TEXT);"
+                         "CREATE TABLE context (id INTEGER PRIMARY KEY, context TEXT);"
+                         "CREATE TABLE line_bits (file_id INTEGER, context_id INTEGER, numbits BLOB);")
+        for n, (source, context) in enumerate(rows, 1):
+            db.execute("INSERT INTO file VALUES (?, ?)", (n, os.path.join(root, source)))
+            db.execute("INSERT INTO context VALUES (?, ?)", (n, context))
+            db.execute("INSERT INTO line_bits VALUES (?, ?, x'01')", (n, n))
+
+def test_read_coverage_contexts(repo, tmp_path):
+    db = str(tmp_path / ".coverage")
+    _coverage_db(db, repo, [("pkg/a.py", "tests/test_a.py::test_one|run"), ("pkg/b.py", "tests/test_b.py::test_two|setup"),
+                            ("pkg/a.py", ""), ("/elsewhere/x.py", "t|run")])
+    assert test_impact.read_coverage_contexts(db, repo) == {
+        "pkg/a.py": ["tests/test_a.py::test_one"], "pkg/b.py": ["tests/test_b.py::test_two"]}
+
+def test_impacted_tests_follow_changes_since_mapped_commit(repo):
+    assert test_impact.impacted_tests(repo) is None  # no map yet
+    test_impact.save_map(git("rev-parse", "HEAD", cwd=repo), {
+        "pkg/a.py": ["tests/test_a.py::test_one"], "pkg/b.py": ["tests/test_b.py::test_two"]})
+    assert test_impact.impacted_tests(repo) == []
+
+    write(repo, "pkg/a.py", "def one():\n    return 1  # edited\n")
+    assert test_impact.impacted_tests(repo) == ["tests/test_a.py::test_one"]
+    git("commit", "-am", "edit a", cwd=repo)  # the map of an ancestor commit still applies
+    write(repo, "tests/test_new.py", "def test_new():\n    pass\n")
+    assert test_impact.impacted_tests(repo) == ["tests/test_a.py::test_one", "tests/test_new.py"]
+    write(repo, "tests/conftest.py", "")
+    assert test_impact.impacted_tests(repo) is None
+
+def test_unmapped_sources_run_the_full_suite(repo, monkeypatch):
+    # pkg/const.py only runs at import time, so coverage contexts never attribute it to a test
+    write(repo, "pkg/const.py", "LIMIT = 1\n")
+    git("add", ".", cwd=repo)
+    git("commit", "-m", "const", cwd=repo)
+    test_impact.save_map(git("rev-parse", "HEAD", cwd=repo), {"pkg/a.py": ["tests/test_a.py::test_one"]})
+    write(repo, "pkg/const.py", "LIMIT = 2\n")
+    assert test_impact.impacted_tests(repo) is None
+    git("checkout", "pkg/const.py", cwd=repo)
+    write(repo, "pkg/new.py", "X = 1\n")  # a new module isn't in the map either
+    assert test_impact.impacted_tests(repo) is None
+    os.remove(os.path.join(repo, "pkg/new.py"))
+    write(repo, "tests/data/expected.json", "{}\n")  # nor is a fixture the tests read
+    assert test_impact.impacted_tests(repo) is None
+    os.remove(os.path.join(repo, "tests/data/expected.json"))
+    monkeypatch.setattr(test_results, "AGENT_DIRS", (os.path.join(repo, ".agent_state"),))
+    write(repo, ".agent_state/repo/1.jsonl", "{}\n")  # the agent's own files never count
+    assert test_impact.impacted_tests(repo) == []
+
+def test_run_tests_impacted_runs_only_selected_tests_in_parallel(repo, monkeypatch):
+    test_impact.save_map(git("rev-parse", "HEAD", cwd=repo), {
+        "pkg/a.py": ["tests/test_a.py::test_one"], "pkg/b.py": ["tests/test_b.py::test_two"]})
+    write(repo, "pkg/a.py", "def one():\n    return 1\n\n")
+    write(repo, "pkg/b.py", "def two():\n    return 3\n")
+    calls = []
+    real = test_tools._pytest
+    monkeypatch.setattr(test_tools, "_pytest", lambda args, *a, **kw: calls.append(args) or real(args, *a, **kw))
+    result = test_tools.run_tests("impacted", cwd=repo, timeout=60)
+    assert result["mode"] == "impacted" and result["selected"] == 2
+    assert result["failed"] == 1 and result["passed"] == 1
+    assert result["failures"][0]["test"] == "tests.test_b.test_two" and "assert 3 == 2" in result["failures"][0]["message"]
+    assert sorted(arg for args in calls for arg in args) == ["tests/test_a.py::test_one", "tests/test_b.py::test_two"]
+
+    calls.clear()
+    code, _, _ = test_tools.run_selected(["tests/test_a.py::test_one", "tests/test_b.py::test_two"], repo, timeout=60, workers=2)
+    assert code == 1 and sorted(calls) == [["tests/test_a.py::test_one"], ["tests/test_b.py::test_two"]]
+
+def test_shards_keep_files_together():
+    shards = test_tools._shards(["t/a.py::x", "t/a.py::y", "t/b.py::z", "t/c.py::w"], workers=2)
+    assert sorted(map(sorted, shards)) == [["t/a.py::x", "t/a.py::y"], ["t/b.py::z", "t/c.py::w"]]
+    assert test_tools._shards(["t/a.py::x"], workers=8) == [["t/a.py::x"]]
+
+def test_addopts_keep_everything_but_coverage(tmp_path):
+    assert test_tools.without_coverage(["--cov", "src", "--cov-report=term", "-x", "--cov", "--no-cov-on-fail",
+                                        "--cov-branch", "-m", "not slow", "--cov-fail-under", "90"]) == ["-x", "-m", "not slow"]
+    write(str(tmp_path), "pyproject.toml", '[tool.pytest.ini_options]\naddopts = ["-x", "--cov=src"]\n')
+    assert test_tools.configured_addopts(str(tmp_path)) == ["-x", "--cov=src"]
+    write(str(tmp_path), "setup.cfg", "[tool:pytest]\naddopts = -v\n")
+    assert test_tools.configured_addopts(str(tmp_path)) == ["-x", "--cov=src"]  # pyproject.toml comes first
+    write(str(tmp_path), "pytest.ini", "")
+    assert test_tools.configured_addopts(str(tmp_path)) == []
+
+def test_full_run_drops_coverage_addopts_and_times_out(repo):
+    # the configured -m "not slow" still applies; the configured --cov options are dropped
+    write(repo, "tests/test_c.py", "import pytest\n\n@pytest.mark.slow\ndef test_slow():\n    assert False\n")
+    ok, result = test_tools.verify_full_suite(repo, timeout=60)
+    assert ok and result["passed"] == 2 and result["failures"] == []
+    write(repo, "tests/test_slow.py", "import time\n\ndef test_slow():\n    time.sleep(30)\n")
+    result = test_tools.run_tests("full", repo, timeout=2)
+    assert result["timed_out"] and "timed out after 2s" in result["output"]
+
+def test_changeset_does_not_push_when_verification_fails(repo, monkeypatch):
+    from src.tools import git_utils
+    pushed = []
+    monkeypatch.setattr(git_utils, "push_branch", lambda *a, **kw: pushed.append(a) or (True, "ok"))
+    monkeypatch.setattr(git_utils, "create_branch", lambda name, dry_run=False, cwd=None: git("checkout", "-b", name, cwd=cwd))
+    cs = Changeset("repo", 1, repo_root=repo, verify=lambda: test_tools.verify_full_suite(repo, timeout=60))
+    cs.stage("pkg/a.py", "def one():\n    return 0\n")
+    res = cs.commit("Break one")
+    assert res["applied"] and res["error"].startswith("Test suite failed")
+    assert res["tests"]["failed"] == 1 and pushed == []
+
+def test_results_are_memoized_by_tree_state(repo, tmp_path, monkeypatch):
+    calls = []
+    real = test_tools._pytest
+    monkeypatch.setattr(test_tools, "_pytest", lambda *a, **kw: calls.append(a) or real(*a, **kw))
+    cache = ResultCache(str(tmp_path / "memo"))
+    clean = tree_state(repo)
+
+    first = test_tools.run_tests("full", repo, timeout=60, cache=cache)
+    assert not first["cached"] and first["passed"] == 2
+    runs = len(calls)
+    assert test_tools.run_tests("full", repo, timeout=60, cache=cache)["cached"]
+    assert len(calls) == runs
+
+    write(repo, "pkg/b.py", "def two():\n    return 3\n")
+    assert tree_state(repo) != clean
+    broken = test_tools.run_tests("full", repo, timeout=60, cache=cache)
+    assert not broken["cached"] and broken["failed"] == 1 and len(calls) > runs
+    runs = len(calls)
+
+    write(repo, "pkg/b.py", FILES["pkg/b.py"])  # reverting returns to the first result
+    assert tree_state(repo) == clean
+    again = test_tools.run_tests("full", repo, timeout=60, cache=cache)
+    assert again["cached"] and again["passed"] == 2 and len(calls) == runs
+
+def test_tree_state_ignores_the_agents_own_files(repo, monkeypatch):
+    monkeypatch.setattr(test_results, "AGENT_DIRS", (os.path.join(repo, ".agent_state"), os.path.join(repo, ".agent_cache", "llm")))
+    clean = tree_state(repo)
+    write(repo, ".agent_state/repo/1.jsonl", '{"type": "tool"}\n')
+    write(repo, ".agent_cache/llm/ab.json", "{}")
+    assert tree_state(repo) == clean
+    write(repo, ".agent_cache/other.txt", "x")  # only the configured directories are left out
+    assert tree_state(repo) != clean
+
+def test_parse_junit(tmp_path):
+    report = tmp_path / "junit.xml"
+    report.write_text(
+        '<testsuites><testsuite>'
+        '<testcase classname="tests.test_a" name="test_ok" time="0.5"/>'
+        '<testcase classname="tests.test_a" name="test_bad" time="0.25"><failure message="assert 1 == 2">trace</failure></testcase>'
+        '<testcase classname="tests.test_a" name="test_skip" time="0"><skipped message="later"/></testcase>'
+        '</testsuite></testsuites>'
+    )
+    assert parse_junit(str(report)) == [
+        {"test": "tests.test_a.test_ok", "outcome": "passed", "duration": 0.5},
+        {"test": "tests.test_a.test_bad", "outcome": "failed", "duration": 0.25, "message": "assert 1 == 2\ntrace"},
+        {"test": "tests.test_a.test_skip", "outcome": "skipped", "duration": 0.0},
+    ]
+    assert parse_junit(str(tmp_path / "missing.xml")) == []
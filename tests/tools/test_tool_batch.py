@@ -0,0 +1,54 @@
+import json
+import threading
+import time
+from src.tools import tool_batch
+
+def test_read_only_calls_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)  # only passes if all three reads are in flight together
+    def read_file(path):
+        barrier.wait()
+        return f"contents of {path}"
+    calls = json.dumps([{"tool": "read_file", "input": p} for p in ("a.py", "b.py", "c.py")])
+    out = tool_batch.batch_query(calls, {"read_file": read_file})
+    assert out.index("contents of a.py") < out.index("contents of b.py") < out.index("contents of c.py")
+    assert out.startswith("[1] read_file 'a.py':")
+
+def test_mutating_calls_wait_for_earlier_reads_and_keep_their_order():
+    events = []
+    lock = threading.Lock()
+    def read(name):
+        time.sleep(0.05)
+        with lock:
+            events.append(f"read {name}")
+        return name
+    def stage(name):
+        with lock:
+            events.append(f"stage {name}")
+        return "staged"
+    funcs = {"read_file": read, "stage_edit": stage}
+    calls = [("read_file", "a"), ("read_file", "b"), ("stage_edit", "x"), ("stage_edit", "y"), ("read_file", "c")]
+    outputs = tool_batch.run_calls(calls, funcs)
+    assert outputs == ["a", "b", "staged", "staged", "c"]
+    assert sorted(events[:2]) == ["read a", "read b"]
+    assert events[2:] == ["stage x", "stage y", "read c"]
+
+def test_structured_inputs_are_passed_as_json():
+    seen = []
+    calls = tool_batch.parse_calls(json.dumps([{"tool": "stage_edit", "input": {"path": "a.py", "new_content": "x"}}]))
+    tool_batch.run_calls(calls, {"stage_edit": seen.append})
+    assert json.loads(seen[0]) == {"path": "a.py", "new_content": "x"}
+
+def test_failures_and_unknown_tools_are_reported_per_call():
+    def boom(_):
+        raise RuntimeError("disk full")
+    out = tool_batch.run_calls([("read_file", "a"), ("nope", ""), ("search_code", "x")],
+                               {"read_file": boom, "search_code": lambda q: "1 match"})
+    assert out[0] == "Error: RuntimeError: disk full"
+    assert out[1].startswith("Unknown tool 'nope'")
+    assert out[2] == "1 match"
+
+def test_invalid_batch_input():
+    assert tool_batch.batch_query("not json", {}).startswith("Invalid batch input")
+    assert tool_batch.batch_query("[]", {}).startswith("Invalid batch input")
+    too_many = json.dumps([{"tool": "read_file", "input": "a"}] * (tool_batch.TOOL_BATCH_MAX_CALLS + 1))
+    assert "at most" in tool_batch.batch_query(too_many, {})
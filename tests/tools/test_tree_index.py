@@ -0,0 +1,75 @@
+import os
+import pytest
+from tests.helpers import commit, git, write
+from src.tools import tree_index
+
+@pytest.fixture
+def repo(git_repo, tmp_path, monkeypatch):
+    root = git_repo
+    commit(root, {"README.md": "hi\n", "src/a.py": "a\n", "src/b.py": "bb\n", "src/sub/c.txt": "ccc\n", "tests/test_a.py": "t\n"}, "init")
+    monkeypatch.setattr(tree_index, "TREE_CACHE_DIR", str(tmp_path / "trees"))
+    tree_index._memory.clear()
+    return root
+
+def test_summary_counts_files_and_bytes_per_directory(repo):
+    summary = tree_index.list_repo_tree("", repo)
+    assert summary["dirs"] == [{"path": "src/", "files": 3, "bytes": 9}, {"path": "tests/", "files": 1, "bytes": 2}]
+    assert summary["files"] == [{"path": "README.md", "size": 3}]
+    sub = tree_index.list_repo_tree('{"prefix": "src", "summary": true}', repo)
+    assert sub["dirs"] == [{"path": "src/sub/", "files": 1, "bytes": 4}]
+    assert [f["path"] for f in sub["files"]] == ["src/a.py", "src/b.py"]
+
+def test_prefix_pattern_and_pagination(repo):
+    page = tree_index.list_repo_tree('{"pattern": "*.py", "page_size": 2}', repo)
+    assert page["total"] == 3 and page["pages"] == 2
+    assert [f["path"] for f in page["files"]] == ["src/a.py", "src/b.py"]
+    page2 = tree_index.list_repo_tree('{"pattern": "*.py", "page_size": 2, "page": 2}', repo)
+    assert [f["path"] for f in page2["files"]] == ["tests/test_a.py"]
+    assert tree_index.list_repo_tree('{"prefix": "src/sub/"}', repo)["total"] == 1
+
+def test_prefix_is_a_directory_or_a_file(repo):
+    commit(repo, {"src2/d.py": "d\n", "src.py": "s\n"}, "siblings")
+    assert [p for p, _, _ in tree_index.get_index(repo).files("src")] == ["src/a.py", "src/b.py", "src/sub/c.txt"]
+    assert [p for p, _, _ in tree_index.get_index(repo).files("src/a.py")] == ["src/a.py"]
+
+def test_index_is_cached_per_commit_and_follows_head(repo, monkeypatch):
+    first = tree_index.get_index(repo)
+    assert tree_index.get_index(repo) is first
+    assert os.path.exists(os.path.join(tree_index.TREE_CACHE_DIR, first.sha + ".json"))
+
+    write(repo, "new.py", "n\n")
+    git("add", "new.py", cwd=repo)
+    git("commit", "-m", "more", cwd=repo)
+    second = tree_index.get_index(repo)
+    assert second.sha != first.sha
+    assert "new.py" in second.paths
+
+    # a fresh process reloads from disk without running ls-tree
+    tree_index._memory.clear()
+    calls = []
+    real_build = tree_index._build
+    monkeypatch.setattr(tree_index, "_build", lambda *a: calls.append(a) or real_build(*a))
+    assert tree_index.get_index(repo).paths == second.paths
+    assert calls == []
+
+def test_only_recently_used_commits_stay_on_disk(repo, monkeypatch):
+    monkeypatch.setattr(tree_index, "TREE_KEEP_COMMITS", 2)
+    shas = []
+    for n in range(3):
+        commit(repo, {f"f{n}.py": "x\n"}, f"commit {n}")
+        shas.append(tree_index.get_index(repo).sha)
+        os.utime(os.path.join(tree_index.TREE_CACHE_DIR, shas[-1] + ".json"), (n, n))
+    assert sorted(os.listdir(tree_index.TREE_CACHE_DIR)) == sorted(s + ".json" for s in shas[1:])
+
+def test_to_github_tree_shape(repo):
+    tree = tree_index.get_index(repo).to_github_tree()
+    assert tree["truncated"] is False
+    entry = next(e for e in tree["tree"] if e["path"] == "src/a.py")
+    assert entry["type"] == "blob" and entry["size"] == 2 and len(entry["sha"]) == 40
+
+def test_invalid_query_reports_error(repo):
+    assert "error" in tree_index.list_repo_tree("{nope", repo)
+    assert "error" in tree_index.list_repo_tree('["src"]', repo)
+    assert "page_size" in tree_index.list_repo_tree('{"page_size": 0}', repo)["error"]
+    assert "page" in tree_index.list_repo_tree('{"page": "2"}', repo)["error"]
+    assert "error" in tree_index.list_repo_tree('{"prefix": 3}', repo)